@@ -0,0 +1,58 @@
+"""add cached_invoice_id to processed_invoices
+
+Revision ID: cached_invoice_010
+Revises: product_embeddings_009
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cached_invoice_010'
+down_revision: Union[str, None] = 'product_embeddings_009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Point cache-served invoices at the invoice whose Textract artifact they reused"""
+
+    op.add_column(
+        'processed_invoices',
+        sa.Column('cached_invoice_id', postgresql.UUID(as_uuid=True), nullable=True)
+    )
+    op.create_foreign_key(
+        'fk_processed_invoices_cached_invoice',
+        'processed_invoices', 'processed_invoices',
+        ['cached_invoice_id'], ['id'],
+        ondelete='SET NULL'
+    )
+
+    # Existing cache hits: the latest original with the same bytes completed before them
+    op.execute("""
+        UPDATE processed_invoices AS served
+        SET cached_invoice_id = (
+            SELECT original.id
+            FROM processed_invoices AS original
+            JOIN textract_artifacts ON textract_artifacts.invoice_id = original.id
+            WHERE original.tenant_id = served.tenant_id
+              AND original.content_sha256 = served.content_sha256
+              AND original.served_from_cache = false
+              AND original.completion_timestamp <= served.upload_timestamp
+            ORDER BY original.completion_timestamp DESC
+            LIMIT 1
+        )
+        WHERE served.served_from_cache = true
+    """)
+
+
+def downgrade() -> None:
+    """Remove the cached invoice reference"""
+
+    op.drop_constraint('fk_processed_invoices_cached_invoice', 'processed_invoices', type_='foreignkey')
+    op.drop_column('processed_invoices', 'cached_invoice_id')
@@ -0,0 +1,39 @@
+"""add content hash for Textract result cache
+
+Revision ID: add_content_hash_002
+Revises: add_unit_fields_001
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_content_hash_002'
+down_revision: Union[str, None] = 'add_unit_fields_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add content hash and cache flag to processed_invoices"""
+    
+    op.add_column('processed_invoices', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.add_column(
+        'processed_invoices',
+        sa.Column('served_from_cache', sa.Boolean(), nullable=False, server_default=sa.false())
+    )
+    
+    # Cache lookups are (tenant_id, content_sha256)
+    op.create_index('idx_tenant_content_hash', 'processed_invoices', ['tenant_id', 'content_sha256'])
+
+
+def downgrade() -> None:
+    """Remove content hash and cache flag"""
+    
+    op.drop_index('idx_tenant_content_hash', table_name='processed_invoices')
+    op.drop_column('processed_invoices', 'served_from_cache')
+    op.drop_column('processed_invoices', 'content_sha256')
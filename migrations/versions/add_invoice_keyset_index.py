@@ -0,0 +1,26 @@
+"""add keyset pagination index on processed_invoices
+
+Revision ID: add_keyset_index_004
+Revises: add_processing_jobs_003
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_keyset_index_004'
+down_revision: Union[str, None] = 'add_processing_jobs_003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index matching WHERE tenant_id = ? ORDER BY upload_timestamp DESC, id DESC"""
+    op.create_index('idx_tenant_upload_id', 'processed_invoices', ['tenant_id', 'upload_timestamp', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_tenant_upload_id', table_name='processed_invoices')
@@ -0,0 +1,55 @@
+"""add processing_jobs queue table
+
+Revision ID: add_processing_jobs_003
+Revises: add_content_hash_002
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_processing_jobs_003'
+down_revision: Union[str, None] = 'add_content_hash_002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the durable job queue table"""
+    
+    op.create_table(
+        'processing_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            'invoice_id', postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('processed_invoices.id', ondelete='CASCADE'), nullable=False
+        ),
+        sa.Column('tenant_id', sa.String(length=100), nullable=False),
+        sa.Column('job_type', sa.String(length=50), nullable=False, server_default='textract'),
+        sa.Column('payload', postgresql.JSONB(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='5'),
+        sa.Column('run_after', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('locked_by', sa.String(length=255), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, server_default=sa.func.now()),
+    )
+    
+    # Claim query: WHERE status = 'queued' AND run_after <= now() ORDER BY run_after
+    op.create_index('idx_jobs_status_run_after', 'processing_jobs', ['status', 'run_after'])
+    op.create_index('ix_processing_jobs_invoice_id', 'processing_jobs', ['invoice_id'])
+
+
+def downgrade() -> None:
+    """Drop the job queue table"""
+    
+    op.drop_index('ix_processing_jobs_invoice_id', table_name='processing_jobs')
+    op.drop_index('idx_jobs_status_run_after', table_name='processing_jobs')
+    op.drop_table('processing_jobs')
@@ -0,0 +1,43 @@
+"""add product_classifications cache table
+
+Revision ID: product_classifications_008
+Revises: tenant_photo_grayscale_007
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'product_classifications_008'
+down_revision: Union[str, None] = 'tenant_photo_grayscale_007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Persistent per-tenant classification cache; the primary key is the lookup"""
+    op.create_table(
+        'product_classifications',
+        sa.Column(
+            'tenant_id', sa.String(length=100),
+            sa.ForeignKey('tenants.tenant_id', ondelete='CASCADE'), nullable=False
+        ),
+        sa.Column('classifier_version', sa.String(length=32), nullable=False),
+        sa.Column('description_key', sa.Text(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('category_spanish', sa.String(length=100), nullable=True),
+        sa.Column('confidence', sa.Numeric(precision=5, scale=4), nullable=False),
+        sa.Column('method', sa.String(length=50), nullable=False),
+        sa.Column('all_scores', postgresql.JSONB(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('tenant_id', 'classifier_version', 'description_key'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('product_classifications')
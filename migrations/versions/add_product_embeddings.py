@@ -0,0 +1,40 @@
+"""add product_embeddings for the catalog similarity index
+
+Revision ID: product_embeddings_009
+Revises: product_classifications_008
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'product_embeddings_009'
+down_revision: Union[str, None] = 'product_classifications_008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """One embedding per product; existing products are embedded on first index load"""
+    op.create_table(
+        'product_embeddings',
+        sa.Column(
+            'product_id', postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True
+        ),
+        sa.Column('tenant_id', sa.String(length=100), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column('embedding', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True, server_default=sa.func.now()),
+    )
+    op.create_index('idx_product_embeddings_tenant_created', 'product_embeddings', ['tenant_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_product_embeddings_tenant_created', table_name='product_embeddings')
+    op.drop_table('product_embeddings')
@@ -0,0 +1,30 @@
+"""add per-tenant grayscale photo enhancement flag
+
+Revision ID: tenant_photo_grayscale_007
+Revises: textract_archive_006
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'tenant_photo_grayscale_007'
+down_revision: Union[str, None] = 'textract_archive_006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Existing tenants keep colour enhancement"""
+    op.add_column(
+        'tenants',
+        sa.Column('photo_grayscale', sa.Boolean(), nullable=False, server_default=sa.false())
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('tenants', 'photo_grayscale')
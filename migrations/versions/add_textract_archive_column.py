@@ -0,0 +1,48 @@
+"""add compact archive column to textract_artifacts
+
+Revision ID: textract_archive_006
+Revises: textract_artifacts_005
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'textract_archive_006'
+down_revision: Union[str, None] = 'textract_artifacts_005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add archive (bytea), make the legacy JSONB column optional"""
+
+    op.add_column('textract_artifacts', sa.Column('archive', sa.LargeBinary(), nullable=True))
+    op.alter_column('textract_artifacts', 'raw_response', existing_type=postgresql.JSONB(), nullable=True)
+
+    # Archives are already zstd-compressed; stop TOAST from trying again
+    op.execute("ALTER TABLE textract_artifacts ALTER COLUMN archive SET STORAGE EXTERNAL")
+
+    # Existing JSONB rows stay readable (the store falls back to raw_response)
+    # and are converted when their invoice is reprocessed
+
+
+def downgrade() -> None:
+    """Decode archives back into JSONB, then drop the archive column"""
+    import json
+    from src.services.document_processing.textract.archive import decode_textract_response
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT invoice_id, archive FROM textract_artifacts WHERE raw_response IS NULL"))
+    for invoice_id, archive in rows.fetchall():
+        bind.execute(
+            sa.text("UPDATE textract_artifacts SET raw_response = CAST(:raw AS jsonb) WHERE invoice_id = :id"),
+            {"raw": json.dumps(decode_textract_response(archive)), "id": invoice_id}
+        )
+
+    op.alter_column('textract_artifacts', 'raw_response', existing_type=postgresql.JSONB(), nullable=False)
+    op.drop_column('textract_artifacts', 'archive')
@@ -0,0 +1,57 @@
+"""move textract_raw_response to textract_artifacts
+
+Revision ID: textract_artifacts_005
+Revises: add_keyset_index_004
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'textract_artifacts_005'
+down_revision: Union[str, None] = 'add_keyset_index_004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create textract_artifacts, copy existing responses, drop the inline column"""
+    
+    op.create_table(
+        'textract_artifacts',
+        sa.Column(
+            'invoice_id', postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('processed_invoices.id', ondelete='CASCADE'), primary_key=True
+        ),
+        sa.Column('tenant_id', sa.String(length=100), nullable=False),
+        sa.Column('raw_response', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True, server_default=sa.func.now()),
+    )
+    
+    op.execute("""
+        INSERT INTO textract_artifacts (invoice_id, tenant_id, raw_response, created_at)
+        SELECT id, tenant_id, textract_raw_response, COALESCE(completion_timestamp, upload_timestamp)
+        FROM processed_invoices
+        WHERE textract_raw_response IS NOT NULL
+    """)
+    
+    # Dropping the column does not shrink the table; run
+    # VACUUM FULL processed_invoices in a maintenance window (outside a transaction)
+    op.drop_column('processed_invoices', 'textract_raw_response')
+
+
+def downgrade() -> None:
+    """Move responses back inline"""
+    
+    op.add_column('processed_invoices', sa.Column('textract_raw_response', postgresql.JSONB(), nullable=True))
+    op.execute("""
+        UPDATE processed_invoices p
+        SET textract_raw_response = a.raw_response
+        FROM textract_artifacts a
+        WHERE a.invoice_id = p.id
+    """)
+    op.drop_table('textract_artifacts')
@@ -5,12 +5,20 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from ..config.settings import settings
 from ..database.connection import init_database, close_database, create_tables, check_database_health
 from .routers import invoices
+from ..services.document_processing.textract import get_textract_result_cache
+from ..services.document_processing.computer_vision.photo_pipeline import get_photo_pipeline_pool
+from ..services.ml_services.category_classifier import get_category_classifier
+from ..services.ml_services.classification_cache import get_classification_cache
+from ..services.ml_services.model_registry import get_model_registry
+from ..services.ml_services.product_index import get_product_embedding_store
+from ..services.job_queue import InvoiceWorker
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,10 +36,32 @@ async def lifespan(app: FastAPI):
         await create_tables()
         logger.info("📊 Database tables ready")
     
+    # Spawn and warm the OpenCV workers before the first photo upload
+    photo_pipeline = get_photo_pipeline_pool()
+    await photo_pipeline.start()
+    
+    # The active classifier backend's model loads on a background thread; until
+    # then pricing uses keyword classification. Other models load on first use.
+    if settings.ml_preload_models:
+        get_model_registry().start_background_loading([get_category_classifier().backend.model_key])
+    
+    # In-process worker for single-process setups; production runs
+    # python -m src.services.job_queue.worker separately
+    worker = None
+    worker_task = None
+    if settings.embedded_worker:
+        worker = InvoiceWorker(processor=invoices.invoice_service)
+        worker_task = asyncio.create_task(worker.run())
+        logger.info("⚙️ Embedded invoice worker started")
+    
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down...")
+    if worker:
+        worker.stop()
+        await worker_task
+    photo_pipeline.shutdown()
     await close_database()
 
 # Create FastAPI app
@@ -51,6 +81,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Invoice list pagination
 )
 
 # Include routers
@@ -72,9 +103,16 @@ async def root():
 async def health_check():
     """Detailed health check"""
     db_healthy = await check_database_health()
+    models = get_model_registry()
+    
+    status = "healthy"
+    if not db_healthy:
+        status = "unhealthy"
+    elif models.degraded:
+        status = "degraded"  # Pricing runs on keyword classification until the models load
     
     return {
-        "status": "healthy" if db_healthy else "unhealthy",
+        "status": status,
         "database": "connected" if db_healthy else "disconnected",
         "aws": "configured",
         "services": {
@@ -82,7 +120,12 @@ async def health_check():
             "s3": "available", 
             "invoice_processor": "running",
             "postgresql": "connected" if db_healthy else "disconnected"
-        }
+        },
+        "textract_cache": get_textract_result_cache().stats(),
+        "photo_pipeline": get_photo_pipeline_pool().stats(),
+        "classification_cache": get_classification_cache().stats(),
+        "ml_models": models.stats(),
+        "product_index": get_product_embedding_store().stats()
     }
 
 # Exception handlers
@@ -1,13 +1,13 @@
 """
 Invoice processing endpoints with multi-tenant support - FIXED
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Header
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Header, Response, Query
 from fastapi.responses import JSONResponse
 from typing import List, Optional
 import uuid
 from typing import List, Optional, Dict, Any
 import logging
-from datetime import datetime
+from datetime import datetime, date
 
 from pydantic import UUID4, ValidationError
 from decimal import Decimal
@@ -26,6 +26,9 @@ from ...models.invoice import (
 
 from ...config.settings import settings
 from ...services.document_processing import InvoiceProcessorService
+from ...services.document_processing.invoice_processor import MAX_PAGE_SIZE
+from ...services.document_processing.computer_vision import PhotoQualityError
+from ...services.analytics import InvoiceAnalyticsService
 from ...models.invoice import ProcessedInvoice, InvoiceData, InvoiceStatus
 
 logger = logging.getLogger(__name__)
@@ -56,6 +59,7 @@ router = APIRouter()
 
 # Initialize service
 invoice_service = InvoiceProcessorService()
+analytics_service = InvoiceAnalyticsService()
 
 async def get_tenant_id(x_tenant_id: str = Header(...)) -> str:
     """Extract tenant ID from header"""
@@ -115,33 +119,22 @@ async def upload_invoice(
 
 @router.get("/analytics/summary")
 async def get_tenant_analytics(
-    tenant_id: str = Depends(get_tenant_id)
+    tenant_id: str = Depends(get_tenant_id),
+    bucket: str = "month",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
 ):
-    """Get analytics summary for tenant"""
+    """Get analytics summary for tenant (status counts, amounts, issue-date series)"""
     try:
-        invoices = await invoice_service.list_tenant_invoices(tenant_id, limit=1000)
-        
-        total_invoices = len(invoices)
-        completed_invoices = len([inv for inv in invoices if inv.status == InvoiceStatus.COMPLETED])
-        failed_invoices = len([inv for inv in invoices if inv.status == InvoiceStatus.FAILED])
-        
-        # Calculate total extracted amounts
-        total_amount = sum(
-            inv.invoice_data.totals.total 
-            for inv in invoices 
-            if inv.invoice_data and inv.invoice_data.totals
+        return await analytics_service.get_tenant_summary(
+            tenant_id,
+            bucket=bucket,
+            date_from=date_from,
+            date_to=date_to
         )
         
-        return {
-            "tenant_id": tenant_id,
-            "total_invoices": total_invoices,
-            "completed_invoices": completed_invoices,
-            "failed_invoices": failed_invoices,
-            "success_rate": completed_invoices / total_invoices if total_invoices > 0 else 0,
-            "total_amount_processed": float(total_amount),
-            "currency": "COP"
-        }
-        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting analytics: {str(e)}")
         raise HTTPException(
@@ -151,22 +144,42 @@ async def get_tenant_analytics(
 
 @router.get("/", response_model=List[ProcessedInvoice])
 async def list_invoices(
+    response: Response,
     tenant_id: str = Depends(get_tenant_id),
-    limit: int = 10,
-    offset: int = 0,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     status: Optional[InvoiceStatus] = None
 ):
-    """List invoices for the tenant"""
+    """
+    List invoices for the tenant, newest first
+    
+    Pass the X-Next-Cursor response header back as ``cursor`` to get the
+    next page; the header is absent on the last page. ``offset`` is still
+    accepted for older clients.
+    """
     try:
-        invoices = await invoice_service.list_tenant_invoices(
+        if offset and not cursor:
+            return await invoice_service.list_tenant_invoices(
+                tenant_id=tenant_id,
+                limit=limit,
+                offset=offset,
+                status=status
+            )
+        
+        page = await invoice_service.list_tenant_invoices_page(
             tenant_id=tenant_id,
             limit=limit,
-            offset=offset,
+            cursor=cursor,
             status=status
         )
+        if page['next_cursor']:
+            response.headers["X-Next-Cursor"] = page['next_cursor']
         
-        return invoices
+        return page['invoices']
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing invoices: {str(e)}")
         raise HTTPException(
@@ -275,29 +288,51 @@ async def delete_invoice(
 
 
 
+PHOTO_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
+
+def validate_photo_upload(file: UploadFile) -> None:
+    """Reject non-image files and photos over 10MB"""
+    # Validate file type (accept common image formats)
+    file_extension = '.' + file.filename.lower().split('.')[-1]
+    
+    if file_extension not in PHOTO_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Only image files are supported: {', '.join(PHOTO_EXTENSIONS)}"
+        )
+    
+    # Validate file size (10MB limit for photos)
+    if file.size and file.size > 10 * 1024 * 1024:
+        raise HTTPException(
+            status_code=400,
+            detail="Photo size must be less than 10MB"
+        )
+
+def photo_quality_exception(error: PhotoQualityError) -> HTTPException:
+    """422 with the quality report, so the app can ask the user to retake the photo"""
+    return HTTPException(
+        status_code=422,
+        detail={
+            'message': str(error),
+            'page': error.page,
+            'quality': error.report.to_dict()
+        }
+    )
+
+def set_quality_warnings(response: Response, result: Dict[str, Any]) -> None:
+    """Photo accepted with quality problems: report them without failing the upload"""
+    if result.get('quality_warnings'):
+        response.headers['X-Photo-Quality-Warnings'] = ', '.join(result['quality_warnings'])
+
 @router.post("/upload-photo", response_model=ProcessedInvoice)
 async def upload_photo(
+    response: Response,
     file: UploadFile = File(..., description="Photo of invoice from mobile device"),
     tenant_id: str = Depends(get_tenant_id)
 ):
     """Upload a photo of an invoice for processing with image enhancement"""
     try:
-        # Validate file type (accept common image formats)
-        allowed_extensions = ['.jpg', '.jpeg', '.png', '.webp']
-        file_extension = '.' + file.filename.lower().split('.')[-1]
-        
-        if file_extension not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Only image files are supported: {', '.join(allowed_extensions)}"
-            )
-        
-        # Validate file size (10MB limit for photos)
-        if file.size and file.size > 10 * 1024 * 1024:
-            raise HTTPException(
-                status_code=400,
-                detail="Photo size must be less than 10MB"
-            )
+        validate_photo_upload(file)
         
         # Generate unique invoice ID
         invoice_id = str(uuid.uuid4())
@@ -312,6 +347,7 @@ async def upload_photo(
             filename=file.filename,
             photo_content=photo_content
         )
+        set_quality_warnings(response, result)
         
         # Return the processed invoice
         processed_invoice = await invoice_service.get_invoice_status(invoice_id, tenant_id)
@@ -321,6 +357,8 @@ async def upload_photo(
         
     except HTTPException:
         raise
+    except PhotoQualityError as e:
+        raise photo_quality_exception(e)
     except Exception as e:
         logger.error(f"Error uploading photo: {str(e)}")
         raise HTTPException(
@@ -328,6 +366,54 @@ async def upload_photo(
             detail=f"Failed to upload photo: {str(e)}"
         )
 
+@router.post("/upload-photos", response_model=ProcessedInvoice)
+async def upload_photos(
+    response: Response,
+    files: List[UploadFile] = File(..., description="Photos of one invoice, one per page, in page order"),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """Upload several photos of one long invoice; they become one multi-page PDF"""
+    try:
+        if len(files) > settings.photo_upload_max_pages:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.photo_upload_max_pages} photos per invoice"
+            )
+        for file in files:
+            validate_photo_upload(file)
+        
+        # Generate unique invoice ID
+        invoice_id = str(uuid.uuid4())
+        
+        # Read file content (page order = upload order)
+        photos = [await file.read() for file in files]
+        
+        # Enhance pages in parallel and assemble one PDF
+        result = await invoice_service.upload_and_process_photos(
+            tenant_id=tenant_id,
+            invoice_id=invoice_id,
+            filename=files[0].filename,
+            photos=photos
+        )
+        set_quality_warnings(response, result)
+        
+        # Return the processed invoice
+        processed_invoice = await invoice_service.get_invoice_status(invoice_id, tenant_id)
+        
+        logger.info(f"{len(photos)} photos uploaded and processed: {invoice_id} for tenant {tenant_id}")
+        return processed_invoice
+        
+    except HTTPException:
+        raise
+    except PhotoQualityError as e:
+        raise photo_quality_exception(e)
+    except Exception as e:
+        logger.error(f"Error uploading photos: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload photos: {str(e)}"
+        )
+
 @router.get("/{invoice_id}/pricing", response_model=PricingDataResponse)
 async def get_invoice_pricing_data(
     invoice_id: str,
@@ -538,6 +624,23 @@ async def confirm_invoice_pricing(
             detail=f"Failed to confirm pricing: {str(e)}"
         )
 
+@router.get("/{invoice_id}/textract-raw")
+async def get_textract_raw_response(
+    invoice_id: str,
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """Debug endpoint: raw Textract response (fetched from textract_artifacts on demand)"""
+    validate_uuid(invoice_id)
+    raw_response = await invoice_service.get_textract_raw_response(invoice_id, tenant_id)
+    
+    if raw_response is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No Textract response stored for this invoice"
+        )
+    
+    return raw_response
+
 @router.get("/{invoice_id}/debug-pricing")
 async def debug_pricing_data(
     invoice_id: str,
@@ -643,18 +746,15 @@ async def get_ml_pricing_recommendations(
         
         pricing_engine = get_pricing_engine()
         
-        # Generate ML recommendations for each line item
+        # Generate ML recommendations for all line items (one batched classification)
         ml_recommendations = []
+        recommendations = await pricing_engine.recommend_sale_prices(
+            pricing_data['line_items'],
+            supplier=pricing_data.get('supplier_name'),
+            tenant_id=tenant_id
+        )
         
-        for item in pricing_data['line_items']:
-            recommendation = await pricing_engine.recommend_sale_price(
-                product_code=item['product_code'],
-                description=item['description'],
-                cost_price=Decimal(str(item['unit_price'])),
-                quantity=Decimal(str(item['quantity'])),
-                supplier=pricing_data.get('supplier_name')
-            )
-            
+        for item, recommendation in zip(pricing_data['line_items'], recommendations):
             ml_recommendations.append({
                 'line_item_id': item['id'],
                 'product_info': {
@@ -694,16 +794,17 @@ async def test_ml_classification(
     
     results = []
     
-    for desc in descriptions:
-        # Test classification
-        category_result = classifier.classify_product(desc)
-        
+    # Test classification (all descriptions in one batch)
+    category_results = classifier.classify_products(descriptions)
+    
+    for desc, category_result in zip(descriptions, category_results):
         # Test pricing recommendation
         pricing_result = await pricing_engine.recommend_sale_price(
             product_code=f"TEST-{hash(desc) % 1000}",
             description=desc,
             cost_price=Decimal("10000"),  # Test cost
-            quantity=Decimal("12")        # Test quantity
+            quantity=Decimal("12"),       # Test quantity
+            category_info=category_result
         )
         
         results.append({
@@ -15,6 +15,41 @@ class Settings:
     # AWS Configuration
     aws_region: str = "us-east-1"
     s3_document_bucket: str = "invoice-saas-textract-dev"
+    aws_max_concurrency: int = 8  # Concurrent blocking boto3 calls per process
+    
+    # Textract job selection (sync AnalyzeDocument is single page, 5MB max)
+    textract_sync_max_bytes: int = 5 * 1024 * 1024
+    textract_sync_max_pages: int = 1
+    textract_poll_interval_seconds: float = 2.0
+    textract_job_timeout_seconds: int = 900
+    
+    # Textract result cache (same tenant + same bytes skips OCR)
+    textract_cache_enabled: bool = True
+    textract_cache_ttl_hours: int = 720
+    
+    # Background job queue (processing_jobs table)
+    worker_concurrency: int = 4  # Invoices processed at once per worker
+    worker_poll_interval_seconds: float = 1.0
+    job_max_attempts: int = 5
+    job_backoff_base_seconds: int = 5
+    job_backoff_max_seconds: int = 600
+    job_stale_after_seconds: int = 1800  # Must exceed textract_job_timeout_seconds
+    embedded_worker: bool = False  # Run a worker inside the API process
+    
+    # Photo enhancement (OpenCV) process pool
+    cv_workers: int = 2  # Worker processes; 0 runs the pipeline on a thread instead
+    cv_max_pending: int = 16  # Photos queued or running before callers wait
+    photo_upload_max_pages: int = 10  # Photos per multi-page invoice upload
+    photo_quality_gate: str = "reject"  # reject | warn | off: blurry/dark photos before any OCR spend
+    
+    # ML product classification (zero-shot)
+    ml_preload_models: bool = True  # Load the active classifier backend's model in the background at startup (else on first use)
+    ml_classifier_backend: str = "zero_shot"  # zero_shot | embedding_head (trained, much faster on CPU)
+    ml_classifier_head_path: str = "models/category_head.npz"
+    ml_classifier_batch_size: int = 32  # (description, label) pairs per forward pass
+    ml_classification_cache_enabled: bool = True
+    ml_classification_cache_size: int = 50000  # in-process entries (tenant, description)
+    product_index_refresh_seconds: int = 60  # Pick up catalog embeddings added by other workers
     
     # PostgreSQL Database Configuration
     db_host: str = "localhost"
@@ -33,6 +68,54 @@ class Settings:
         self.api_port = int(os.getenv("API_PORT", self.api_port))
         self.environment = os.getenv("ENVIRONMENT", self.environment)
         self.aws_region = os.getenv("AWS_REGION", self.aws_region)
+        self.aws_max_concurrency = int(os.getenv("AWS_MAX_CONCURRENCY", self.aws_max_concurrency))
+        self.textract_sync_max_bytes = int(os.getenv("TEXTRACT_SYNC_MAX_BYTES", self.textract_sync_max_bytes))
+        self.textract_sync_max_pages = int(os.getenv("TEXTRACT_SYNC_MAX_PAGES", self.textract_sync_max_pages))
+        self.textract_poll_interval_seconds = float(
+            os.getenv("TEXTRACT_POLL_INTERVAL_SECONDS", self.textract_poll_interval_seconds)
+        )
+        self.textract_job_timeout_seconds = int(
+            os.getenv("TEXTRACT_JOB_TIMEOUT_SECONDS", self.textract_job_timeout_seconds)
+        )
+        self.textract_cache_enabled = os.getenv(
+            "TEXTRACT_CACHE_ENABLED", str(self.textract_cache_enabled)
+        ).lower() in ("1", "true", "yes")
+        self.textract_cache_ttl_hours = int(os.getenv("TEXTRACT_CACHE_TTL_HOURS", self.textract_cache_ttl_hours))
+        
+        # Job queue / worker configuration
+        self.worker_concurrency = int(os.getenv("WORKER_CONCURRENCY", self.worker_concurrency))
+        self.worker_poll_interval_seconds = float(
+            os.getenv("WORKER_POLL_INTERVAL_SECONDS", self.worker_poll_interval_seconds)
+        )
+        self.job_max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", self.job_max_attempts))
+        self.job_backoff_base_seconds = int(os.getenv("JOB_BACKOFF_BASE_SECONDS", self.job_backoff_base_seconds))
+        self.job_backoff_max_seconds = int(os.getenv("JOB_BACKOFF_MAX_SECONDS", self.job_backoff_max_seconds))
+        self.job_stale_after_seconds = int(os.getenv("JOB_STALE_AFTER_SECONDS", self.job_stale_after_seconds))
+        # Development keeps the single-process workflow unless told otherwise
+        self.embedded_worker = os.getenv(
+            "EMBEDDED_WORKER", str(self.environment == "development")
+        ).lower() in ("1", "true", "yes")
+        
+        # Photo enhancement pool
+        self.cv_workers = int(os.getenv("CV_WORKERS", self.cv_workers))
+        self.cv_max_pending = int(os.getenv("CV_MAX_PENDING", self.cv_max_pending))
+        self.photo_upload_max_pages = int(os.getenv("PHOTO_UPLOAD_MAX_PAGES", self.photo_upload_max_pages))
+        self.photo_quality_gate = os.getenv("PHOTO_QUALITY_GATE", self.photo_quality_gate)
+        self.ml_preload_models = os.getenv(
+            "ML_PRELOAD_MODELS", str(self.ml_preload_models)
+        ).lower() in ("1", "true", "yes")
+        self.ml_classifier_backend = os.getenv("ML_CLASSIFIER_BACKEND", self.ml_classifier_backend)
+        self.ml_classifier_head_path = os.getenv("ML_CLASSIFIER_HEAD_PATH", self.ml_classifier_head_path)
+        self.ml_classifier_batch_size = int(os.getenv("ML_CLASSIFIER_BATCH_SIZE", self.ml_classifier_batch_size))
+        self.ml_classification_cache_enabled = os.getenv(
+            "ML_CLASSIFICATION_CACHE_ENABLED", str(self.ml_classification_cache_enabled)
+        ).lower() in ("1", "true", "yes")
+        self.ml_classification_cache_size = int(
+            os.getenv("ML_CLASSIFICATION_CACHE_SIZE", self.ml_classification_cache_size)
+        )
+        self.product_index_refresh_seconds = int(
+            os.getenv("PRODUCT_INDEX_REFRESH_SECONDS", self.product_index_refresh_seconds)
+        )
         
         # Database configuration from environment
         self.db_host = os.getenv("DB_HOST", self.db_host)
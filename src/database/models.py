@@ -1,7 +1,7 @@
 """
 SQLAlchemy models for Invoice SaaS
 """
-from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, Numeric, Date, ForeignKey, Index
+from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, Numeric, Date, ForeignKey, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID, JSONB
@@ -23,6 +23,7 @@ class Tenant(Base):
     plan = Column(String(50), default="freemium")  # freemium, basic, premium
     invoices_processed_month = Column(Integer, default=0)
     max_invoices_month = Column(Integer, default=10)
+    photo_grayscale = Column(Boolean, default=False)  # Enhance photo uploads in grayscale (faster, smaller PDFs)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True)
@@ -54,9 +55,13 @@ class ProcessedInvoice(Base):
     processing_timestamp = Column(DateTime)
     completion_timestamp = Column(DateTime)
     
-    # AWS Textract info
+    # AWS Textract info (raw response lives in textract_artifacts)
     textract_job_id = Column(String(255))
-    textract_raw_response = Column(JSONB)  # Raw Textract response
+    
+    # Deduplication (SHA-256 of the uploaded bytes)
+    content_sha256 = Column(String(64))
+    served_from_cache = Column(Boolean, default=False, nullable=False)
+    cached_invoice_id = Column(UUID(as_uuid=True), ForeignKey("processed_invoices.id", ondelete="SET NULL"))  # Owner of the reused Textract artifact
     
     # Extracted invoice data (structured)
     invoice_number = Column(String(100), index=True)
@@ -113,6 +118,8 @@ class ProcessedInvoice(Base):
         Index('idx_tenant_status', 'tenant_id', 'status'),
         Index('idx_tenant_date', 'tenant_id', 'issue_date'),
         Index('idx_supplier_tenant', 'supplier_nit', 'tenant_id'),
+        Index('idx_tenant_content_hash', 'tenant_id', 'content_sha256'),
+        Index('idx_tenant_upload_id', 'tenant_id', 'upload_timestamp', 'id'),  # Keyset listing
     )
 
 class InvoiceLineItem(Base):
@@ -171,6 +178,57 @@ class BillingRecord(Base):
     tenant = relationship("Tenant", back_populates="billing_records")
     invoice = relationship("ProcessedInvoice")
 
+class TextractArtifact(Base):
+    """Raw Textract response, kept off the hot processed_invoices row"""
+    __tablename__ = "textract_artifacts"
+    
+    invoice_id = Column(UUID(as_uuid=True), ForeignKey("processed_invoices.id", ondelete="CASCADE"), primary_key=True)
+    tenant_id = Column(String(100), nullable=False)
+    archive = Column(LargeBinary)  # compact format, see textract/archive.py
+    raw_response = Column(JSONB)  # legacy rows written before the archive format
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ProcessingJob(Base):
+    """Durable background job (claimed with SELECT ... FOR UPDATE SKIP LOCKED)"""
+    __tablename__ = "processing_jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    invoice_id = Column(UUID(as_uuid=True), ForeignKey("processed_invoices.id", ondelete="CASCADE"), nullable=False, index=True)
+    tenant_id = Column(String(100), nullable=False)
+    job_type = Column(String(50), nullable=False, default="textract")
+    payload = Column(JSONB)
+    
+    # queued -> running -> succeeded | failed (back to queued on retry)
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = Column(String(255))
+    locked_at = Column(DateTime)
+    last_error = Column(Text)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+class ProductClassification(Base):
+    """Cached category of a cleaned product description (see ml_services/classification_cache.py)"""
+    __tablename__ = "product_classifications"
+    
+    tenant_id = Column(String(100), ForeignKey("tenants.tenant_id", ondelete="CASCADE"), primary_key=True)
+    classifier_version = Column(String(32), primary_key=True)  # model + label set fingerprint
+    description_key = Column(Text, primary_key=True)
+    
+    category = Column(String(50), nullable=False)
+    category_spanish = Column(String(100))
+    confidence = Column(Numeric(5, 4), nullable=False)
+    method = Column(String(50), nullable=False)
+    all_scores = Column(JSONB)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class Supplier(Base):
     """Supplier directory for analytics"""
     __tablename__ = "suppliers"
@@ -227,3 +285,18 @@ class Product(Base):
     __table_args__ = (
         Index('idx_product_code_tenant', 'product_code', 'tenant_id'),
     )
+
+class ProductEmbedding(Base):
+    """Sentence embedding of a product description (see ml_services/product_index.py)"""
+    __tablename__ = "product_embeddings"
+    
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    tenant_id = Column(String(100), nullable=False)
+    model = Column(String(100), nullable=False)
+    embedding = Column(LargeBinary, nullable=False)  # float32, unit length
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Index load and incremental refresh: WHERE tenant_id = ? AND created_at >= ?
+        Index('idx_product_embeddings_tenant_created', 'tenant_id', 'created_at'),
+    )
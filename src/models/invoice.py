@@ -147,6 +147,7 @@ class ProcessedInvoice(BaseModel):
     # Storage info
     s3_key: Optional[str] = None
     textract_job_id: Optional[str] = None
+    served_from_cache: bool = False
     
     class Config:
         json_encoders = {
@@ -166,6 +167,7 @@ class Tenant(BaseModel):
     plan: str = "freemium"  # freemium, basic, premium
     invoices_processed_month: int = 0
     max_invoices_month: int = 10
+    photo_grayscale: bool = False  # Grayscale photo enhancement
     created_at: datetime
     is_active: bool = True
     
@@ -0,0 +1,6 @@
+"""
+Tenant analytics computed in SQL
+"""
+from .invoice_analytics import InvoiceAnalyticsService
+
+__all__ = ['InvoiceAnalyticsService']
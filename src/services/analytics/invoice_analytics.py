@@ -0,0 +1,118 @@
+"""
+Invoice analytics aggregated in PostgreSQL
+One GROUP BY over processed_invoices per request, independent of tenant size
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Any, Iterable, Optional
+
+from sqlalchemy import select, func
+
+from ...database.connection import AsyncSessionFactory
+from ...database.models import ProcessedInvoice
+
+logger = logging.getLogger(__name__)
+
+# date_trunc() precision per supported bucket
+BUCKETS = ('day', 'week', 'month', 'year')
+
+
+class InvoiceAnalyticsService:
+    """Per-tenant invoice counts, success rate and amounts"""
+
+    def build_summary_query(
+        self,
+        tenant_id: str,
+        bucket: str = 'month',
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ):
+        """
+        Counts and summed total_amount per (status, issue_date bucket)
+
+        Filters on tenant_id (+ issue_date range) so the planner can use
+        idx_tenant_status / idx_tenant_date; the result has at most
+        statuses x buckets rows.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unsupported bucket '{bucket}', expected one of {', '.join(BUCKETS)}")
+
+        period = func.date_trunc(bucket, ProcessedInvoice.issue_date).label('period')
+        query = (
+            select(
+                ProcessedInvoice.status,
+                period,
+                func.count(ProcessedInvoice.id).label('invoices'),
+                func.sum(ProcessedInvoice.total_amount).label('total_amount')
+            )
+            .where(ProcessedInvoice.tenant_id == tenant_id)
+            .group_by(ProcessedInvoice.status, period)
+        )
+        if date_from:
+            query = query.where(ProcessedInvoice.issue_date >= date_from)
+        if date_to:
+            query = query.where(ProcessedInvoice.issue_date <= date_to)
+        return query
+
+    def summarize(self, tenant_id: str, bucket: str, rows: Iterable[Any]) -> Dict[str, Any]:
+        """Fold the grouped rows into the analytics response"""
+        status_counts: Dict[str, int] = {}
+        series: Dict[Any, Dict[str, Any]] = {}
+        total_amount = Decimal('0')
+
+        for row in rows:
+            status_counts[row.status] = status_counts.get(row.status, 0) + row.invoices
+            amount = row.total_amount or Decimal('0')
+            total_amount += amount
+
+            # Invoices without issue_date count in totals but not in the series
+            if row.period is None:
+                continue
+            point = series.setdefault(row.period, {
+                'period': row.period.date().isoformat() if hasattr(row.period, 'date') else str(row.period),
+                'invoices': 0,
+                'completed_invoices': 0,
+                'total_amount': Decimal('0')
+            })
+            point['invoices'] += row.invoices
+            if row.status == 'completed':
+                point['completed_invoices'] += row.invoices
+            point['total_amount'] += amount
+
+        total_invoices = sum(status_counts.values())
+        completed_invoices = status_counts.get('completed', 0)
+
+        return {
+            "tenant_id": tenant_id,
+            "total_invoices": total_invoices,
+            "completed_invoices": completed_invoices,
+            "failed_invoices": status_counts.get('failed', 0),
+            "success_rate": completed_invoices / total_invoices if total_invoices > 0 else 0,
+            "total_amount_processed": float(total_amount),
+            "currency": "COP",
+            "status_counts": status_counts,
+            "bucket": bucket,
+            "series": [
+                {**point, 'total_amount': float(point['total_amount'])}
+                for _, point in sorted(series.items())
+            ]
+        }
+
+    async def get_tenant_summary(
+        self,
+        tenant_id: str,
+        bucket: str = 'month',
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Analytics summary for a tenant (single aggregate query)"""
+        query = self.build_summary_query(tenant_id, bucket, date_from, date_to)
+
+        async with AsyncSessionFactory() as session:
+            try:
+                result = await session.execute(query)
+                return self.summarize(tenant_id, bucket, result.all())
+            except Exception as e:
+                logger.error(f"Error computing analytics for {tenant_id}: {str(e)}")
+                raise
@@ -1,7 +1,8 @@
 """
 Computer Vision services for document image processing
 """
-from .image_enhancer import DocumentImageEnhancer
+from .image_enhancer import DocumentImageEnhancer, PhotoQualityReport, PhotoQualityError
 from .pdf_converter import ImageToPDFConverter
+from .photo_pipeline import PhotoPipelinePool, get_photo_pipeline_pool
 
-__all__ = ['DocumentImageEnhancer', 'ImageToPDFConverter']
+__all__ = ['DocumentImageEnhancer', 'PhotoQualityReport', 'PhotoQualityError', 'ImageToPDFConverter', 'PhotoPipelinePool', 'get_photo_pipeline_pool']
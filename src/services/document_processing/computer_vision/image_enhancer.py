@@ -5,12 +5,51 @@ Optimizes photos for AWS Textract processing
 import cv2
 import numpy as np
 import logging
-from typing import Tuple, Optional
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Tuple, Optional
 from PIL import Image
 import io
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class PhotoQualityReport:
+    """
+    Cheap pre-OCR assessment of a photo (measured on a small grayscale proxy)
+
+    errors make the photo unusable for OCR; warnings are passed back to the
+    client but the photo is still processed.
+    """
+    width: int
+    height: int
+    sharpness: float = 0.0  # Laplacian variance / intensity variance (contrast independent)
+    brightness: float = 0.0  # Mean gray level of the document area, 0-255
+    ink_level: float = 0.0  # 5th percentile gray level: how dark the darkest text is
+    clipped_fraction: float = 0.0  # Share of document pixels blown out to white (informational)
+    document_fraction: Optional[float] = None  # Share of the frame the document fills (None: no boundary found)
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def usable(self) -> bool:
+        return not self.errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), 'usable': self.usable}
+
+
+class PhotoQualityError(ValueError):
+    """Photo rejected by the quality gate before any OCR spend"""
+
+    def __init__(self, report: PhotoQualityReport, page: int = 1):
+        self.report = report
+        self.page = page
+        super().__init__(f"Photo {page} is not usable for OCR: {', '.join(report.errors)}")
+
+
 class DocumentImageEnhancer:
     """Enhance mobile photos of invoices for better Textract accuracy"""
     
@@ -20,36 +59,52 @@ class DocumentImageEnhancer:
         self.target_height = 1600
         self.gaussian_blur_kernel = (5, 5)
         self.bilateral_filter_params = (9, 75, 75)
+        self.max_working_size = (2400, 3200)  # Photos above twice this are decoded at reduced scale
+        self.detection_max_side = 500  # Corner detection runs on a proxy this size (None = full resolution)
+        self.detection_min_downscale = 3  # Smaller photos are searched at full size: little to gain, margins blur
+        
+        # Quality gate (assess_photo_quality), measured on a proxy of quality_max_side pixels
+        self.quality_max_side = 1000
+        self.min_sharpness = 0.02  # Below: text too blurred to read (error)
+        self.warn_sharpness = 0.05
+        self.min_brightness = 40  # Below: too dark (error)
+        self.warn_brightness = 70
+        self.max_ink_level = 180  # Darkest 5% lighter than this: text washed out (error)
+        self.warn_ink_level = 150
+        self.min_document_fraction = 0.08  # Document smaller than this share of the frame (error)
+        self.warn_document_fraction = 0.25
     
-    def enhance_invoice_photo(self, image_bytes: bytes) -> bytes:
+    def enhance_invoice_photo(self, image_bytes: bytes, grayscale: bool = False) -> bytes:
         """
         Main function to enhance mobile photo of invoice
         
         Args:
             image_bytes: Raw image bytes from mobile photo
+            grayscale: Decode to a single channel and run every filter on it;
+                the result is a grayscale JPEG (faster, smaller PDF)
             
         Returns:
             Enhanced image bytes ready for PDF conversion
         """
         try:
-            # Convert bytes to OpenCV image
-            img = self._bytes_to_cv2(image_bytes)
+            # Convert bytes to OpenCV image (large photos are reduced by the JPEG decoder)
+            img = self._bytes_to_cv2(image_bytes, grayscale)
             
-            logger.info(f"Original image shape: {img.shape}")
+            logger.info(f"Decoded image shape: {img.shape}")
             
-            # Step 1: Resize if too large (save processing time)
-            img = self._resize_if_needed(img)
+            # Step 1: Detect document corners
+            corners = self._detect_document_corners(img)
             
-            # Step 2: Detect and straighten document
-            img = self._detect_and_straighten_document(img)
+            # Step 2: Straighten and resize to the Textract target in a single resample
+            img = self._straighten_to_target(img, corners)
             
-            # Step 3: Enhance image quality
+            # Step 3: Enhance image quality (at the final size)
             img = self._enhance_quality(img)
             
             # Step 4: Final optimization for Textract
             img = self._optimize_for_textract(img)
             
-            # Convert back to bytes
+            # Convert back to bytes (the only lossy encode; the PDF embeds it as-is)
             enhanced_bytes = self._cv2_to_bytes(img)
             
             logger.info("Image enhancement completed successfully")
@@ -60,16 +115,128 @@ class DocumentImageEnhancer:
             # Return original image if enhancement fails
             return image_bytes
     
-    def _bytes_to_cv2(self, image_bytes: bytes) -> np.ndarray:
-        """Convert bytes to OpenCV image"""
+    def assess_photo_quality(self, image_bytes: bytes) -> PhotoQualityReport:
+        """
+        Blur, exposure and document-size check on a small grayscale proxy
+        
+        Decoding is reduced in the JPEG decoder and everything runs on a
+        ~1000px image, so this costs tens of milliseconds even for 12MP photos,
+        far less than enhancement, S3 upload and a Textract call.
+        """
+        started = time.perf_counter()
+        try:
+            width, height = Image.open(io.BytesIO(image_bytes)).size  # header only
+        except Exception:
+            width = height = 0
+        
+        gray = self._decode_quality_proxy(image_bytes, max(width, height))
+        if gray is None:
+            return PhotoQualityReport(
+                width=width, height=height, errors=['unreadable'],
+                elapsed_ms=(time.perf_counter() - started) * 1000
+            )
+        
+        proxy_height, proxy_width = gray.shape
+        report = PhotoQualityReport(width=width or proxy_width, height=height or proxy_height)
+        
+        # Measure inside the document when it can be found, so the background does not count
+        region = gray
+        corners = self._find_document_corners(gray)
+        if corners is not None:
+            report.document_fraction = round(float(cv2.contourArea(corners)) / (proxy_width * proxy_height), 3)
+            x, y, w, h = cv2.boundingRect(np.round(corners).astype(np.int32))
+            x, y = max(x, 0), max(y, 0)
+            if w > 8 and h > 8:
+                region = gray[y:y + h, x:x + w]
+        
+        laplacian_variance = cv2.Laplacian(region, cv2.CV_64F).var()
+        report.sharpness = round(float(laplacian_variance / max(region.var(), 1.0)), 4)
+        report.brightness = round(float(region.mean()), 1)
+        report.ink_level = float(np.percentile(region, 5))
+        report.clipped_fraction = round(float(np.count_nonzero(region >= 250)) / region.size, 3)
+        
+        self._grade_quality(report)
+        report.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        return report
+    
+    def _decode_quality_proxy(self, image_bytes: bytes, long_side: int) -> Optional[np.ndarray]:
+        """Grayscale image of at most quality_max_side pixels, decoded at reduced scale when possible"""
+        flag = cv2.IMREAD_GRAYSCALE
+        for factor, reduced_flag in ((8, cv2.IMREAD_REDUCED_GRAYSCALE_8), (4, cv2.IMREAD_REDUCED_GRAYSCALE_4), (2, cv2.IMREAD_REDUCED_GRAYSCALE_2)):
+            if long_side // factor >= self.quality_max_side:
+                flag = reduced_flag
+                break
+        
+        gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flag)
+        if gray is None:
+            return None
+        
+        scale = self.quality_max_side / max(gray.shape)
+        if scale < 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return gray
+    
+    def _grade_quality(self, report: PhotoQualityReport) -> None:
+        """Turn measurements into errors (reject) and warnings"""
+        if report.sharpness < self.min_sharpness:
+            report.errors.append('blurry')
+        elif report.sharpness < self.warn_sharpness:
+            report.warnings.append('slightly_blurry')
+        
+        if report.brightness < self.min_brightness:
+            report.errors.append('too_dark')
+        elif report.brightness < self.warn_brightness:
+            report.warnings.append('dark')
+        
+        if report.ink_level > self.max_ink_level:
+            report.errors.append('overexposed')
+        elif report.ink_level > self.warn_ink_level:
+            report.warnings.append('overexposed')
+        
+        if report.document_fraction is not None:
+            if report.document_fraction < self.min_document_fraction:
+                report.errors.append('document_too_small')
+            elif report.document_fraction < self.warn_document_fraction:
+                report.warnings.append('document_small')
+    
+    def _bytes_to_cv2(self, image_bytes: bytes, grayscale: bool = False) -> np.ndarray:
+        """Convert bytes to OpenCV image (BGR, or single channel when grayscale)"""
         nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        img = cv2.imdecode(nparr, self._decode_flags(image_bytes, grayscale))
         
         if img is None:
             raise ValueError("Could not decode image")
         
         return img
     
+    def _decode_flags(self, image_bytes: bytes, grayscale: bool = False) -> int:
+        """
+        imdecode flags for a photo: reduced decoding when it is far above the working size
+        
+        The JPEG decoder scales by 1/2, 1/4 or 1/8 in the DCT domain, which is
+        cheaper than decoding at full size and resampling afterwards. The
+        reduced image never drops below max_working_size. Grayscale decoding
+        keeps only the luma plane, skipping the colour conversion entirely.
+        """
+        full_flag = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+        try:
+            width, height = Image.open(io.BytesIO(image_bytes)).size  # header only
+        except Exception:
+            return full_flag
+        
+        reduced_flags = (
+            (8, cv2.IMREAD_REDUCED_GRAYSCALE_8 if grayscale else cv2.IMREAD_REDUCED_COLOR_8),
+            (4, cv2.IMREAD_REDUCED_GRAYSCALE_4 if grayscale else cv2.IMREAD_REDUCED_COLOR_4),
+            (2, cv2.IMREAD_REDUCED_GRAYSCALE_2 if grayscale else cv2.IMREAD_REDUCED_COLOR_2),
+        )
+        max_width, max_height = self.max_working_size
+        long_side, short_side = max(width, height), min(width, height)
+        for factor, flag in reduced_flags:
+            if long_side // factor >= max_height and short_side // factor >= max_width:
+                logger.info(f"Decoding {width}x{height} image at 1/{factor} scale")
+                return flag
+        return full_flag
+    
     def _cv2_to_bytes(self, img: np.ndarray, format: str = '.jpg') -> bytes:
         """Convert OpenCV image to bytes"""
         is_success, buffer = cv2.imencode(format, img)
@@ -79,55 +246,73 @@ class DocumentImageEnhancer:
         
         return buffer.tobytes()
     
-    def _resize_if_needed(self, img: np.ndarray) -> np.ndarray:
-        """Resize image if it's too large (optimization)"""
-        height, width = img.shape[:2]
-        
-        # If image is very large, resize to save processing time
-        if width > 2400 or height > 3200:
-            # Calculate scale factor
-            scale_w = 2400 / width if width > 2400 else 1
-            scale_h = 3200 / height if height > 3200 else 1
-            scale = min(scale_w, scale_h)
-            
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            
-            img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_AREA)
-            logger.info(f"Resized image to: {new_width}x{new_height}")
-        
-        return img
-    
-    def _detect_and_straighten_document(self, img: np.ndarray) -> np.ndarray:
-        """Detect document boundaries and apply perspective correction"""
+    def _detect_document_corners(self, img: np.ndarray) -> Optional[np.ndarray]:
+        """Document corners for perspective correction, None when no boundary is found"""
         try:
-            # Convert to grayscale for edge detection
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Apply Gaussian blur
-            blurred = cv2.GaussianBlur(gray, self.gaussian_blur_kernel, 0)
-            
-            # Edge detection
-            edges = cv2.Canny(blurred, 50, 150, apertureSize=3)
-            
-            # Find contours
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            corners = self._find_document_corners(img)
             
-            # Find the largest rectangular contour (likely the document)
-            document_contour = self._find_document_contour(contours, img.shape)
-            
-            if document_contour is not None:
-                # Apply perspective correction
-                img = self._apply_perspective_correction(img, document_contour)
-                logger.info("Applied perspective correction")
-            else:
+            if corners is None:
                 logger.info("No document boundary detected, using original image")
-            
-            return img
+            return corners
             
         except Exception as e:
             logger.warning(f"Error in document detection: {str(e)}")
-            return img
+            return None
+    
+    def _find_document_corners(self, img: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Four document corners in full-resolution pixel coordinates, or None
+        
+        Edges and contours are found on a proxy downscaled to
+        detection_max_side pixels on the long side and the quadrilateral is
+        scaled back up for the full-resolution warp. Photos less than
+        detection_min_downscale times larger are searched at full size. When
+        the proxy shows no document the photo is taken as is: a
+        full-resolution retry would make exactly those photos slower than
+        detecting at full size in the first place.
+        """
+        height, width = img.shape[:2]
+        max_side = self.detection_max_side
+        
+        if max_side and max(height, width) >= max_side * self.detection_min_downscale:
+            scale = max_side / max(height, width)
+            proxy_size = (round(width * scale), round(height * scale))
+            proxy = img
+            if scale < 0.5:
+                # Cheap bilinear step to twice the proxy size, then area averaging:
+                # close to a direct INTER_AREA resize (which aliases less than
+                # bilinear alone) at a fraction of its cost
+                proxy = cv2.resize(img, (proxy_size[0] * 2, proxy_size[1] * 2), interpolation=cv2.INTER_LINEAR)
+            proxy = cv2.resize(proxy, proxy_size, interpolation=cv2.INTER_AREA)
+            
+            document_contour = self._detect_document_contour(proxy)
+            if document_contour is None:
+                return None
+            # Proxy pixel centres back to full-resolution coordinates
+            corners = document_contour.reshape(4, 2).astype(np.float32)
+            return (corners + 0.5) * np.float32([width / proxy_size[0], height / proxy_size[1]]) - 0.5
+        
+        document_contour = self._detect_document_contour(img)
+        if document_contour is None:
+            return None
+        return document_contour.reshape(4, 2).astype(np.float32)
+    
+    def _detect_document_contour(self, img: np.ndarray) -> Optional[np.ndarray]:
+        """Edge detection + contour search at the image's own resolution"""
+        # Convert to grayscale for edge detection
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        
+        # Apply Gaussian blur
+        blurred = cv2.GaussianBlur(gray, self.gaussian_blur_kernel, 0)
+        
+        # Edge detection
+        edges = cv2.Canny(blurred, 50, 150, apertureSize=3)
+        
+        # Find contours
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        # Find the largest rectangular contour (likely the document)
+        return self._find_document_contour(contours, img.shape)
     
     def _find_document_contour(self, contours, img_shape) -> Optional[np.ndarray]:
         """Find the contour that most likely represents the document"""
@@ -161,45 +346,59 @@ class DocumentImageEnhancer:
         
         return best_contour
     
-    def _apply_perspective_correction(self, img: np.ndarray, contour: np.ndarray) -> np.ndarray:
-        """Apply perspective correction based on detected document contour"""
+    def _target_size(self, width: float, height: float) -> Tuple[int, int]:
+        """Output size for Textract: fit in target_width x target_height, never upscale"""
+        scale = min(self.target_width / width, self.target_height / height, 1)
+        return max(round(width * scale), 1), max(round(height * scale), 1)
+    
+    def _straighten_to_target(self, img: np.ndarray, corners: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Perspective correction and resize to the Textract target in one resample
+        
+        The scale to the target size is folded into the perspective transform,
+        so the photo is warped once, straight into the final output. Bilinear
+        warping aliases small text from about 3x minification (24 MP phones),
+        so there the photo is first box-blurred in place, over roughly the
+        source pixels each output pixel covers. ``img`` may be modified.
+        """
+        height, width = img.shape[:2]
+        
+        if corners is None:
+            new_width, new_height = self._target_size(width, height)
+            if (new_width, new_height) == (width, height):
+                return img
+            return cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_AREA)
+        
         try:
-            # Get the four corners of the document
-            pts = contour.reshape(4, 2).astype(np.float32)
-            
             # Order points: top-left, top-right, bottom-right, bottom-left
-            pts = self._order_points(pts)
+            pts = self._order_points(corners.reshape(4, 2).astype(np.float32))
             
-            # Calculate dimensions of the straightened document
-            width = int(max(
-                np.linalg.norm(pts[1] - pts[0]),  # top edge
-                np.linalg.norm(pts[2] - pts[3])   # bottom edge
-            ))
+            # Dimensions of the straightened document, then of the final output
+            doc_width = max(np.linalg.norm(pts[1] - pts[0]), np.linalg.norm(pts[2] - pts[3]))
+            doc_height = max(np.linalg.norm(pts[3] - pts[0]), np.linalg.norm(pts[2] - pts[1]))
+            new_width, new_height = self._target_size(doc_width, doc_height)
             
-            height = int(max(
-                np.linalg.norm(pts[3] - pts[0]),  # left edge
-                np.linalg.norm(pts[2] - pts[1])   # right edge
-            ))
+            # Largest odd width within the minification (3 from 3x, 5 from 5x); below 3x it blurs more than it de-aliases
+            blur_size = 2 * int((max(doc_width / new_width, doc_height / new_height) - 1) / 2) + 1
+            if blur_size > 1:
+                cv2.blur(img, (blur_size, blur_size), dst=img)
             
-            # Define destination points for perspective transform
             dst_pts = np.array([
                 [0, 0],
-                [width - 1, 0],
-                [width - 1, height - 1],
-                [0, height - 1]
+                [new_width - 1, 0],
+                [new_width - 1, new_height - 1],
+                [0, new_height - 1]
             ], dtype=np.float32)
             
-            # Calculate perspective transform matrix
             matrix = cv2.getPerspectiveTransform(pts, dst_pts)
+            corrected = cv2.warpPerspective(img, matrix, (new_width, new_height), flags=cv2.INTER_LINEAR)
             
-            # Apply perspective transform
-            corrected = cv2.warpPerspective(img, matrix, (width, height))
-            
+            logger.info(f"Applied perspective correction: {new_width}x{new_height}")
             return corrected
             
         except Exception as e:
             logger.warning(f"Error applying perspective correction: {str(e)}")
-            return img
+            return self._straighten_to_target(img, None)
     
     def _order_points(self, pts: np.ndarray) -> np.ndarray:
         """Order points as: top-left, top-right, bottom-right, bottom-left"""
@@ -223,12 +422,17 @@ class DocumentImageEnhancer:
         # Apply bilateral filter to reduce noise while keeping edges sharp
         enhanced = cv2.bilateralFilter(img, *self.bilateral_filter_params)
         
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        
+        if enhanced.ndim == 2:
+            # Grayscale mode: the image already is the lightness channel
+            return clahe.apply(enhanced)
+        
         # Convert to LAB color space for better contrast enhancement
         lab = cv2.cvtColor(enhanced, cv2.COLOR_BGR2LAB)
         l, a, b = cv2.split(lab)
         
         # Apply CLAHE (Contrast Limited Adaptive Histogram Equalization) to L channel
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
         l = clahe.apply(l)
         
         # Merge channels and convert back to BGR
@@ -238,20 +442,7 @@ class DocumentImageEnhancer:
         return enhanced
     
     def _optimize_for_textract(self, img: np.ndarray) -> np.ndarray:
-        """Final optimizations specifically for AWS Textract"""
-        # Resize to optimal dimensions for Textract
-        height, width = img.shape[:2]
-        
-        # Textract works best with specific resolutions
-        if width != self.target_width or height != self.target_height:
-            # Maintain aspect ratio
-            scale = min(self.target_width / width, self.target_height / height)
-            
-            if scale < 1:  # Only downscale, never upscale
-                new_width = int(width * scale)
-                new_height = int(height * scale)
-                img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_AREA)
-        
+        """Final optimizations specifically for AWS Textract (size is already final)"""
         # Slight sharpening for text clarity
         kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
         img = cv2.filter2D(img, -1, kernel)
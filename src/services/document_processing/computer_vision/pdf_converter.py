@@ -4,10 +4,23 @@ Convert enhanced images to PDF for Textract processing
 import img2pdf
 import io
 import logging
+import re
+from typing import List, Optional
 from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# Page objects in an uncompressed PDF body ("/Type /Pages" is the tree node)
+PAGE_OBJECT_PATTERN = re.compile(rb'/Type\s*/Page(?!s)')
+
+# Inputs img2pdf refuses to embed losslessly; these go through a PIL re-encode
+IMG2PDF_REJECTED = (
+    img2pdf.AlphaChannelError,
+    img2pdf.ImageOpenError,
+    img2pdf.JpegColorspaceError,
+    img2pdf.UnsupportedColorspaceError,
+)
+
 class ImageToPDFConverter:
     """Convert enhanced images to PDF format for Textract"""
     
@@ -27,46 +40,73 @@ class ImageToPDFConverter:
         Returns:
             PDF bytes ready for Textract
         """
-        try:
-            # Convert to PIL Image for validation
-            img = Image.open(io.BytesIO(image_bytes))
-            
-            # Ensure RGB mode (img2pdf requirement)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-                
-                # Convert back to bytes
-                img_buffer = io.BytesIO()
-                img.save(img_buffer, format='JPEG', quality=self.quality, dpi=(self.dpi, self.dpi))
-                image_bytes = img_buffer.getvalue()
+        return self.convert_pages_to_pdf([image_bytes])
+    
+    def convert_pages_to_pdf(self, pages: List[bytes]) -> bytes:
+        """
+        Convert enhanced page images to one PDF, one page per image, in order
+        
+        Args:
+            pages: Enhanced image bytes for each page
             
-            # Convert to PDF
-            pdf_bytes = img2pdf.convert(image_bytes)
+        Returns:
+            PDF bytes ready for Textract
+        """
+        try:
+            try:
+                # JPEG/PNG bytes are embedded as they are: no decode, no second lossy encode
+                pdf_bytes = img2pdf.convert(pages)
+            except IMG2PDF_REJECTED:
+                # Alpha channel, CMYK quirks, formats img2pdf cannot embed: re-encode as RGB JPEG
+                pdf_bytes = img2pdf.convert([self._to_rgb_jpeg(page) for page in pages])
             
-            logger.info(f"Successfully converted image to PDF: {len(pdf_bytes)} bytes")
+            logger.info(f"Successfully converted {len(pages)} image(s) to PDF: {len(pdf_bytes)} bytes")
             return pdf_bytes
             
         except Exception as e:
             logger.error(f"Error converting image to PDF: {str(e)}")
             raise
     
+    def _to_rgb_jpeg(self, image_bytes: bytes) -> bytes:
+        """Re-encode an image img2pdf cannot embed directly"""
+        img = Image.open(io.BytesIO(image_bytes))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        
+        img_buffer = io.BytesIO()
+        img.save(img_buffer, format='JPEG', quality=self.quality, dpi=(self.dpi, self.dpi))
+        return img_buffer.getvalue()
+    
     def validate_pdf_for_textract(self, pdf_bytes: bytes) -> bool:
         """Validate PDF meets Textract requirements"""
         try:
-            # Basic size validation (Textract limit: 5MB for synchronous, 500MB for async)
+            # Textract limit: 5MB for synchronous, 500MB for async jobs
             size_mb = len(pdf_bytes) / (1024 * 1024)
             
-            if size_mb > 5:
-                logger.warning(f"PDF size {size_mb:.2f}MB exceeds Textract sync limit")
-                return False
-            
             if size_mb > 500:
                 logger.error(f"PDF size {size_mb:.2f}MB exceeds Textract limits")
                 return False
             
+            if size_mb > 5:
+                logger.info(f"PDF size {size_mb:.2f}MB exceeds Textract sync limit, will use async job")
+            
             logger.info(f"PDF validation passed: {size_mb:.2f}MB")
             return True
             
         except Exception as e:
             logger.error(f"Error validating PDF: {str(e)}")
             return False
+    
+    def count_pages(self, pdf_bytes: bytes) -> Optional[int]:
+        """Number of pages in a PDF, None when it cannot be determined"""
+        try:
+            from PyPDF2 import PdfReader
+            return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not read PDF page tree: {str(e)}")
+        
+        # Fallback: count page objects (misses pages inside object streams)
+        pages = len(PAGE_OBJECT_PATTERN.findall(pdf_bytes))
+        return pages or None
@@ -7,7 +7,7 @@ import uuid
 from typing import Dict, Any, Optional, List
 from datetime import datetime, date
 from decimal import Decimal
-from sqlalchemy import select, update, delete, func
+from sqlalchemy import select, update, delete, func, insert, tuple_
 from sqlalchemy.orm import selectinload
 
 from ...config.settings import settings
@@ -18,15 +18,60 @@ from ...models.invoice import (
     SupplierInfo, CustomerInfo, InvoiceLineItem as InvoiceLineItemModel, 
     InvoiceTotals, PaymentInfo, ProcessedInvoice as ProcessedInvoiceModel
 )
-from .textract import TextractService
+from .textract import TextractService, TextractArtifactStore, get_textract_result_cache
+from .computer_vision.image_enhancer import DocumentImageEnhancer, PhotoQualityError, PhotoQualityReport
+from .computer_vision.pdf_converter import ImageToPDFConverter
+from .computer_vision.photo_pipeline import get_photo_pipeline_pool
+from ..job_queue.queue import InvoiceJobQueue
+from .pagination import encode_invoice_cursor, decode_invoice_cursor
 
 logger = logging.getLogger(__name__)
 
+# Columns needed for listings (never the textract_raw_response blob)
+LISTING_COLUMNS = (
+    ProcessedInvoice.id,
+    ProcessedInvoice.tenant_id,
+    ProcessedInvoice.original_filename,
+    ProcessedInvoice.file_size,
+    ProcessedInvoice.upload_timestamp,
+    ProcessedInvoice.processing_timestamp,
+    ProcessedInvoice.completion_timestamp,
+    ProcessedInvoice.status,
+    ProcessedInvoice.confidence_score,
+    ProcessedInvoice.error_message,
+    ProcessedInvoice.s3_key,
+    ProcessedInvoice.textract_job_id,
+    ProcessedInvoice.served_from_cache,
+)
+
+MAX_PAGE_SIZE = 100
+
+
+def page_size(limit: int) -> int:
+    """Listing limit clamped to 1..MAX_PAGE_SIZE"""
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+# Rows per multi-row INSERT (16 columns each, asyncpg allows 32767 parameters)
+LINE_ITEM_INSERT_BATCH = 1000
+
+# Core INSERTs send None as NULL; the ORM used to leave these to the Column default
+LINE_ITEM_DEFAULTS = {
+    column.name: column.default.arg
+    for column in InvoiceLineItem.__table__.columns
+    if column.default is not None and column.default.is_scalar
+}
+
 class InvoiceProcessorService:
     """Service for processing invoices with REAL Textract - FIXED"""
     
     def __init__(self):
         self.textract_service = TextractService()
+        self.result_cache = get_textract_result_cache()
+        self.job_queue = InvoiceJobQueue()
+        self.artifact_store = TextractArtifactStore()
+        self.photo_pipeline = get_photo_pipeline_pool()
+        self.quality_checker = DocumentImageEnhancer()
+        self.pdf_converter = ImageToPDFConverter()
     
     async def upload_and_process_invoice(
         self, 
@@ -61,8 +106,27 @@ class InvoiceProcessorService:
                 if tenant.invoices_processed_month >= tenant.max_invoices_month:
                     raise Exception(f"Monthly limit reached: {tenant.max_invoices_month} invoices")
                 
-                # Create invoice record
+                # Same bytes already OCR'd for this tenant? Reuse that result
+                content_hash = self.result_cache.content_hash(file_content)
+                cached = await self.result_cache.lookup(session, tenant_id, content_hash)
+                
+                # Create invoice record (a cache hit points at the original S3 object)
                 s3_key = f"invoices/{tenant_id}/{invoice_id}/{filename}"
+                if cached and cached.s3_key:
+                    s3_key = cached.s3_key
+                
+                # Upload to S3 for Textract (before the job exists, so a worker never misses it)
+                if not cached:
+                    try:
+                        await self.textract_service.upload_document(
+                            s3_bucket=settings.s3_document_bucket,
+                            s3_key=s3_key,
+                            content=file_content,
+                            content_type='application/pdf'
+                        )
+                        logger.info(f"File uploaded to S3: {s3_key}")
+                    except Exception as e:
+                        logger.warning(f"S3 upload failed, using mock processing: {str(e)}")
                 
                 invoice = ProcessedInvoice(
                     id=uuid.UUID(invoice_id),
@@ -71,26 +135,24 @@ class InvoiceProcessorService:
                     file_size=len(file_content),
                     s3_key=s3_key,
                     status="uploaded",
-                    upload_timestamp=datetime.utcnow()
+                    upload_timestamp=datetime.utcnow(),
+                    content_sha256=content_hash,
+                    served_from_cache=cached is not None
                 )
-                
                 session.add(invoice)
-                await session.commit()
                 
-                # Upload to S3 for Textract
-                try:
-                    self.textract_service.s3_client.put_object(
-                        Bucket=settings.s3_document_bucket,
-                        Key=s3_key,
-                        Body=file_content,
-                        ContentType='application/pdf'
-                    )
-                    logger.info(f"File uploaded to S3: {s3_key}")
-                except Exception as e:
-                    logger.warning(f"S3 upload failed, using mock processing: {str(e)}")
-                
-                # Start background processing
-                asyncio.create_task(self._process_invoice_with_textract(invoice_id, s3_key))
+                # Queue background processing (page count picks sync vs async Textract),
+                # committed together with the invoice row
+                loop = asyncio.get_running_loop()
+                page_count = await loop.run_in_executor(
+                    None, self.pdf_converter.count_pages, file_content
+                )
+                self.job_queue.enqueue(session, invoice_id, tenant_id, {
+                    's3_key': s3_key,
+                    'page_count': page_count,
+                    'cached_invoice_id': cached.invoice_id if cached else None
+                })
+                await session.commit()
                 
                 logger.info(f"Invoice uploaded: {invoice_id} for tenant {tenant_id}")
                 
@@ -98,7 +160,8 @@ class InvoiceProcessorService:
                     'invoice_id': invoice_id,
                     'tenant_id': tenant_id,
                     's3_key': s3_key,
-                    'status': 'uploaded'
+                    'status': 'uploaded',
+                    'served_from_cache': cached is not None
                 }
                 
             except Exception as e:
@@ -106,8 +169,36 @@ class InvoiceProcessorService:
                 logger.error(f"Error uploading invoice: {str(e)}")
                 raise
     
-    async def _process_invoice_with_textract(self, invoice_id: str, s3_key: str):
-        """Process invoice using REAL AWS Textract - FIXED"""
+    async def process_invoice_job(self, job, final_attempt: bool = True):
+        """Run a queued processing job (called by the worker)"""
+        payload = job.payload or {}
+        await self._process_invoice_with_textract(
+            str(job.invoice_id),
+            payload.get('s3_key'),
+            page_count=payload.get('page_count'),
+            cached_invoice_id=payload.get('cached_invoice_id'),
+            final_attempt=final_attempt,
+            job_id=job.id
+        )
+    
+    async def _process_invoice_with_textract(
+        self,
+        invoice_id: str,
+        s3_key: str,
+        page_count: Optional[int] = None,
+        cached_invoice_id: Optional[str] = None,
+        final_attempt: bool = True,
+        job_id: Optional[uuid.UUID] = None
+    ):
+        """
+        Process invoice using REAL AWS Textract - FIXED
+        
+        Errors are re-raised so the worker can retry; only the final
+        attempt falls back to mock data or marks the invoice failed.
+        The queue job is marked succeeded in the same transaction as the
+        results, and an already completed invoice is never processed
+        (or billed) again.
+        """
         async with AsyncSessionFactory() as session:
             try:
                 # Get invoice
@@ -120,6 +211,11 @@ class InvoiceProcessorService:
                     logger.error(f"Invoice not found for processing: {invoice_id}")
                     return
                 
+                # Retried job whose results were already committed
+                if invoice.status == "completed":
+                    logger.info(f"Invoice {invoice_id} already completed, skipping duplicate run")
+                    return
+                
                 # Update status to processing
                 invoice.status = "processing"
                 invoice.processing_timestamp = datetime.utcnow()
@@ -127,23 +223,53 @@ class InvoiceProcessorService:
                 
                 logger.info(f"Starting Textract processing for {invoice_id}")
                 
+                async def record_job_id(job_id: str):
+                    # Persist early so a long multi-page job can be traced
+                    invoice.textract_job_id = job_id
+                    await session.commit()
+                
+                pages_processed = page_count or 1
+                
+                # Duplicate upload: reuse the original invoice's OCR response
+                cached_response = None
+                if cached_invoice_id:
+                    cached_response = await self.artifact_store.load(session, cached_invoice_id)
+                    if cached_response is None:
+                        logger.info(f"Cached Textract response of {cached_invoice_id} is gone, running OCR")
+                
+                # Decided by what actually runs, not by the upload-time lookup
+                invoice.served_from_cache = cached_response is not None
+                invoice.cached_invoice_id = uuid.UUID(cached_invoice_id) if cached_response is not None else None
+                
+                raw_response = None
+                
                 try:
-                    # Call REAL Textract
-                    textract_result = await self.textract_service.analyze_invoice(
-                        s3_bucket=settings.s3_document_bucket,
-                        s3_key=s3_key
-                    )
+                    if cached_response is not None:
+                        # Duplicate upload: parse the stored response, no OCR call
+                        textract_result = self.textract_service.analyze_cached_response(cached_response)
+                    else:
+                        # Call REAL Textract (async job for multi-page / large PDFs)
+                        textract_result = await self.textract_service.analyze_invoice(
+                            s3_bucket=settings.s3_document_bucket,
+                            s3_key=s3_key,
+                            file_size=invoice.file_size,
+                            page_count=page_count,
+                            on_job_started=record_job_id
+                        )
+                    pages_processed = textract_result.get('pages') or pages_processed
                     
                     extracted_data = textract_result['extracted_data']
                     confidence_score = textract_result['confidence_score']
                     
                     logger.info(f"Textract completed for {invoice_id}, confidence: {confidence_score}")
                     
-                    # Store raw Textract response
-                    invoice.textract_raw_response = textract_result.get('textract_response')
+                    # Raw Textract response is stored in textract_artifacts below
+                    raw_response = textract_result.get('textract_response')
                     
                 except Exception as textract_error:
                     logger.warning(f"Textract failed for {invoice_id}: {str(textract_error)}")
+                    if not final_attempt:
+                        raise
                     logger.info("Falling back to mock data for development")
                     
                     # Fallback to mock data if Textract fails
@@ -156,70 +282,20 @@ class InvoiceProcessorService:
                 invoice.confidence_score = Decimal(str(confidence_score))
                 
                 # Update invoice fields with SAFE extraction
-                invoice.invoice_number = self._safe_extract(extracted_data, "invoice_number")
-                invoice.invoice_type = "factura_venta"
-                invoice.issue_date = self._safe_date(extracted_data.get("issue_date"))
-                invoice.due_date = self._safe_date(extracted_data.get("due_date"))
-                
-                # Supplier info
-                supplier = extracted_data.get("supplier") or {}
-                invoice.supplier_name = self._safe_extract(supplier, "company_name")
-                invoice.supplier_nit = self._safe_extract(supplier, "nit")
-                invoice.supplier_address = self._safe_extract(supplier, "address")
-                invoice.supplier_city = self._safe_extract(supplier, "city")
-                invoice.supplier_department = self._safe_extract(supplier, "department")
-                invoice.supplier_phone = self._safe_extract(supplier, "phone")
-                
-                # Customer info
-                customer = extracted_data.get("customer") or {}
-                invoice.customer_name = self._safe_extract(customer, "customer_name")
-                invoice.customer_id = self._safe_extract(customer, "customer_id")
-                invoice.customer_address = self._safe_extract(customer, "address")
-                invoice.customer_city = self._safe_extract(customer, "city")
-                invoice.customer_department = self._safe_extract(customer, "department")
-                invoice.customer_phone = self._safe_extract(customer, "phone")
-                
-                # Totals
-                totals = extracted_data.get("totals") or {}
-                invoice.subtotal = self._safe_decimal(totals.get("subtotal"))
-                invoice.iva_rate = self._safe_decimal(totals.get("iva_rate"))
-                invoice.iva_amount = self._safe_decimal(totals.get("iva_amount"))
-                invoice.total_amount = self._safe_decimal(totals.get("total"))
-                
-                # Payment info
-                payment_info = extracted_data.get("payment_info") or {}
-                invoice.payment_method = self._safe_extract(payment_info, "payment_method")
-                invoice.credit_days = self._safe_int(payment_info.get("credit_days"))
+                for column, value in self._invoice_field_values(extracted_data).items():
+                    setattr(invoice, column, value)
                 
                 # Create line items
                 line_items = extracted_data.get("line_items") or []
-                invoice.total_items = len(line_items)
-                
-                for item_data in line_items:
-                    if item_data and item_data.get("description"):
-                        try:
-                            line_item = InvoiceLineItem(
-                                invoice_id=invoice.id,
-                                line_number=self._safe_int(item_data.get("item_number")),
-                                product_code=self._safe_extract(item_data, "product_code"),
-                                description=self._safe_extract(item_data, "description"),
-                                reference=self._safe_extract(item_data, "reference"),
-                                quantity=self._safe_decimal(item_data.get("quantity")),
-                                unit_price=self._safe_decimal(item_data.get("unit_price")),
-                                subtotal=self._safe_decimal(item_data.get("subtotal")),
-                                unit_measure=self._safe_extract(item_data, "unit_measure"), 
-                                
-                                # ✨ NEW: Enhanced fields for unit conversions
-                                original_quantity=self._safe_decimal(item_data.get("original_quantity")),
-                                original_unit=self._safe_extract(item_data, "original_unit"),
-                                unit_multiplier=self._safe_decimal(item_data.get("unit_multiplier")),
-                                item_number=self._safe_int(item_data.get("item_number")),
-                                enhancement_applied=self._safe_extract(item_data, "_enhancement_applied")
-                            )
-                            session.add(line_item)
-                        except Exception as e:
-                            logger.warning(f"Error creating line item: {str(e)}")
-                            logger.warning(f"Item data: {item_data}")
+                
+                # One multi-row INSERT instead of an ORM flush per line
+                await self._bulk_insert_line_items(
+                    session, self._build_line_item_rows(invoice.id, line_items)
+                )
+                
+                # A reused response stays stored once, under the original invoice
+                if raw_response and cached_response is None:
+                    await self.artifact_store.save(session, invoice.id, invoice.tenant_id, raw_response)
                 
                 # Update tenant invoice count
                 await session.execute(
@@ -232,13 +308,16 @@ class InvoiceProcessorService:
                 billing_record = BillingRecord(
                     tenant_id=invoice.tenant_id,
                     invoice_id=invoice.id,
-                    cost_cop=Decimal("1500"),
+                    cost_cop=Decimal("0") if cached_response is not None else Decimal("1500"),
                     invoice_type=invoice.invoice_type,
-                    pages_processed=1,
+                    pages_processed=pages_processed,
                     confidence_score=invoice.confidence_score
                 )
                 session.add(billing_record)
                 
+                if job_id is not None:
+                    await self.job_queue.mark_succeeded(session, job_id)
+                
                 await session.commit()
                 
                 logger.info(f"Invoice processing completed and SAVED: {invoice_id}")
@@ -247,17 +326,100 @@ class InvoiceProcessorService:
                 await session.rollback()
                 logger.error(f"Error processing invoice {invoice_id}: {str(e)}")
                 
-                # Update status to failed
+                # Failed on the last attempt, otherwise back to uploaded until the retry
                 try:
                     async with AsyncSessionFactory() as error_session:
                         await error_session.execute(
                             update(ProcessedInvoice)
                             .where(ProcessedInvoice.id == uuid.UUID(invoice_id))
-                            .values(status="failed", error_message=str(e))
+                            .values(status="failed" if final_attempt else "uploaded", error_message=str(e))
                         )
                         await error_session.commit()
                 except Exception as save_error:
                     logger.error(f"Could not save error status: {str(save_error)}")
+                raise
+    
+    def _invoice_field_values(self, extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+        """processed_invoices column values for an extraction result"""
+        supplier = extracted_data.get("supplier") or {}
+        customer = extracted_data.get("customer") or {}
+        totals = extracted_data.get("totals") or {}
+        payment_info = extracted_data.get("payment_info") or {}
+        
+        return {
+            'invoice_number': self._safe_extract(extracted_data, "invoice_number"),
+            'invoice_type': "factura_venta",
+            'issue_date': self._safe_date(extracted_data.get("issue_date")),
+            'due_date': self._safe_date(extracted_data.get("due_date")),
+            
+            # Supplier info
+            'supplier_name': self._safe_extract(supplier, "company_name"),
+            'supplier_nit': self._safe_extract(supplier, "nit"),
+            'supplier_address': self._safe_extract(supplier, "address"),
+            'supplier_city': self._safe_extract(supplier, "city"),
+            'supplier_department': self._safe_extract(supplier, "department"),
+            'supplier_phone': self._safe_extract(supplier, "phone"),
+            
+            # Customer info
+            'customer_name': self._safe_extract(customer, "customer_name"),
+            'customer_id': self._safe_extract(customer, "customer_id"),
+            'customer_address': self._safe_extract(customer, "address"),
+            'customer_city': self._safe_extract(customer, "city"),
+            'customer_department': self._safe_extract(customer, "department"),
+            'customer_phone': self._safe_extract(customer, "phone"),
+            
+            # Totals
+            'subtotal': self._safe_decimal(totals.get("subtotal")),
+            'iva_rate': self._safe_decimal(totals.get("iva_rate")),
+            'iva_amount': self._safe_decimal(totals.get("iva_amount")),
+            'total_amount': self._safe_decimal(totals.get("total")),
+            
+            # Payment info
+            'payment_method': self._safe_extract(payment_info, "payment_method"),
+            'credit_days': self._safe_int(payment_info.get("credit_days")),
+            
+            'total_items': len(extracted_data.get("line_items") or []),
+        }
+    
+    def _build_line_item_rows(self, invoice_id: uuid.UUID, line_items: List[Dict]) -> List[Dict[str, Any]]:
+        """Column dicts for invoice_line_items, skipping items without description"""
+        rows = []
+        for item_data in line_items:
+            if item_data and item_data.get("description"):
+                try:
+                    rows.append({
+                        'id': uuid.uuid4(),
+                        'invoice_id': invoice_id,
+                        'line_number': self._safe_int(item_data.get("item_number")),
+                        'product_code': self._safe_extract(item_data, "product_code"),
+                        'description': self._safe_extract(item_data, "description"),
+                        'reference': self._safe_extract(item_data, "reference"),
+                        'quantity': self._safe_decimal(item_data.get("quantity")),
+                        'unit_price': self._safe_decimal(item_data.get("unit_price")),
+                        'subtotal': self._safe_decimal(item_data.get("subtotal")),
+                        'unit_measure': self._safe_extract(item_data, "unit_measure"),
+                        'is_priced': False,
+                        
+                        # ✨ NEW: Enhanced fields for unit conversions
+                        'original_quantity': self._safe_decimal(item_data.get("original_quantity")),
+                        'original_unit': self._safe_extract(item_data, "original_unit"),
+                        'unit_multiplier': self._safe_decimal(item_data.get("unit_multiplier")),
+                        'item_number': self._safe_int(item_data.get("item_number")),
+                        'enhancement_applied': self._safe_extract(item_data, "_enhancement_applied")
+                    })
+                    for column, default in LINE_ITEM_DEFAULTS.items():
+                        if rows[-1].get(column) is None:
+                            rows[-1][column] = default
+                except Exception as e:
+                    logger.warning(f"Error creating line item: {str(e)}")
+                    logger.warning(f"Item data: {item_data}")
+        return rows
+    
+    async def _bulk_insert_line_items(self, session, rows: List[Dict[str, Any]]) -> None:
+        """Insert line items with multi-row INSERTs (one statement per batch)"""
+        table = InvoiceLineItem.__table__
+        for start in range(0, len(rows), LINE_ITEM_INSERT_BATCH):
+            await session.execute(insert(table).values(rows[start:start + LINE_ITEM_INSERT_BATCH]))
     
     def _safe_extract(self, data: Dict, key: str) -> Optional[str]:
         """Safely extract string value"""
@@ -331,13 +493,13 @@ class InvoiceProcessorService:
     async def get_invoice_status(self, invoice_id: str, tenant_id: str) -> Optional[ProcessedInvoiceModel]:
         async with AsyncSessionFactory() as session:
             try:
+                # Status polling only needs the summary columns
                 result = await session.execute(
-                    select(ProcessedInvoice)
-                    .options(selectinload(ProcessedInvoice.line_items))
+                    select(*LISTING_COLUMNS)
                     .where(ProcessedInvoice.id == uuid.UUID(invoice_id))
                     .where(ProcessedInvoice.tenant_id == tenant_id)
                 )
-                invoice = result.scalar_one_or_none()
+                invoice = result.first()
                 
                 if not invoice:
                     return None
@@ -348,6 +510,15 @@ class InvoiceProcessorService:
                 logger.error(f"Error getting invoice status: {str(e)}")
                 return None
     
+    async def get_textract_raw_response(self, invoice_id: str, tenant_id: str) -> Optional[Dict[str, Any]]:
+        """Raw Textract response for debugging (loaded only on request)"""
+        async with AsyncSessionFactory() as session:
+            try:
+                return await self.artifact_store.load_for_invoice(session, invoice_id, tenant_id)
+            except Exception as e:
+                logger.error(f"Error loading Textract response for {invoice_id}: {str(e)}")
+                return None
+    
     async def get_invoice_data(self, invoice_id: str, tenant_id: str) -> Optional[InvoiceData]:
         async with AsyncSessionFactory() as session:
             try:
@@ -429,28 +600,89 @@ class InvoiceProcessorService:
         offset: int = 0,
         status: Optional[InvoiceStatus] = None
     ) -> List[ProcessedInvoiceModel]:
+        """OFFSET listing (kept for existing clients; prefer list_tenant_invoices_page)"""
         async with AsyncSessionFactory() as session:
             try:
                 query = (
-                    select(ProcessedInvoice)
+                    select(*LISTING_COLUMNS)
                     .where(ProcessedInvoice.tenant_id == tenant_id)
-                    .order_by(ProcessedInvoice.upload_timestamp.desc())
-                    .offset(offset)
-                    .limit(limit)
+                    .order_by(ProcessedInvoice.upload_timestamp.desc(), ProcessedInvoice.id.desc())
+                    .offset(max(offset, 0))
+                    .limit(page_size(limit))
                 )
                 
                 if status:
                     query = query.where(ProcessedInvoice.status == status.value)
                 
                 result = await session.execute(query)
-                invoices = result.scalars().all()
                 
-                return [self._convert_to_pydantic(invoice) for invoice in invoices]
+                return [self._convert_to_pydantic(row) for row in result.all()]
                 
             except Exception as e:
                 logger.error(f"Error listing invoices: {str(e)}")
                 return []
     
+    def build_listing_query(
+        self,
+        tenant_id: str,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        status: Optional[InvoiceStatus] = None
+    ):
+        """Keyset page query: newest first, continuing after ``cursor``"""
+        query = (
+            select(*LISTING_COLUMNS)
+            .where(ProcessedInvoice.tenant_id == tenant_id)
+            .order_by(ProcessedInvoice.upload_timestamp.desc(), ProcessedInvoice.id.desc())
+            .limit(page_size(limit) + 1)  # One extra row tells if there is a next page
+        )
+        
+        if cursor:
+            last_timestamp, last_id = decode_invoice_cursor(cursor)
+            query = query.where(
+                tuple_(ProcessedInvoice.upload_timestamp, ProcessedInvoice.id) < tuple_(last_timestamp, last_id)
+            )
+        
+        if status:
+            query = query.where(ProcessedInvoice.status == status.value)
+        
+        return query
+    
+    async def list_tenant_invoices_page(
+        self,
+        tenant_id: str,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        status: Optional[InvoiceStatus] = None
+    ) -> Dict[str, Any]:
+        """
+        Cursor-paginated invoice listing
+        
+        Returns {'invoices': [...], 'next_cursor': token or None}. Raises
+        ValueError for a malformed cursor.
+        """
+        limit = page_size(limit)
+        query = self.build_listing_query(tenant_id, limit, cursor, status)
+        
+        async with AsyncSessionFactory() as session:
+            try:
+                result = await session.execute(query)
+                rows = result.all()
+                
+                next_cursor = None
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = encode_invoice_cursor(rows[-1].upload_timestamp, rows[-1].id)
+                
+                return {
+                    'invoices': [self._convert_to_pydantic(row) for row in rows],
+                    'next_cursor': next_cursor
+                }
+                
+            except Exception as e:
+                logger.error(f"Error listing invoices: {str(e)}")
+                raise
+    
     async def delete_invoice(self, invoice_id: str, tenant_id: str) -> bool:
         async with AsyncSessionFactory() as session:
             try:
@@ -473,7 +705,8 @@ class InvoiceProcessorService:
                 logger.error(f"Error deleting invoice: {str(e)}")
                 return False
     
-    def _convert_to_pydantic(self, invoice: ProcessedInvoice) -> ProcessedInvoiceModel:
+    def _convert_to_pydantic(self, invoice) -> ProcessedInvoiceModel:
+        """ProcessedInvoice row (ORM object or LISTING_COLUMNS row) to the API model"""
         return ProcessedInvoiceModel(
             id=str(invoice.id),
             tenant_id=invoice.tenant_id,
@@ -486,7 +719,8 @@ class InvoiceProcessorService:
             confidence_score=float(invoice.confidence_score) if invoice.confidence_score else None,
             error_message=invoice.error_message,
             s3_key=invoice.s3_key,
-            textract_job_id=invoice.textract_job_id
+            textract_job_id=invoice.textract_job_id,
+            served_from_cache=bool(invoice.served_from_cache)
         )
 
     async def upload_and_process_photo(
@@ -497,7 +731,23 @@ class InvoiceProcessorService:
         photo_content: bytes
     ) -> Dict[str, Any]:
         """Upload photo, enhance it, convert to PDF, and process with Textract"""
-        from .computer_vision import DocumentImageEnhancer, ImageToPDFConverter
+        return await self.upload_and_process_photos(tenant_id, invoice_id, filename, [photo_content])
+    
+    async def upload_and_process_photos(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+        filename: str,
+        photos: List[bytes]
+    ) -> Dict[str, Any]:
+        """
+        Upload photos of one invoice (one per page), enhance them in parallel,
+        assemble a multi-page PDF, and process it with Textract as one invoice
+        
+        Raises PhotoQualityError (before any DB, S3 or Textract work) when a
+        photo fails the quality gate and PHOTO_QUALITY_GATE is "reject".
+        """
+        quality_reports = await self.check_photo_quality(photos)
         
         async with AsyncSessionFactory() as session:
             try:
@@ -524,52 +774,59 @@ class InvoiceProcessorService:
                 if tenant.invoices_processed_month >= tenant.max_invoices_month:
                     raise Exception(f"Monthly limit reached: {tenant.max_invoices_month} invoices")
                 
-                # Step 1: Enhance the photo
-                logger.info(f"Enhancing photo for invoice {invoice_id}")
-                enhancer = DocumentImageEnhancer()
-                enhanced_image_bytes = enhancer.enhance_invoice_photo(photo_content)
+                # Same photo(s) already OCR'd for this tenant? Skip enhancement and Textract
+                content_hash = self.result_cache.content_hash_pages(photos)
+                cached = await self.result_cache.lookup(session, tenant_id, content_hash)
                 
-                # Step 2: Convert to PDF
-                logger.info(f"Converting enhanced image to PDF for invoice {invoice_id}")
-                pdf_converter = ImageToPDFConverter()
-                pdf_content = pdf_converter.convert_to_pdf(enhanced_image_bytes)
-                
-                # Validate PDF for Textract
-                if not pdf_converter.validate_pdf_for_textract(pdf_content):
-                    raise Exception("Generated PDF does not meet Textract requirements")
-                
-                # Step 3: Create invoice record
                 # Use PDF filename for consistency with existing pipeline
                 pdf_filename = f"{filename.rsplit('.', 1)[0]}_enhanced.pdf"
                 s3_key = f"invoices/{tenant_id}/{invoice_id}/{pdf_filename}"
                 
+                if cached:
+                    s3_key = cached.s3_key or s3_key
+                    pdf_content = None
+                else:
+                    # Steps 1-2: Enhance the photos (in parallel) and convert to PDF on the CV process pool
+                    logger.info(f"Enhancing {len(photos)} photo(s) for invoice {invoice_id}")
+                    pdf_content = await self.photo_pipeline.enhance_pages_to_pdf(
+                        photos, grayscale=bool(tenant.photo_grayscale)
+                    )
+                
+                # Step 3: Upload PDF to S3 for Textract
+                if not cached:
+                    try:
+                        await self.textract_service.upload_document(
+                            s3_bucket=settings.s3_document_bucket,
+                            s3_key=s3_key,
+                            content=pdf_content,
+                            content_type='application/pdf'
+                        )
+                        logger.info(f"Enhanced PDF uploaded to S3: {s3_key}")
+                    except Exception as e:
+                        logger.warning(f"S3 upload failed, using mock processing: {str(e)}")
+                
+                # Step 4: Create invoice record
                 invoice = ProcessedInvoice(
                     id=uuid.UUID(invoice_id),
                     tenant_id=tenant_id,
                     original_filename=pdf_filename,  # Store as PDF name
-                    file_size=len(pdf_content),
+                    file_size=len(pdf_content) if pdf_content is not None else sum(len(photo) for photo in photos),
                     s3_key=s3_key,
                     status="uploaded",
-                    upload_timestamp=datetime.utcnow()
+                    upload_timestamp=datetime.utcnow(),
+                    content_sha256=content_hash,
+                    served_from_cache=cached is not None
                 )
-                
                 session.add(invoice)
-                await session.commit()
-                
-                # Step 4: Upload PDF to S3 for Textract
-                try:
-                    self.textract_service.s3_client.put_object(
-                        Bucket=settings.s3_document_bucket,
-                        Key=s3_key,
-                        Body=pdf_content,
-                        ContentType='application/pdf'
-                    )
-                    logger.info(f"Enhanced PDF uploaded to S3: {s3_key}")
-                except Exception as e:
-                    logger.warning(f"S3 upload failed, using mock processing: {str(e)}")
                 
-                # Step 5: Start background processing with Textract
-                asyncio.create_task(self._process_invoice_with_textract(invoice_id, s3_key))
+                # Step 5: Queue background processing with Textract (one page per photo),
+                # committed together with the invoice row
+                self.job_queue.enqueue(session, invoice_id, tenant_id, {
+                    's3_key': s3_key,
+                    'page_count': len(photos),
+                    'cached_invoice_id': cached.invoice_id if cached else None
+                })
+                await session.commit()
                 
                 logger.info(f"Photo processed and uploaded: {invoice_id} for tenant {tenant_id}")
                 
@@ -578,7 +835,10 @@ class InvoiceProcessorService:
                     'tenant_id': tenant_id,
                     's3_key': s3_key,
                     'status': 'uploaded',
-                    'processing_method': 'photo_enhancement'
+                    'processing_method': 'photo_enhancement',
+                    'pages': len(photos),
+                    'quality_warnings': self._quality_warnings(quality_reports),
+                    'served_from_cache': cached is not None
                 }
                 
             except Exception as e:
@@ -586,6 +846,43 @@ class InvoiceProcessorService:
                 logger.error(f"Error processing photo: {str(e)}")
                 raise
 
+    async def check_photo_quality(self, photos: List[bytes]) -> List[PhotoQualityReport]:
+        """
+        Quality reports for each photo, checked in parallel off the event loop
+        
+        In "reject" mode the first unusable photo raises PhotoQualityError;
+        in "warn" mode problems are only reported; "off" skips the check.
+        """
+        if settings.photo_quality_gate == "off":
+            return []
+        
+        loop = asyncio.get_running_loop()
+        reports = await asyncio.gather(*[
+            loop.run_in_executor(None, self.quality_checker.assess_photo_quality, photo)
+            for photo in photos
+        ])
+        
+        for page, report in enumerate(reports, start=1):
+            if report.errors or report.warnings:
+                logger.info(
+                    f"Photo {page} quality: errors={report.errors} warnings={report.warnings} "
+                    f"({report.elapsed_ms}ms)"
+                )
+            if report.errors and settings.photo_quality_gate == "reject":
+                raise PhotoQualityError(report, page)
+        return reports
+    
+    @staticmethod
+    def _quality_warnings(reports: List[PhotoQualityReport]) -> List[str]:
+        """Flat warning list; multi-photo uploads prefix the page number"""
+        if len(reports) == 1:
+            return reports[0].warnings + reports[0].errors
+        return [
+            f"page {page}: {problem}"
+            for page, report in enumerate(reports, start=1)
+            for problem in report.warnings + report.errors
+        ]
+    
     async def get_pricing_data(self, invoice_id: str, tenant_id: str) -> Optional[Dict[str, Any]]:
         """Get invoice data formatted for manual pricing - FIXED"""
         async with AsyncSessionFactory() as session:
@@ -662,52 +959,57 @@ class InvoiceProcessorService:
         """Set manual pricing for line items"""
         async with AsyncSessionFactory() as session:
             try:
-                # Get line items to update
-                line_items_data = pricing_data.get('line_items', [])
-                
-                updated_items = 0
-                total_cost = Decimal('0')
-                total_sale_value = Decimal('0')
-                
-                for item_data in line_items_data:
+                # Requested sale price per line item (last entry wins on duplicates)
+                sale_prices: Dict[uuid.UUID, Decimal] = {}
+                for item_data in pricing_data.get('line_items', []):
                     line_item_id = item_data.get('line_item_id')
                     sale_price = item_data.get('sale_price')
                     
                     if not line_item_id or not sale_price:
                         continue
-                    
-                    # Get the line item
+                    sale_prices[uuid.UUID(line_item_id)] = Decimal(str(sale_price))
+                
+                updated_items = 0
+                total_cost = Decimal('0')
+                total_sale_value = Decimal('0')
+                updates = []
+                
+                if sale_prices:
+                    # Load every requested line item in one query
                     result = await session.execute(
-                        select(InvoiceLineItem)
-                        .where(InvoiceLineItem.id == uuid.UUID(line_item_id))
+                        select(
+                            InvoiceLineItem.id,
+                            InvoiceLineItem.unit_price,
+                            InvoiceLineItem.quantity,
+                            InvoiceLineItem.subtotal
+                        )
+                        .where(InvoiceLineItem.id.in_(list(sale_prices)))
                         .where(InvoiceLineItem.invoice_id == uuid.UUID(invoice_id))
                     )
-                    line_item = result.scalar_one_or_none()
                     
-                    if line_item:
+                    for line_item in result.all():
+                        sale_price = sale_prices[line_item.id]
+                        
                         # Calculate markup percentage
                         cost_per_unit = line_item.unit_price
-                        markup = ((Decimal(str(sale_price)) - cost_per_unit) / cost_per_unit) * 100
+                        markup = ((sale_price - cost_per_unit) / cost_per_unit) * 100
                         
-                        # Update line item
-                        await session.execute(
-                            update(InvoiceLineItem)
-                            .where(InvoiceLineItem.id == line_item.id)
-                            .values(
-                                sale_price=Decimal(str(sale_price)),
-                                markup_percentage=markup,
-                                is_priced=True
-                            )
-                        )
+                        updates.append({
+                            'id': line_item.id,
+                            'sale_price': sale_price,
+                            'markup_percentage': markup,
+                            'is_priced': True
+                        })
                         
                         # Calculate totals
-                        item_cost = line_item.subtotal
-                        item_sale_value = Decimal(str(sale_price)) * line_item.quantity
-                        
-                        total_cost += item_cost
-                        total_sale_value += item_sale_value
+                        total_cost += line_item.subtotal
+                        total_sale_value += sale_price * line_item.quantity
                         updated_items += 1
                 
+                if updates:
+                    # Bulk UPDATE by primary key (one executemany round-trip)
+                    await session.execute(update(InvoiceLineItem), updates)
+                
                 # Update invoice pricing status
                 await session.execute(
                     update(ProcessedInvoice)
@@ -0,0 +1,25 @@
+"""
+Opaque keyset cursors for invoice listings
+A cursor encodes the (upload_timestamp, id) of the last row of a page
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_invoice_cursor(upload_timestamp: datetime, invoice_id: uuid.UUID) -> str:
+    """URL-safe token for the row a page ended on"""
+    raw = json.dumps([upload_timestamp.isoformat(), str(invoice_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_invoice_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of encode_invoice_cursor; raises ValueError on malformed tokens"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, invoice_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), uuid.UUID(invoice_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
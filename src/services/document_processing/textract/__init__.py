@@ -2,5 +2,17 @@
 AWS Textract integration services
 """
 from .textract_service import TextractService
+from .document_index import TextractDocumentIndex
+from .artifact_store import TextractArtifactStore
+from .archive import encode_textract_response, decode_textract_response
+from .result_cache import TextractResultCache, get_textract_result_cache
 
-__all__ = ['TextractService']
+__all__ = [
+    'TextractService',
+    'TextractDocumentIndex',
+    'TextractArtifactStore',
+    'encode_textract_response',
+    'decode_textract_response',
+    'TextractResultCache',
+    'get_textract_result_cache'
+]
@@ -0,0 +1,406 @@
+"""
+Compact columnar archive format for raw Textract responses
+Block ids are interned to integers, geometry is packed into float arrays
+and the whole body is compressed with zstd (zlib when zstandard is missing)
+"""
+import json
+import struct
+import uuid
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - exercised only without the wheel
+    zstandard = None
+
+MAGIC = b"TXA1"
+CODEC_ZSTD = 1
+CODEC_ZLIB = 2
+ZSTD_LEVEL = 10
+
+# Optional block keys with a typed column, in the order blocks are rebuilt.
+# Anything else (or a value of an unexpected shape) is kept verbatim in extras.
+FIELDS = (
+    'Confidence', 'Text', 'TextType', 'RowIndex', 'ColumnIndex', 'RowSpan',
+    'ColumnSpan', 'Geometry', 'Id', 'Relationships', 'EntityTypes',
+    'SelectionStatus', 'Page'
+)
+_BIT = {name: 1 << position for position, name in enumerate(FIELDS)}
+_INT_FIELDS = ('RowIndex', 'ColumnIndex', 'RowSpan', 'ColumnSpan', 'Page')
+_VOCAB_FIELDS = ('TextType', 'SelectionStatus')
+_BOX_KEYS = ('Width', 'Height', 'Left', 'Top')
+
+
+class _Vocab:
+    """String interning: value -> small integer, in first-seen order"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def __call__(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+def _is_int(value) -> bool:
+    return type(value) is int and -2**31 <= value < 2**31
+
+
+def _standard_geometry(geometry) -> bool:
+    """BoundingBox + Polygon of X/Y points, nothing else"""
+    if not isinstance(geometry, dict) or geometry.keys() != {'BoundingBox', 'Polygon'}:
+        return False
+    box, polygon = geometry['BoundingBox'], geometry['Polygon']
+    if not isinstance(box, dict) or box.keys() != set(_BOX_KEYS):
+        return False
+    if not all(type(box[key]) is float for key in _BOX_KEYS):
+        return False
+    return isinstance(polygon, list) and len(polygon) < 2**16 and all(
+        isinstance(point, dict) and point.keys() == {'X', 'Y'}
+        and type(point['X']) is float and type(point['Y']) is float
+        for point in polygon
+    )
+
+
+def _standard_relationships(relationships) -> bool:
+    return isinstance(relationships, list) and len(relationships) < 256 and all(
+        isinstance(rel, dict) and rel.keys() == {'Type', 'Ids'}
+        and isinstance(rel['Type'], str) and isinstance(rel['Ids'], list)
+        and all(isinstance(target, str) for target in rel['Ids'])
+        for rel in relationships
+    )
+
+
+def _float_column(values: List[float]) -> Tuple[str, bytes]:
+    """
+    float32 when every value survives the round trip (Textract itself emits
+    float32 values), float64 otherwise. Bytes are shuffled so the exponent
+    bytes of neighbouring values sit together, which zstd compresses far better.
+    """
+    array = np.asarray(values, dtype=np.float64)
+    narrow = array.astype(np.float32)
+    if np.array_equal(narrow.astype(np.float64), array):
+        array = narrow
+    dtype = array.dtype.str
+    shuffled = array.view(np.uint8).reshape(-1, array.itemsize).T
+    return dtype, shuffled.tobytes()
+
+
+def _read_float_column(dtype: str, data: bytes) -> List[float]:
+    itemsize = np.dtype(dtype).itemsize
+    raw = np.frombuffer(data, dtype=np.uint8).reshape(itemsize, -1).T
+    return np.ascontiguousarray(raw).view(dtype).ravel().astype(np.float64).tolist()
+
+
+def _delta_column(values: List[int]) -> Tuple[str, bytes]:
+    """Interned ids are mostly consecutive; their differences compress to almost nothing"""
+    array = np.asarray(values, dtype=np.int64)
+    return 'delta', np.diff(array, prepend=0).astype(np.int32).tobytes()
+
+
+def _read_delta_column(data: bytes) -> List[int]:
+    return np.cumsum(np.frombuffer(data, dtype=np.int32), dtype=np.int64).tolist()
+
+
+def _pack_strings(values: List[str]) -> Tuple[bytes, bytes]:
+    encoded = [value.encode('utf-8') for value in values]
+    lengths = np.fromiter((len(value) for value in encoded), dtype=np.uint32, count=len(encoded))
+    return lengths.tobytes(), b''.join(encoded)
+
+
+def _unpack_strings(lengths: bytes, blob: bytes) -> List[str]:
+    text = blob.decode('utf-8')
+    if text.isascii():
+        # Byte lengths equal character lengths: slice the str directly
+        source = text
+    else:
+        source = None
+    out = []
+    position = 0
+    for length in np.frombuffer(lengths, dtype=np.uint32).tolist():
+        end = position + length
+        out.append(source[position:end] if source is not None else blob[position:end].decode('utf-8'))
+        position = end
+    return out
+
+
+def _compress(body: bytes) -> Tuple[int, bytes]:
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return CODEC_ZLIB, zlib.compress(body, 9)
+
+
+def _decompress(codec: int, payload: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Textract archive is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload)
+    raise ValueError(f"Unknown Textract archive codec {codec}")
+
+
+def encode_textract_response(textract_response: Dict[str, Any]) -> bytes:
+    """Pack a Textract response (AnalyzeDocument or merged async pages) into an archive"""
+    blocks = textract_response.get('Blocks', [])
+    block_types = _Vocab()
+    relationship_types = _Vocab()
+    entity_types = _Vocab()
+    vocabs = {field: _Vocab() for field in _VOCAB_FIELDS}
+
+    # Block ids first, in block order, so a block's own id index is its position
+    id_values = _Vocab()
+    for block in blocks:
+        block_id = block.get('Id')
+        if isinstance(block_id, str):
+            id_values(block_id)
+
+    type_column, mask_column = [], []
+    confidences, texts, boxes, polygon_sizes, polygon_points = [], [], [], [], []
+    ints = {field: [] for field in _INT_FIELDS}
+    vocab_columns = {field: [] for field in _VOCAB_FIELDS}
+    own_ids, rel_counts, rel_types, rel_sizes, rel_targets = [], [], [], [], []
+    entity_counts, entity_values = [], []
+    extras: Dict[str, Dict[str, Any]] = {}
+
+    for position, block in enumerate(blocks):
+        mask = 0
+        extra = {}
+        for key, value in block.items():
+            if key == 'BlockType' and isinstance(value, str):
+                continue
+            if key == 'Confidence' and type(value) is float:
+                confidences.append(value)
+                mask |= _BIT[key]
+            elif key == 'Text' and isinstance(value, str):
+                texts.append(value)
+                mask |= _BIT[key]
+            elif key in _INT_FIELDS and _is_int(value):
+                ints[key].append(value)
+                mask |= _BIT[key]
+            elif key in _VOCAB_FIELDS and isinstance(value, str):
+                vocab_columns[key].append(vocabs[key](value))
+                mask |= _BIT[key]
+            elif key == 'Geometry' and _standard_geometry(value):
+                box = value['BoundingBox']
+                boxes.extend(box[name] for name in _BOX_KEYS)
+                polygon_sizes.append(len(value['Polygon']))
+                for point in value['Polygon']:
+                    polygon_points.append(point['X'])
+                    polygon_points.append(point['Y'])
+                mask |= _BIT[key]
+            elif key == 'Id' and isinstance(value, str):
+                own_ids.append(id_values(value))
+                mask |= _BIT[key]
+            elif key == 'Relationships' and _standard_relationships(value):
+                rel_counts.append(len(value))
+                for rel in value:
+                    rel_types.append(relationship_types(rel['Type']))
+                    rel_sizes.append(len(rel['Ids']))
+                    rel_targets.extend(id_values(target) for target in rel['Ids'])
+                mask |= _BIT[key]
+            elif key == 'EntityTypes' and isinstance(value, list) and len(value) < 256 \
+                    and all(isinstance(entity, str) for entity in value):
+                entity_counts.append(len(value))
+                entity_values.extend(entity_types(entity) for entity in value)
+                mask |= _BIT[key]
+            else:
+                extra[key] = value
+        block_type = block.get('BlockType')
+        type_column.append(block_types(block_type) if isinstance(block_type, str) else 0xFF)
+        mask_column.append(mask)
+        if extra:
+            extras[str(position)] = extra
+
+    columns: Dict[str, Tuple[str, bytes]] = {}
+
+    def add(name: str, dtype, values) -> None:
+        columns[name] = (np.dtype(dtype).str, np.asarray(values, dtype=dtype).tobytes())
+
+    add('block_type', np.uint8, type_column)
+    add('mask', np.uint16, mask_column)
+    columns['confidence'] = _float_column(confidences)
+    text_lengths, text_blob = _pack_strings(texts)
+    columns['text_lengths'] = ('<u4', text_lengths)
+    columns['text'] = ('utf8', text_blob)
+    for field in _INT_FIELDS:
+        add(field, np.int32, ints[field])
+    for field in _VOCAB_FIELDS:
+        add(field, np.uint8, vocab_columns[field])
+    columns['boxes'] = _float_column(boxes)
+    add('polygon_sizes', np.uint16, polygon_sizes)
+    columns['polygon_points'] = _float_column(polygon_points)
+    columns['own_ids'] = _delta_column(own_ids)
+    add('rel_counts', np.uint8, rel_counts)
+    add('rel_types', np.uint8, rel_types)
+    add('rel_sizes', np.uint32, rel_sizes)
+    columns['rel_targets'] = _delta_column(rel_targets)
+    add('entity_counts', np.uint8, entity_counts)
+    add('entity_values', np.uint8, entity_values)
+
+    # UUID ids (the normal case) as 16 raw bytes each, anything else as strings
+    try:
+        uuid_ids = all(str(uuid.UUID(value)) == value for value in id_values.values)
+    except ValueError:
+        uuid_ids = False
+    if uuid_ids:
+        columns['ids'] = ('uuid', b''.join(uuid.UUID(value).bytes for value in id_values.values))
+    else:
+        id_lengths, id_blob = _pack_strings(id_values.values)
+        columns['id_lengths'] = ('<u4', id_lengths)
+        columns['ids'] = ('utf8', id_blob)
+
+    document = {key: value for key, value in textract_response.items() if key != 'Blocks'}
+    manifest = {
+        'blocks': len(blocks),
+        'has_blocks': 'Blocks' in textract_response,
+        'document': document,
+        'block_types': block_types.values,
+        'relationship_types': relationship_types.values,
+        'entity_types': entity_types.values,
+        'vocabs': {field: vocab.values for field, vocab in vocabs.items()},
+        'extras': extras,
+        'columns': [],
+    }
+    buffers = []
+    for name, (dtype, data) in columns.items():
+        manifest['columns'].append([name, dtype, len(data)])
+        buffers.append(data)
+
+    manifest_bytes = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+    body = struct.pack('<I', len(manifest_bytes)) + manifest_bytes + b''.join(buffers)
+    codec, payload = _compress(body)
+    return MAGIC + bytes([codec]) + payload
+
+
+def is_textract_archive(data: Optional[bytes]) -> bool:
+    return bool(data) and bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def decode_textract_response(archive: bytes, geometry: bool = True) -> Dict[str, Any]:
+    """
+    Rebuild the Textract response packed by encode_textract_response
+
+    ``geometry=False`` skips Geometry, which no extractor reads; re-parsing
+    invoices is then cheaper than json.loads of the original document.
+    """
+    archive = bytes(archive)
+    if not is_textract_archive(archive):
+        raise ValueError("Not a Textract archive")
+    body = _decompress(archive[len(MAGIC)], archive[len(MAGIC) + 1:])
+
+    manifest_size = struct.unpack_from('<I', body)[0]
+    manifest = json.loads(body[4:4 + manifest_size])
+    raw: Dict[str, Tuple[str, bytes]] = {}
+    position = 4 + manifest_size
+    for name, dtype, size in manifest['columns']:
+        raw[name] = (dtype, body[position:position + size])
+        position += size
+
+    def ints(name: str) -> List[int]:
+        dtype, data = raw[name]
+        return np.frombuffer(data, dtype=dtype).tolist()
+
+    if raw['ids'][0] == 'uuid':
+        data = raw['ids'][1]
+        # Formatting the hex dump directly is several times faster than uuid.UUID
+        digits = data.hex()
+        ids = [
+            f"{digits[i:i + 8]}-{digits[i + 8:i + 12]}-{digits[i + 12:i + 16]}-{digits[i + 16:i + 20]}-{digits[i + 20:i + 32]}"
+            for i in range(0, len(digits), 32)
+        ]
+    else:
+        ids = _unpack_strings(raw['id_lengths'][1], raw['ids'][1])
+
+    block_types = manifest['block_types']
+    relationship_types = manifest['relationship_types']
+    entity_types = manifest['entity_types']
+    extras = manifest['extras']
+
+    confidences = iter(_read_float_column(*raw['confidence']))
+    texts = iter(_unpack_strings(raw['text_lengths'][1], raw['text'][1]))
+    int_columns = {field: iter(ints(field)) for field in _INT_FIELDS}
+    vocab_columns = {
+        field: iter([manifest['vocabs'][field][index] for index in ints(field)])
+        for field in _VOCAB_FIELDS
+    }
+    own_ids = iter(_read_delta_column(raw['own_ids'][1]))
+    rel_counts = iter(ints('rel_counts'))
+    rel_types = iter(ints('rel_types'))
+    rel_sizes = iter(ints('rel_sizes'))
+    rel_targets = _read_delta_column(raw['rel_targets'][1])
+    entity_counts = iter(ints('entity_counts'))
+    entity_values = iter(ints('entity_values'))
+    if geometry:
+        # Build every Geometry dict in bulk comprehensions, then hand them out in order
+        values = iter(_read_float_column(*raw['boxes']))
+        boxes = [
+            {'Width': width, 'Height': height, 'Left': left, 'Top': top}
+            for width, height, left, top in zip(values, values, values, values)
+        ]
+        values = iter(_read_float_column(*raw['polygon_points']))
+        points = [{'X': x, 'Y': y} for x, y in zip(values, values)]
+        geometries = []
+        start = 0
+        for box, size in zip(boxes, ints('polygon_sizes')):
+            geometries.append({'BoundingBox': box, 'Polygon': points[start:start + size]})
+            start += size
+        geometries = iter(geometries)
+
+    # Bit tests hoisted out of the loop
+    confidence_bit, text_bit, geometry_bit = _BIT['Confidence'], _BIT['Text'], _BIT['Geometry']
+    id_bit, relationships_bit, entity_bit = _BIT['Id'], _BIT['Relationships'], _BIT['EntityTypes']
+    int_bits = [(field, _BIT[field], int_columns[field]) for field in _INT_FIELDS]
+    vocab_bits = [(field, _BIT[field], vocab_columns[field]) for field in _VOCAB_FIELDS]
+    before_geometry = [entry for entry in vocab_bits if entry[0] == 'TextType'] + int_bits[:4]
+    after_geometry = [entry for entry in vocab_bits if entry[0] != 'TextType'] + int_bits[4:]
+    target_position = 0
+
+    blocks = []
+    for position, (type_index, mask) in enumerate(zip(ints('block_type'), ints('mask'))):
+        block = {} if type_index == 0xFF else {'BlockType': block_types[type_index]}
+        if mask & confidence_bit:
+            block['Confidence'] = next(confidences)
+        if mask & text_bit:
+            block['Text'] = next(texts)
+        for field, bit, column in before_geometry:
+            if mask & bit:
+                block[field] = next(column)
+        if mask & geometry_bit:
+            if geometry:
+                block['Geometry'] = next(geometries)
+        if mask & id_bit:
+            block['Id'] = ids[next(own_ids)]
+        if mask & relationships_bit:
+            relationships = []
+            for _ in range(next(rel_counts)):
+                end = target_position + next(rel_sizes)
+                relationships.append({
+                    'Type': relationship_types[next(rel_types)],
+                    'Ids': [ids[index] for index in rel_targets[target_position:end]]
+                })
+                target_position = end
+            block['Relationships'] = relationships
+        if mask & entity_bit:
+            block['EntityTypes'] = [entity_types[next(entity_values)] for _ in range(next(entity_counts))]
+        for field, bit, column in after_geometry:
+            if mask & bit:
+                block[field] = next(column)
+        extra = extras.get(str(position)) if extras else None
+        if extra:
+            if not geometry:
+                extra = {key: value for key, value in extra.items() if key != 'Geometry'}
+            block.update(extra)
+        blocks.append(block)
+
+    response = dict(manifest['document'])
+    if manifest['has_blocks']:
+        response['Blocks'] = blocks
+    return response
@@ -0,0 +1,91 @@
+"""
+Storage for raw Textract responses
+Kept in textract_artifacts, one row per invoice, fetched only on demand.
+New rows hold the compact archive format; rows written before it keep JSONB.
+"""
+import logging
+import uuid
+from typing import Dict, Any, Optional, Union
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ....database.models import ProcessedInvoice, TextractArtifact
+from .archive import encode_textract_response, decode_textract_response
+
+logger = logging.getLogger(__name__)
+
+# Invoice whose artifact holds an invoice's response: the original one for cache hits
+ARTIFACT_OWNER_ID = func.coalesce(ProcessedInvoice.cached_invoice_id, ProcessedInvoice.id)
+
+
+def _as_uuid(invoice_id: Union[str, uuid.UUID]) -> uuid.UUID:
+    return invoice_id if isinstance(invoice_id, uuid.UUID) else uuid.UUID(invoice_id)
+
+
+class TextractArtifactStore:
+    """Save and lazily load the raw Textract response of an invoice"""
+
+    async def save(
+        self,
+        session: AsyncSession,
+        invoice_id: Union[str, uuid.UUID],
+        tenant_id: str,
+        textract_response: Dict[str, Any]
+    ) -> None:
+        """Insert or replace the artifact (caller commits)"""
+        statement = insert(TextractArtifact).values(
+            invoice_id=_as_uuid(invoice_id),
+            tenant_id=tenant_id,
+            archive=encode_textract_response(textract_response),
+            raw_response=None
+        )
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[TextractArtifact.invoice_id],
+                set_={'archive': statement.excluded.archive, 'raw_response': None}
+            )
+        )
+
+    async def load(
+        self,
+        session: AsyncSession,
+        invoice_id: Union[str, uuid.UUID],
+        tenant_id: Optional[str] = None,
+        geometry: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Raw Textract response of an invoice, or None (``geometry=False`` skips block geometry)"""
+        query = (
+            select(TextractArtifact.archive, TextractArtifact.raw_response)
+            .where(TextractArtifact.invoice_id == _as_uuid(invoice_id))
+        )
+        if tenant_id is not None:
+            query = query.where(TextractArtifact.tenant_id == tenant_id)
+
+        result = await session.execute(query)
+        return self._decode(result.first(), geometry)
+
+    async def load_for_invoice(
+        self,
+        session: AsyncSession,
+        invoice_id: Union[str, uuid.UUID],
+        tenant_id: str,
+        geometry: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Like load(), but a cache-served invoice resolves to its original's artifact"""
+        result = await session.execute(
+            select(TextractArtifact.archive, TextractArtifact.raw_response)
+            .join(ProcessedInvoice, TextractArtifact.invoice_id == ARTIFACT_OWNER_ID)
+            .where(ProcessedInvoice.id == _as_uuid(invoice_id))
+            .where(ProcessedInvoice.tenant_id == tenant_id)
+        )
+        return self._decode(result.first(), geometry)
+
+    @staticmethod
+    def _decode(row, geometry: bool) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        if row.archive is not None:
+            return decode_textract_response(row.archive, geometry=geometry)
+        return row.raw_response
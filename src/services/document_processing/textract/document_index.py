@@ -0,0 +1,115 @@
+"""
+Single-pass index over a Textract response
+Built once per response and shared by every extractor in TextractService
+"""
+from typing import Dict, Any, List, Optional
+
+
+class TextractDocumentIndex:
+    """
+    Index of Textract blocks built in one linear pass
+
+    Buckets blocks by BlockType (document order is kept), resolves CHILD and
+    VALUE relationships into id lists and accumulates confidence. Word text
+    per block is resolved lazily and cached, so each block's text is joined
+    at most once no matter how many extractors ask for it.
+    """
+
+    def __init__(self, textract_response: Dict[str, Any]):
+        self.blocks: Dict[str, Dict] = {}
+        self.by_type: Dict[str, List[Dict]] = {}
+        self.children: Dict[str, List[str]] = {}
+        self.values: Dict[str, List[str]] = {}
+        self.lines: List[str] = []
+        self.pages = textract_response.get('DocumentMetadata', {}).get('Pages', 0)
+
+        self._confidence_total = 0.0
+        self._confidence_count = 0
+        self._text_cache: Dict[str, str] = {}
+
+        self.add_blocks(textract_response.get('Blocks', []))
+
+    def add_blocks(self, blocks: List[Dict]) -> None:
+        """Index blocks in one pass (also used when blocks arrive page by page)"""
+        # Locals keep the per-block loop tight on responses with 100k+ blocks
+        self.blocks.update({block['Id']: block for block in blocks})
+        by_type = self.by_type
+        children = self.children
+        values = self.values
+        lines = self.lines
+        confidence_total = self._confidence_total
+        confidence_count = self._confidence_count
+
+        for block in blocks:
+            block_type = block.get('BlockType')
+            try:
+                by_type[block_type].append(block)
+            except KeyError:
+                by_type[block_type] = [block]
+
+            confidence = block.get('Confidence')
+            if confidence:
+                confidence_total += confidence
+                confidence_count += 1
+
+            # WORDs are the bulk of a response and have no relationships
+            if block_type == 'WORD':
+                continue
+
+            relationships = block.get('Relationships')
+            if relationships:
+                block_id = block['Id']
+                for relationship in relationships:
+                    rel_type = relationship.get('Type')
+                    if rel_type == 'CHILD':
+                        target = children
+                    elif rel_type == 'VALUE':
+                        target = values
+                    else:
+                        continue
+                    ids = relationship.get('Ids', [])
+                    previous = target.get(block_id)
+                    target[block_id] = ids if previous is None else previous + ids
+
+            if block_type == 'LINE':
+                text = block.get('Text', '').strip()
+                if text:
+                    lines.append(text)
+
+        self._confidence_total = confidence_total
+        self._confidence_count = confidence_count
+
+    def get(self, block_id: str) -> Optional[Dict]:
+        """Block by id"""
+        return self.blocks.get(block_id)
+
+    def blocks_of_type(self, block_type: str) -> List[Dict]:
+        """All blocks of a type, in document order"""
+        return self.by_type.get(block_type, [])
+
+    def text_of(self, block_id: str) -> str:
+        """Space-joined text of the WORD children of a block (cached)"""
+        cached = self._text_cache.get(block_id)
+        if cached is not None:
+            return cached
+
+        text_parts = []
+        for child_id in self.children.get(block_id, ()):
+            child = self.blocks.get(child_id)
+            if child and child.get('BlockType') == 'WORD':
+                text_parts.append(child.get('Text', ''))
+
+        text = ' '.join(text_parts)
+        self._text_cache[block_id] = text
+        return text
+
+    @property
+    def block_count(self) -> int:
+        return sum(len(bucket) for bucket in self.by_type.values())
+
+    @property
+    def average_confidence(self) -> float:
+        """Mean block confidence scaled to 0-1 (0.0 when no block has one)"""
+        if self._confidence_count:
+            return self._confidence_total / self._confidence_count / 100.0
+        return 0.0
@@ -0,0 +1,187 @@
+"""
+Declarative field rules for Colombian invoice text lines
+All rules are evaluated in a single pass over the Textract lines
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Pattern, Tuple
+
+FIRST_MATCH = 'first'  # Keep the first hit, stop evaluating the rule
+LAST_MATCH = 'last'    # Every hit overwrites the previous one
+
+# Shared patterns
+AMOUNT_PATTERN = re.compile(r'[\$]?\s*([\d,]+)')
+PERCENT_PATTERN = re.compile(r'(\d+)%')
+DATE_PATTERNS = (
+    re.compile(r'(\d{1,2}[/-]\d{1,2}[/-]\d{4})'),
+    re.compile(r'(\d{4}[/-]\d{1,2}[/-]\d{1,2})'),
+    re.compile(r'(\d{1,2}\s+de\s+\w+\s+de\s+\d{4})'),
+)
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """
+    How to pull one field out of the invoice lines
+
+    A line is a candidate when its upper-cased text contains any of
+    ``triggers`` (or the rule has none), none of ``excludes`` and is longer
+    than ``min_length``. The value is group 1 of the first pattern that
+    matches the original line, or the whole line when there are no patterns.
+    """
+    name: str
+    patterns: Tuple[Pattern, ...] = ()
+    triggers: Tuple[str, ...] = ()
+    excludes: Tuple[str, ...] = ()
+    mode: str = FIRST_MATCH
+    min_length: int = 0
+
+    def match(self, line: str, upper_line: str) -> Optional[str]:
+        """Value for this line, or None when the line does not apply"""
+        if self.triggers and not any(trigger in upper_line for trigger in self.triggers):
+            return None
+        return self.match_triggered(line, upper_line)
+
+    def match_triggered(self, line: str, upper_line: str) -> Optional[str]:
+        """Like match() for a line already known to contain a trigger"""
+        if self.excludes and any(exclude in upper_line for exclude in self.excludes):
+            return None
+        if len(line) <= self.min_length:
+            return None
+
+        if not self.patterns:
+            return line
+
+        for pattern in self.patterns:
+            match = pattern.search(line)
+            if match:
+                return match.group(1)
+        return None
+
+
+def date_rule(name: str, keyword: str) -> FieldRule:
+    """First date found on a line mentioning ``keyword``"""
+    return FieldRule(name, patterns=DATE_PATTERNS, triggers=(keyword.upper(),))
+
+
+COLOMBIAN_INVOICE_RULES: Tuple[FieldRule, ...] = (
+    # Document info
+    FieldRule(
+        'invoice_number',
+        patterns=(
+            re.compile(r'(?:FACTURA|INVOICE|No\.?|#)\s*:?\s*([A-Z0-9]+)', re.IGNORECASE),
+            re.compile(r'PMB(\d+)', re.IGNORECASE),  # Specific pattern from Casoli invoices
+            re.compile(r'(?:REF|REFERENCIA)\s*:?\s*([A-Z0-9]+)', re.IGNORECASE),
+        ),
+        # Pre-filter only: every pattern needs one of these in the line
+        triggers=('FACTURA', 'INVOICE', 'NO', '#', 'PMB', 'REF'),
+    ),
+    date_rule('issue_date', 'fecha'),
+    date_rule('due_date', 'vencimiento'),
+
+    # Supplier
+    FieldRule(
+        'supplier_nit',
+        patterns=(re.compile(r'NIT\s*:?\s*([0-9-]+)', re.IGNORECASE),),
+        triggers=('NIT',),
+        mode=LAST_MATCH,
+    ),
+    FieldRule(
+        'supplier_name',
+        triggers=('LTDA', 'S.A.S', 'EMPRESA', 'COMERCIAL'),
+        min_length=10,
+    ),
+
+    # Customer
+    FieldRule(
+        'customer_name',
+        patterns=(re.compile(r':([^:]*)'),),
+        triggers=('CLIENTE', 'NOMBRE'),
+        mode=LAST_MATCH,
+    ),
+    FieldRule('customer_phone', patterns=(re.compile(r'(\d{10})'),)),
+
+    # Totals
+    FieldRule('subtotal', patterns=(AMOUNT_PATTERN,), triggers=('SUBTOTAL',), mode=LAST_MATCH),
+    FieldRule('iva_amount', patterns=(AMOUNT_PATTERN,), triggers=('IVA',), mode=LAST_MATCH),
+    FieldRule('iva_rate', patterns=(PERCENT_PATTERN,), triggers=('IVA',), mode=LAST_MATCH),
+    FieldRule(
+        'total',
+        patterns=(AMOUNT_PATTERN,),
+        triggers=('TOTAL',),
+        excludes=('SUBTOTAL',),
+        mode=LAST_MATCH,
+    ),
+
+    # Payment
+    FieldRule('payment_method', triggers=('CREDITO',), mode=LAST_MATCH),
+    FieldRule(
+        'credit_days',
+        patterns=(re.compile(r'(\d+)\s*DIAS?', re.IGNORECASE),),
+        triggers=('CREDITO',),
+        mode=LAST_MATCH,
+    ),
+    FieldRule(
+        'discount_percentage',
+        patterns=(PERCENT_PATTERN,),
+        triggers=('DESCUENTO', 'DCTO'),
+        mode=LAST_MATCH,
+    ),
+)
+
+
+class FieldRuleExtractor:
+    """Evaluate a rule table over invoice lines in one pass"""
+
+    def __init__(self, rules: Tuple[FieldRule, ...] = COLOMBIAN_INVOICE_RULES):
+        self.rules = rules
+
+        # Trigger keyword -> indexes of the rules it wakes up
+        self._rules_by_trigger: Dict[str, List[int]] = {}
+        self._untriggered: List[int] = []
+        for position, rule in enumerate(rules):
+            if not rule.triggers:
+                self._untriggered.append(position)
+            for trigger in rule.triggers:
+                self._rules_by_trigger.setdefault(trigger, []).append(position)
+        self._triggers = tuple(self._rules_by_trigger)
+
+    def extract(self, lines: List[str]) -> Dict[str, Any]:
+        """
+        Raw string value per rule name (None when the rule never matched)
+
+        Each line is upper-cased once and checked once per distinct trigger
+        keyword; only the rules woken up by a keyword (plus the ones without
+        triggers) run their patterns. FIRST_MATCH rules drop out as soon as
+        they hit.
+        """
+        rules = self.rules
+        rules_by_trigger = self._rules_by_trigger
+        triggers = self._triggers
+        untriggered = list(self._untriggered)
+        finished = set()
+        results: Dict[str, Any] = {rule.name: None for rule in rules}
+
+        for line in lines:
+            upper_line = line.upper()
+            candidates = set(untriggered)
+            for trigger in triggers:
+                if trigger in upper_line:
+                    candidates.update(rules_by_trigger[trigger])
+            if not candidates:
+                continue
+
+            for position in candidates:
+                if position in finished:
+                    continue
+                rule = rules[position]
+                value = rule.match_triggered(line, upper_line)
+                if value is None:
+                    continue
+                results[rule.name] = value
+                if rule.mode == FIRST_MATCH:
+                    finished.add(position)
+                    if position in untriggered:
+                        untriggered.remove(position)
+
+        return results
@@ -0,0 +1,125 @@
+"""
+Content-addressed cache of Textract results
+Identical uploads (same tenant, same bytes) reuse the stored OCR response
+"""
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ....config.settings import settings
+from ....database.models import ProcessedInvoice, TextractArtifact
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedTextractResult:
+    """A previous OCR run that can serve a duplicate upload"""
+    invoice_id: str
+    s3_key: Optional[str]
+
+
+class TextractResultCache:
+    """
+    Per-tenant SHA-256 cache backed by processed_invoices
+
+    The cache is the invoices table itself: a completed invoice whose own
+    Textract call finished within the TTL is a hit for any later upload of
+    the same bytes by the same tenant. Hit/miss counters are per process.
+    """
+
+    def __init__(self, ttl_hours: Optional[int] = None, enabled: Optional[bool] = None):
+        self.ttl = timedelta(hours=ttl_hours if ttl_hours is not None else settings.textract_cache_ttl_hours)
+        self.enabled = settings.textract_cache_enabled if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        """Hex SHA-256 of the uploaded bytes"""
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def content_hash_pages(pages: List[bytes]) -> str:
+        """
+        Hex SHA-256 identifying a multi-file upload (same files, same order)
+
+        A single file hashes exactly like content_hash. Each file is length
+        prefixed, so moving bytes across a page boundary changes the hash.
+        """
+        if len(pages) == 1:
+            return TextractResultCache.content_hash(pages[0])
+        digest = hashlib.sha256()
+        for page in pages:
+            digest.update(len(page).to_bytes(8, 'big'))
+            digest.update(page)
+        return digest.hexdigest()
+
+    async def lookup(
+        self,
+        session: AsyncSession,
+        tenant_id: str,
+        content_hash: str
+    ) -> Optional[CachedTextractResult]:
+        """Most recent reusable OCR result for these bytes, or None"""
+        if not self.enabled:
+            return None
+
+        try:
+            # Savepoint: a failed lookup must not abort the caller's transaction
+            async with session.begin_nested():
+                result = await session.execute(
+                    # The raw response itself is loaded later, by the worker
+                    select(ProcessedInvoice.id, ProcessedInvoice.s3_key)
+                    .join(TextractArtifact, TextractArtifact.invoice_id == ProcessedInvoice.id)
+                    .where(ProcessedInvoice.tenant_id == tenant_id)
+                    .where(ProcessedInvoice.content_sha256 == content_hash)
+                    .where(ProcessedInvoice.status == "completed")
+                    .where(ProcessedInvoice.served_from_cache.is_(False))
+                    .where(ProcessedInvoice.completion_timestamp >= datetime.utcnow() - self.ttl)
+                    .order_by(ProcessedInvoice.completion_timestamp.desc())
+                    .limit(1)
+                )
+                row = result.first()
+        except Exception as e:
+            # A broken cache must never block an upload
+            logger.warning(f"Textract cache lookup failed: {str(e)}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        logger.info(f"Textract cache hit for tenant {tenant_id}: reusing invoice {row.id}")
+        return CachedTextractResult(
+            invoice_id=str(row.id),
+            s3_key=row.s3_key
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for health/metrics endpoints"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'ttl_hours': self.ttl.total_seconds() / 3600,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+# Singleton instance
+_result_cache_instance = None
+
+def get_textract_result_cache() -> TextractResultCache:
+    """Get singleton instance of the Textract result cache"""
+    global _result_cache_instance
+    if _result_cache_instance is None:
+        _result_cache_instance = TextractResultCache()
+    return _result_cache_instance
@@ -1,33 +1,100 @@
 """
 AWS Textract service for Colombian invoice processing
 """
+import asyncio
 import boto3
+import functools
 import logging
 import json
 import re
-from typing import Dict, Any, List, Optional, Tuple
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
 from decimal import Decimal
 from datetime import datetime, date
 
 from ....config.settings import settings
 from .textract_enhancer import enhance_textract_response
+from .document_index import TextractDocumentIndex
+from .field_rules import FieldRuleExtractor, date_rule
 
 logger = logging.getLogger(__name__)
 
 class TextractService:
     """Service for AWS Textract document analysis"""
     
-    def __init__(self):
-        self.textract_client = boto3.client('textract', region_name=settings.aws_region)
-        self.s3_client = boto3.client('s3', region_name=settings.aws_region)
-    
-    async def analyze_invoice(self, s3_bucket: str, s3_key: str) -> Dict[str, Any]:
+    # date_type -> field rule name
+    DATE_FIELDS = {'fecha': 'issue_date', 'vencimiento': 'due_date'}
+    
+    FEATURE_TYPES = ['TABLES', 'FORMS']  # Extract tables and key-value pairs
+    MAX_RESULTS_PER_PAGE = 1000  # GetDocumentAnalysis upper bound
+    
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency or settings.aws_max_concurrency
+        
+        # Connection pool sized to the executor so no worker waits on a socket
+        client_config = Config(max_pool_connections=self.max_concurrency)
+        self.textract_client = boto3.client('textract', region_name=settings.aws_region, config=client_config)
+        self.s3_client = boto3.client('s3', region_name=settings.aws_region, config=client_config)
+        
+        # boto3 is blocking: run its calls on a bounded pool, never on the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="aws-io"
+        )
+        
+        # Compiled field rules, evaluated in one pass over the lines
+        self.field_extractor = FieldRuleExtractor()
+        
+        # Async job polling
+        self.poll_interval = settings.textract_poll_interval_seconds
+        self.job_timeout = settings.textract_job_timeout_seconds
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking boto3 call on the bounded AWS executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+    
+    async def upload_document(
+        self,
+        s3_bucket: str,
+        s3_key: str,
+        content: bytes,
+        content_type: str = 'application/pdf'
+    ) -> None:
+        """Upload a document to S3 without blocking the event loop"""
+        await self._run_blocking(
+            self.s3_client.put_object,
+            Bucket=s3_bucket,
+            Key=s3_key,
+            Body=content,
+            ContentType=content_type
+        )
+    
+    async def analyze_invoice(
+        self,
+        s3_bucket: str,
+        s3_key: str,
+        file_size: Optional[int] = None,
+        page_count: Optional[int] = None,
+        on_job_started: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
         """
         Analyze invoice using AWS Textract
         
+        Single-page documents within the sync limits go through
+        AnalyzeDocument; larger or multi-page ones run as an async
+        StartDocumentAnalysis job.
+        
         Args:
             s3_bucket: S3 bucket name
             s3_key: S3 object key
+            file_size: Document size in bytes, if known
+            page_count: Number of pages, if known
+            on_job_started: Awaited with the JobId when an async job starts
             
         Returns:
             Structured invoice data
@@ -35,56 +102,188 @@ class TextractService:
         try:
             logger.info(f"Starting Textract analysis for {s3_key}")
             
-            # Call Textract
-            response = self.textract_client.analyze_document(
-                Document={
-                    'S3Object': {
-                        'Bucket': s3_bucket,
-                        'Name': s3_key
-                    }
-                },
-                FeatureTypes=['TABLES', 'FORMS']  # Extract tables and key-value pairs
-            )
+            if self._requires_async_analysis(file_size, page_count):
+                return await self.analyze_invoice_async(s3_bucket, s3_key, on_job_started)
             
-            logger.info(f"Textract analysis completed for {s3_key}")
+            try:
+                # Call Textract (off the event loop)
+                response = await self._run_blocking(
+                    self.textract_client.analyze_document,
+                    Document={
+                        'S3Object': {
+                            'Bucket': s3_bucket,
+                            'Name': s3_key
+                        }
+                    },
+                    FeatureTypes=self.FEATURE_TYPES
+                )
+            except ClientError as e:
+                # Page count was unknown and the PDF turned out multi-page
+                if e.response.get('Error', {}).get('Code') != 'UnsupportedDocumentException':
+                    raise
+                logger.info(f"Sync Textract rejected {s3_key}, switching to async job")
+                return await self.analyze_invoice_async(s3_bucket, s3_key, on_job_started)
             
-            # Extract structured data
-            extracted_data = self._extract_invoice_data(response)
+            logger.info(f"Textract analysis completed for {s3_key}")
             
-            return {
-                'textract_response': response,
-                'extracted_data': extracted_data,
-                'confidence_score': self._calculate_confidence(response)
-            }
+            # Index blocks once, shared by all extractors
+            return self._build_analysis_result(response, TextractDocumentIndex(response))
             
         except Exception as e:
             logger.error(f"Textract analysis failed for {s3_key}: {str(e)}")
             raise
+    
+    def _requires_async_analysis(self, file_size: Optional[int], page_count: Optional[int]) -> bool:
+        """Pick async job mode for documents the sync API cannot take"""
+        if file_size and file_size > settings.textract_sync_max_bytes:
+            return True
+        if page_count and page_count > settings.textract_sync_max_pages:
+            return True
+        return False
+    
+    async def analyze_invoice_async(
+        self,
+        s3_bucket: str,
+        s3_key: str,
+        on_job_started: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Analyze a (multi-page) invoice with an async Textract job"""
+        job_id = await self.start_document_analysis(s3_bucket, s3_key)
+        logger.info(f"Textract job {job_id} started for {s3_key}")
+        
+        if on_job_started:
+            await on_job_started(job_id)
+        
+        # Result pages are indexed as they arrive, while the next one is fetched
+        index = TextractDocumentIndex({})
+        blocks: List[Dict] = []
+        metadata: Dict[str, Any] = {}
+        
+        async for page in self.iter_document_analysis(job_id):
+            page_blocks = page.get('Blocks', [])
+            index.add_blocks(page_blocks)
+            blocks.extend(page_blocks)
+            metadata = page.get('DocumentMetadata') or metadata
+        
+        index.pages = metadata.get('Pages', 0)
+        response = {
+            'DocumentMetadata': metadata,
+            'JobId': job_id,
+            'Blocks': blocks
+        }
+        
+        logger.info(f"Textract job {job_id} completed: {index.pages} pages, {len(blocks)} blocks")
+        return self._build_analysis_result(response, index, job_id)
+    
+    async def start_document_analysis(self, s3_bucket: str, s3_key: str) -> str:
+        """Start an async Textract analysis job, return its JobId"""
+        response = await self._run_blocking(
+            self.textract_client.start_document_analysis,
+            DocumentLocation={
+                'S3Object': {
+                    'Bucket': s3_bucket,
+                    'Name': s3_key
+                }
+            },
+            FeatureTypes=self.FEATURE_TYPES
+        )
+        return response['JobId']
+    
+    async def iter_document_analysis(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Wait for an async job, then yield its result pages
+        
+        Follows NextToken until the last page; each yielded dict is one
+        GetDocumentAnalysis response.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.job_timeout
+        
+        while True:
+            response = await self._run_blocking(
+                self.textract_client.get_document_analysis,
+                JobId=job_id,
+                MaxResults=self.MAX_RESULTS_PER_PAGE
+            )
+            status = response.get('JobStatus')
+            if status != 'IN_PROGRESS':
+                break
+            if loop.time() > deadline:
+                raise TimeoutError(f"Textract job {job_id} still running after {self.job_timeout}s")
+            await asyncio.sleep(self.poll_interval)
+        
+        if status == 'FAILED':
+            raise Exception(f"Textract job {job_id} failed: {response.get('StatusMessage')}")
+        if status == 'PARTIAL_SUCCESS':
+            logger.warning(f"Textract job {job_id} partially succeeded: {response.get('Warnings')}")
+        
+        yield response
+        
+        next_token = response.get('NextToken')
+        while next_token:
+            response = await self._run_blocking(
+                self.textract_client.get_document_analysis,
+                JobId=job_id,
+                MaxResults=self.MAX_RESULTS_PER_PAGE,
+                NextToken=next_token
+            )
+            yield response
+            next_token = response.get('NextToken')
+    
+    def analyze_cached_response(self, textract_response: Dict[str, Any]) -> Dict[str, Any]:
+        """Re-parse a stored Textract response (no AWS call)"""
+        index = TextractDocumentIndex(textract_response)
+        return self._build_analysis_result(textract_response, index, textract_response.get('JobId'))
+    
+    def _build_analysis_result(
+        self,
+        response: Dict[str, Any],
+        index: TextractDocumentIndex,
+        job_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Structured result shared by the sync and async paths"""
+        # Extract structured data
+        extracted_data = self._extract_invoice_data(response, index)
+        
+        return {
+            'textract_response': response,
+            'extracted_data': extracted_data,
+            'confidence_score': self._calculate_confidence(response, index),
+            'job_id': job_id,
+            'pages': index.pages or 1
+        }
      
-    def _extract_invoice_data(self, textract_response: Dict[str, Any]) -> Dict[str, Any]:
+    def _extract_invoice_data(
+        self,
+        textract_response: Dict[str, Any],
+        index: Optional[TextractDocumentIndex] = None
+    ) -> Dict[str, Any]:
         """Extract structured data from Textract response"""
-        blocks = textract_response.get('Blocks', [])
+        index = index or TextractDocumentIndex(textract_response)
     
         # Get all text lines
-        lines = self._get_text_lines(blocks)
+        lines = self._get_text_lines(index)
         full_text = '\n'.join(lines)
     
         # Extract key-value pairs
-        key_values = self._extract_key_values(blocks)
+        key_values = self._extract_key_values(index)
     
         # Extract tables
-        tables = self._extract_tables(blocks)
+        tables = self._extract_tables(index)
+        
+        # Match every line-based field in a single pass
+        fields = self.field_extractor.extract(lines)
     
         # Parse Colombian invoice fields
         raw_invoice_data = {
-            'invoice_number': self._extract_invoice_number(lines, key_values),
-            'issue_date': self._extract_date(lines, key_values, 'fecha'),
-            'due_date': self._extract_date(lines, key_values, 'vencimiento'),
-            'supplier': self._extract_supplier_info(lines, key_values),
-            'customer': self._extract_customer_info(lines, key_values),
+            'invoice_number': self._extract_invoice_number(lines, key_values, fields),
+            'issue_date': self._extract_date(lines, key_values, 'fecha', fields),
+            'due_date': self._extract_date(lines, key_values, 'vencimiento', fields),
+            'supplier': self._extract_supplier_info(lines, key_values, fields),
+            'customer': self._extract_customer_info(lines, key_values, fields),
             'line_items': self._extract_line_items(tables, lines),
-            'totals': self._extract_totals(lines, key_values),
-            'payment_info': self._extract_payment_info(lines, key_values),
+            'totals': self._extract_totals(lines, key_values, fields),
+            'payment_info': self._extract_payment_info(lines, key_values, fields),
             'full_text': full_text,
             'raw_tables': tables,
             'raw_key_values': key_values
@@ -123,91 +322,57 @@ class TextractService:
         
         
     
-    def _get_text_lines(self, blocks: List[Dict]) -> List[str]:
+    def _get_text_lines(self, index: TextractDocumentIndex) -> List[str]:
         """Extract all text lines from blocks"""
-        lines = []
-        for block in blocks:
-            if block.get('BlockType') == 'LINE':
-                text = block.get('Text', '').strip()
-                if text:
-                    lines.append(text)
-        return lines
-    
-    def _extract_key_values(self, blocks: List[Dict]) -> Dict[str, str]:
+        return list(index.lines)
+    
+    def _extract_key_values(self, index: TextractDocumentIndex) -> Dict[str, str]:
         """Extract key-value pairs from forms"""
         key_values = {}
         
-        # Map block IDs to blocks for relationship lookup
-        block_map = {block['Id']: block for block in blocks}
-        
-        for block in blocks:
-            if block.get('BlockType') == 'KEY_VALUE_SET':
-                entity_types = block.get('EntityTypes', [])
+        for block in index.blocks_of_type('KEY_VALUE_SET'):
+            if 'KEY' in block.get('EntityTypes', []):
+                key_text = self._get_text_from_block(block, index)
                 
-                if 'KEY' in entity_types:
-                    # Find the corresponding VALUE
-                    relationships = block.get('Relationships', [])
-                    key_text = self._get_text_from_block(block, block_map)
-                    
-                    for relationship in relationships:
-                        if relationship.get('Type') == 'VALUE':
-                            value_ids = relationship.get('Ids', [])
-                            for value_id in value_ids:
-                                value_block = block_map.get(value_id)
-                                if value_block:
-                                    value_text = self._get_text_from_block(value_block, block_map)
-                                    if key_text and value_text:
-                                        key_values[key_text.lower()] = value_text
+                # Find the corresponding VALUE
+                for value_id in index.values.get(block.get('Id'), ()):
+                    value_block = index.get(value_id)
+                    if value_block:
+                        value_text = self._get_text_from_block(value_block, index)
+                        if key_text and value_text:
+                            key_values[key_text.lower()] = value_text
         
         return key_values
     
-    def _get_text_from_block(self, block: Dict, block_map: Dict) -> str:
+    def _get_text_from_block(self, block: Dict, index: TextractDocumentIndex) -> str:
         """Get text content from a block"""
-        text_parts = []
-        relationships = block.get('Relationships', [])
-        
-        for relationship in relationships:
-            if relationship.get('Type') == 'CHILD':
-                child_ids = relationship.get('Ids', [])
-                for child_id in child_ids:
-                    child_block = block_map.get(child_id)
-                    if child_block and child_block.get('BlockType') == 'WORD':
-                        text_parts.append(child_block.get('Text', ''))
-        
-        return ' '.join(text_parts)
+        return index.text_of(block.get('Id'))
     
-    def _extract_tables(self, blocks: List[Dict]) -> List[Dict]:
+    def _extract_tables(self, index: TextractDocumentIndex) -> List[Dict]:
         """Extract table data"""
         tables = []
-        block_map = {block['Id']: block for block in blocks}
         
-        for block in blocks:
-            if block.get('BlockType') == 'TABLE':
-                table_data = self._parse_table(block, block_map)
-                if table_data:
-                    tables.append(table_data)
+        for block in index.blocks_of_type('TABLE'):
+            table_data = self._parse_table(block, index)
+            if table_data:
+                tables.append(table_data)
         
         return tables
     
-    def _parse_table(self, table_block: Dict, block_map: Dict) -> Dict:
+    def _parse_table(self, table_block: Dict, index: TextractDocumentIndex) -> Dict:
         """Parse individual table"""
         rows = {}
         
-        relationships = table_block.get('Relationships', [])
-        for relationship in relationships:
-            if relationship.get('Type') == 'CHILD':
-                cell_ids = relationship.get('Ids', [])
+        for cell_id in index.children.get(table_block.get('Id'), ()):
+            cell_block = index.get(cell_id)
+            if cell_block and cell_block.get('BlockType') == 'CELL':
+                row_index = cell_block.get('RowIndex', 0)
+                col_index = cell_block.get('ColumnIndex', 0)
+                cell_text = self._get_text_from_block(cell_block, index)
                 
-                for cell_id in cell_ids:
-                    cell_block = block_map.get(cell_id)
-                    if cell_block and cell_block.get('BlockType') == 'CELL':
-                        row_index = cell_block.get('RowIndex', 0)
-                        col_index = cell_block.get('ColumnIndex', 0)
-                        cell_text = self._get_text_from_block(cell_block, block_map)
-                        
-                        if row_index not in rows:
-                            rows[row_index] = {}
-                        rows[row_index][col_index] = cell_text
+                if row_index not in rows:
+                    rows[row_index] = {}
+                rows[row_index][col_index] = cell_text
         
         # Convert to list of lists
         table_rows = []
@@ -224,37 +389,30 @@ class TextractService:
             'col_count': max(len(row) for row in table_rows) if table_rows else 0
         }
     
-    def _extract_invoice_number(self, lines: List[str], key_values: Dict[str, str]) -> Optional[str]:
+    def _extract_invoice_number(
+        self,
+        lines: List[str],
+        key_values: Dict[str, str],
+        fields: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
         """Extract invoice number"""
         # Try key-values first
         for key in ['factura', 'invoice', 'numero', 'no.', '#']:
             if key in key_values:
                 return key_values[key]
         
-        # Try regex patterns on text lines
-        patterns = [
-            r'(?:FACTURA|INVOICE|No\.?|#)\s*:?\s*([A-Z0-9]+)',
-            r'PMB(\d+)',  # Specific pattern from your examples
-            r'(?:REF|REFERENCIA)\s*:?\s*([A-Z0-9]+)'
-        ]
-        
-        for line in lines:
-            for pattern in patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    return match.group(1)
-        
-        return None
-    
-    def _extract_date(self, lines: List[str], key_values: Dict[str, str], date_type: str) -> Optional[date]:
+        # Fall back to the text-line rules
+        fields = fields or self.field_extractor.extract(lines)
+        return fields['invoice_number']
+    
+    def _extract_date(
+        self,
+        lines: List[str],
+        key_values: Dict[str, str],
+        date_type: str,
+        fields: Optional[Dict[str, Any]] = None
+    ) -> Optional[date]:
         """Extract dates (issue_date, due_date)"""
-        # Common date patterns for Colombian invoices
-        date_patterns = [
-            r'(\d{1,2}[/-]\d{1,2}[/-]\d{4})',
-            r'(\d{4}[/-]\d{1,2}[/-]\d{1,2})',
-            r'(\d{1,2}\s+de\s+\w+\s+de\s+\d{4})'
-        ]
-        
         # Try key-values first
         search_keys = [date_type, f'fecha_{date_type}', 'date']
         for key in search_keys:
@@ -262,14 +420,14 @@ class TextractService:
                 return self._parse_date_string(key_values[key])
         
         # Try text lines
-        for line in lines:
-            if date_type.lower() in line.lower():
-                for pattern in date_patterns:
-                    match = re.search(pattern, line)
-                    if match:
-                        return self._parse_date_string(match.group(1))
+        field_name = self.DATE_FIELDS.get(date_type.lower())
+        if field_name:
+            fields = fields or self.field_extractor.extract(lines)
+            date_str = fields[field_name]
+        else:
+            date_str = FieldRuleExtractor((date_rule('date', date_type),)).extract(lines)['date']
         
-        return None
+        return self._parse_date_string(date_str) if date_str else None
     
     def _parse_date_string(self, date_str: str) -> Optional[date]:
         """Parse date string to date object"""
@@ -287,54 +445,44 @@ class TextractService:
         
         return None
     
-    def _extract_supplier_info(self, lines: List[str], key_values: Dict[str, str]) -> Dict[str, Any]:
+    def _extract_supplier_info(
+        self,
+        lines: List[str],
+        key_values: Dict[str, str],
+        fields: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """Extract supplier information"""
-        supplier = {
-            'company_name': None,
-            'nit': None,
+        fields = fields or self.field_extractor.extract(lines)
+        company_name = fields['supplier_name']
+        
+        return {
+            # Company name: first long line with a company keyword (LTDA, S.A.S...)
+            'company_name': company_name.strip() if company_name is not None else None,
+            'nit': fields['supplier_nit'],
             'address': None,
             'city': None,
             'department': None,
             'phone': None
         }
-        
-        # Look for NIT pattern
-        for line in lines:
-            nit_match = re.search(r'NIT\s*:?\s*([0-9-]+)', line, re.IGNORECASE)
-            if nit_match:
-                supplier['nit'] = nit_match.group(1)
-            
-            # Look for company name (usually first few lines)
-            if not supplier['company_name'] and len(line) > 10 and any(word in line.upper() for word in ['LTDA', 'S.A.S', 'EMPRESA', 'COMERCIAL']):
-                supplier['company_name'] = line.strip()
-        
-        return supplier
     
-    def _extract_customer_info(self, lines: List[str], key_values: Dict[str, str]) -> Dict[str, Any]:
+    def _extract_customer_info(
+        self,
+        lines: List[str],
+        key_values: Dict[str, str],
+        fields: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """Extract customer information"""
-        customer = {
-            'customer_name': None,
+        fields = fields or self.field_extractor.extract(lines)
+        customer_name = fields['customer_name']
+        
+        return {
+            'customer_name': customer_name.strip() if customer_name is not None else None,
             'customer_id': None,
             'address': None,
             'city': None,
             'department': None,
-            'phone': None
+            'phone': fields['customer_phone']
         }
-        
-        # Look for customer patterns
-        for line in lines:
-            # Customer name patterns
-            if 'CLIENTE' in line.upper() or 'NOMBRE' in line.upper():
-                parts = line.split(':')
-                if len(parts) > 1:
-                    customer['customer_name'] = parts[1].strip()
-            
-            # Phone pattern
-            phone_match = re.search(r'(\d{10})', line)
-            if phone_match and not customer['phone']:
-                customer['phone'] = phone_match.group(1)
-        
-        return customer
     
     
     def _extract_line_items(self, tables: List[Dict], lines: List[str]) -> List[Dict]:
@@ -344,8 +492,15 @@ class TextractService:
         # Process the largest table (likely the product table)
         if tables:
             main_table = max(tables, key=lambda t: t['row_count'])
-        
-            for i, row in enumerate(main_table['rows']):
+            
+            # Multi-page invoices repeat the product table (same header) per page
+            header = main_table['rows'][0] if main_table['rows'] else None
+            product_rows = [main_table['rows'][0]] if header is not None else []
+            for table in tables:
+                if table is main_table or (header is not None and table['rows'] and table['rows'][0] == header):
+                    product_rows.extend(table['rows'][1:])
+        
+            for i, row in enumerate(product_rows):
                 if i == 0:  # Skip header row
                     continue
                     
@@ -381,68 +536,39 @@ class TextractService:
     
         return line_items
     
-    def _extract_totals(self, lines: List[str], key_values: Dict[str, str]) -> Dict[str, Any]:
+    def _extract_totals(
+        self,
+        lines: List[str],
+        key_values: Dict[str, str],
+        fields: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """Extract totals and tax information"""
-        totals = {
-            'subtotal': None,
-            'iva_rate': None,
-            'iva_amount': None,
-            'total': None,
+        fields = fields or self.field_extractor.extract(lines)
+        
+        return {
+            'subtotal': self._parse_decimal(fields['subtotal']),
+            'iva_rate': Decimal(fields['iva_rate']) if fields['iva_rate'] else None,
+            'iva_amount': self._parse_decimal(fields['iva_amount']),
+            'total': self._parse_decimal(fields['total']),
             'total_items': None
         }
-        
-        # Look for total patterns
-        for line in lines:
-            # Subtotal
-            if 'SUBTOTAL' in line.upper():
-                subtotal_match = re.search(r'[\$]?\s*([\d,]+)', line)
-                if subtotal_match:
-                    totals['subtotal'] = self._parse_decimal(subtotal_match.group(1))
-            
-            # IVA
-            if 'IVA' in line.upper():
-                iva_match = re.search(r'[\$]?\s*([\d,]+)', line)
-                if iva_match:
-                    totals['iva_amount'] = self._parse_decimal(iva_match.group(1))
-                
-                # IVA rate
-                rate_match = re.search(r'(\d+)%', line)
-                if rate_match:
-                    totals['iva_rate'] = Decimal(rate_match.group(1))
-            
-            # Total
-            if 'TOTAL' in line.upper() and 'SUBTOTAL' not in line.upper():
-                total_match = re.search(r'[\$]?\s*([\d,]+)', line)
-                if total_match:
-                    totals['total'] = self._parse_decimal(total_match.group(1))
-        
-        return totals
     
-    def _extract_payment_info(self, lines: List[str], key_values: Dict[str, str]) -> Dict[str, Any]:
+    def _extract_payment_info(
+        self,
+        lines: List[str],
+        key_values: Dict[str, str],
+        fields: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """Extract payment terms and method"""
-        payment_info = {
-            'payment_method': None,
-            'credit_days': None,
-            'discount_percentage': None
-        }
-        
-        for line in lines:
-            # Credit terms
-            if 'CREDITO' in line.upper():
-                payment_info['payment_method'] = 'CREDITO'
-                
-                # Extract days
-                days_match = re.search(r'(\d+)\s*DIAS?', line, re.IGNORECASE)
-                if days_match:
-                    payment_info['credit_days'] = int(days_match.group(1))
-            
-            # Discount
-            if 'DESCUENTO' in line.upper() or 'DCTO' in line.upper():
-                discount_match = re.search(r'(\d+)%', line)
-                if discount_match:
-                    payment_info['discount_percentage'] = Decimal(discount_match.group(1))
+        fields = fields or self.field_extractor.extract(lines)
         
-        return payment_info
+        return {
+            'payment_method': 'CREDITO' if fields['payment_method'] else None,
+            'credit_days': int(fields['credit_days']) if fields['credit_days'] else None,
+            'discount_percentage': (
+                Decimal(fields['discount_percentage']) if fields['discount_percentage'] else None
+            )
+        }
     
     def _parse_decimal(self, value: str) -> Optional[Decimal]:
         """Parse string to Decimal, handling Colombian number format"""
@@ -461,20 +587,14 @@ class TextractService:
         except Exception:
             return None
     
-    def _calculate_confidence(self, textract_response: Dict[str, Any]) -> float:
+    def _calculate_confidence(
+        self,
+        textract_response: Dict[str, Any],
+        index: Optional[TextractDocumentIndex] = None
+    ) -> float:
         """Calculate overall confidence score"""
-        blocks = textract_response.get('Blocks', [])
-        confidence_scores = []
-        
-        for block in blocks:
-            confidence = block.get('Confidence')
-            if confidence:
-                confidence_scores.append(confidence)
-        
-        if confidence_scores:
-            return sum(confidence_scores) / len(confidence_scores) / 100.0
-        
-        return 0.0
+        index = index or TextractDocumentIndex(textract_response)
+        return index.average_confidence
     
     def _smart_column_mapping(self, row: List[str], headers: List[str], row_index: int) -> Dict:
         """
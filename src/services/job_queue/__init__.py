@@ -0,0 +1,7 @@
+"""
+Durable background job queue and worker
+"""
+from .queue import InvoiceJobQueue
+from .worker import InvoiceWorker
+
+__all__ = ['InvoiceJobQueue', 'InvoiceWorker']
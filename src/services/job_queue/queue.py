@@ -0,0 +1,234 @@
+"""
+Postgres-backed job queue for invoice processing
+Jobs live in processing_jobs and are claimed with FOR UPDATE SKIP LOCKED
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import select, update, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...config.settings import settings
+from ...database.connection import AsyncSessionFactory
+from ...database.models import ProcessingJob, ProcessedInvoice
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key so only one worker runs recovery at a time
+RECOVERY_LOCK_KEY = 704_118_001
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class InvoiceJobQueue:
+    """Durable queue of invoice processing jobs"""
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        backoff_base_seconds: Optional[int] = None,
+        backoff_max_seconds: Optional[int] = None
+    ):
+        self.max_attempts = max_attempts or settings.job_max_attempts
+        self.backoff_base_seconds = backoff_base_seconds or settings.job_backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds or settings.job_backoff_max_seconds
+
+    def enqueue(
+        self,
+        session: AsyncSession,
+        invoice_id: str,
+        tenant_id: str,
+        payload: Dict[str, Any],
+        job_type: str = "textract"
+    ) -> ProcessingJob:
+        """
+        Add a job to the caller's session
+
+        The job is committed together with whatever else the session holds
+        (normally the new invoice row), so an upload can never be stored
+        without its job or the other way round.
+        """
+        job = ProcessingJob(
+            id=uuid.uuid4(),
+            invoice_id=uuid.UUID(invoice_id),
+            tenant_id=tenant_id,
+            job_type=job_type,
+            payload=payload,
+            status=QUEUED,
+            attempts=0,
+            max_attempts=self.max_attempts,
+            run_after=datetime.utcnow()
+        )
+        session.add(job)
+        return job
+
+    def claim_statement(self, limit: int, now: datetime):
+        """SELECT for the next runnable jobs, skipping rows other workers hold"""
+        return (
+            select(ProcessingJob)
+            .where(ProcessingJob.status == QUEUED)
+            .where(ProcessingJob.run_after <= now)
+            .order_by(ProcessingJob.run_after)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+    async def claim(self, worker_id: str, limit: int) -> List[ProcessingJob]:
+        """Atomically move up to ``limit`` runnable jobs to running"""
+        if limit <= 0:
+            return []
+
+        async with AsyncSessionFactory() as session:
+            try:
+                now = datetime.utcnow()
+                result = await session.execute(self.claim_statement(limit, now))
+                jobs = list(result.scalars().all())
+
+                for job in jobs:
+                    job.status = RUNNING
+                    job.attempts += 1
+                    job.locked_by = worker_id
+                    job.locked_at = now
+
+                await session.commit()
+                return jobs
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error claiming jobs: {str(e)}")
+                return []
+
+    async def mark_succeeded(self, session: AsyncSession, job_id: uuid.UUID) -> None:
+        """
+        Mark a job as succeeded in the caller's session (caller commits)
+
+        Committed together with the job's results, a crash can never leave
+        finished work on a running job that recovery would run again.
+        """
+        await session.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.id == job_id)
+            .values(status=SUCCEEDED, locked_by=None, last_error=None, updated_at=datetime.utcnow())
+        )
+
+    async def complete(self, job_id: uuid.UUID) -> None:
+        """Mark a job as succeeded"""
+        async with AsyncSessionFactory() as session:
+            await self.mark_succeeded(session, job_id)
+            await session.commit()
+
+    async def fail(self, job: ProcessingJob, error: str) -> bool:
+        """
+        Record a failed attempt
+
+        Returns True when a retry was scheduled, False when the job is out
+        of attempts and was marked failed.
+        """
+        retry = job.attempts < job.max_attempts
+        values = {
+            'locked_by': None,
+            'last_error': error[:2000],
+            'updated_at': datetime.utcnow()
+        }
+        if retry:
+            values['status'] = QUEUED
+            values['run_after'] = datetime.utcnow() + self.backoff(job.attempts)
+        else:
+            values['status'] = FAILED
+
+        async with AsyncSessionFactory() as session:
+            await session.execute(
+                update(ProcessingJob).where(ProcessingJob.id == job.id).values(**values)
+            )
+            await session.commit()
+
+        if retry:
+            logger.warning(
+                f"Job {job.id} attempt {job.attempts}/{job.max_attempts} failed, "
+                f"retrying in {self.backoff(job.attempts).total_seconds():.0f}s: {error}"
+            )
+        else:
+            logger.error(f"Job {job.id} failed after {job.attempts} attempts: {error}")
+        return retry
+
+    def backoff(self, attempts: int) -> timedelta:
+        """Exponential delay before the next attempt (base * 2^(attempts-1), capped)"""
+        seconds = self.backoff_base_seconds * (2 ** max(attempts - 1, 0))
+        return timedelta(seconds=min(seconds, self.backoff_max_seconds))
+
+    async def recover_stale(self, stale_after_seconds: Optional[int] = None) -> Dict[str, int]:
+        """
+        Put work lost by crashed processes back on the queue
+
+        - running jobs whose lock is older than ``stale_after_seconds`` are
+          re-queued (or failed when out of attempts)
+        - uploaded/processing invoices without any job get one
+        """
+        stale_after = timedelta(seconds=stale_after_seconds or settings.job_stale_after_seconds)
+        cutoff = datetime.utcnow() - stale_after
+
+        async with AsyncSessionFactory() as session:
+            try:
+                # One recovery at a time when several workers start together
+                await session.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"), {"key": RECOVERY_LOCK_KEY}
+                )
+
+                requeued = await session.execute(
+                    update(ProcessingJob)
+                    .where(ProcessingJob.status == RUNNING)
+                    .where(ProcessingJob.locked_at < cutoff)
+                    .where(ProcessingJob.attempts < ProcessingJob.max_attempts)
+                    .values(status=QUEUED, locked_by=None, run_after=datetime.utcnow())
+                )
+                exhausted = await session.execute(
+                    update(ProcessingJob)
+                    .where(ProcessingJob.status == RUNNING)
+                    .where(ProcessingJob.locked_at < cutoff)
+                    .values(status=FAILED, locked_by=None, last_error="Worker lost, out of attempts")
+                    .returning(ProcessingJob.invoice_id)
+                )
+                failed_invoice_ids = [row.invoice_id for row in exhausted]
+                if failed_invoice_ids:
+                    await session.execute(
+                        update(ProcessedInvoice)
+                        .where(ProcessedInvoice.id.in_(failed_invoice_ids))
+                        .values(status="failed", error_message="Processing worker lost")
+                    )
+
+                # Invoices that never got a job (accepted before the queue existed)
+                any_job = (
+                    select(ProcessingJob.id)
+                    .where(ProcessingJob.invoice_id == ProcessedInvoice.id)
+                )
+                orphans = await session.execute(
+                    select(ProcessedInvoice.id, ProcessedInvoice.tenant_id, ProcessedInvoice.s3_key)
+                    .where(ProcessedInvoice.status.in_(["uploaded", "processing"]))
+                    .where(ProcessedInvoice.upload_timestamp < cutoff)
+                    .where(~any_job.exists())
+                )
+                orphan_rows = orphans.all()
+                for row in orphan_rows:
+                    self.enqueue(session, str(row.id), row.tenant_id, {'s3_key': row.s3_key})
+
+                await session.commit()
+
+                recovered = {
+                    'requeued_jobs': requeued.rowcount,
+                    'failed_jobs': len(failed_invoice_ids),
+                    'orphaned_invoices': len(orphan_rows)
+                }
+                if any(recovered.values()):
+                    logger.info(f"Recovered stale work: {recovered}")
+                return recovered
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error recovering stale jobs: {str(e)}")
+                raise
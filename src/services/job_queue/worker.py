@@ -0,0 +1,147 @@
+"""
+Invoice processing worker
+Run as its own process (python -m src.services.job_queue.worker) and scale horizontally
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Optional, Set
+
+from ...config.settings import settings
+from ...database.models import ProcessingJob
+from .queue import InvoiceJobQueue
+
+logger = logging.getLogger(__name__)
+
+RECOVERY_INTERVAL_SECONDS = 300
+
+
+class InvoiceWorker:
+    """
+    Claims jobs from the queue and runs at most ``concurrency`` at once
+
+    Stale-work recovery runs at startup and every RECOVERY_INTERVAL_SECONDS.
+    """
+
+    def __init__(
+        self,
+        processor=None,
+        queue: Optional[InvoiceJobQueue] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        worker_id: Optional[str] = None
+    ):
+        if processor is None:
+            from ..document_processing import InvoiceProcessorService
+            processor = InvoiceProcessorService()
+
+        self.processor = processor
+        self.queue = queue or InvoiceJobQueue()
+        self.concurrency = concurrency or settings.worker_concurrency
+        self.poll_interval = poll_interval if poll_interval is not None else settings.worker_poll_interval_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._slot_freed = asyncio.Event()
+
+    async def run(self) -> None:
+        """Process jobs until stop() is called, then drain in-flight jobs"""
+        logger.info(f"Worker {self.worker_id} starting (concurrency={self.concurrency})")
+        loop = asyncio.get_running_loop()
+        next_recovery = loop.time()
+
+        while not self._stopping.is_set():
+            if loop.time() >= next_recovery:
+                try:
+                    await self.queue.recover_stale()
+                except Exception as e:
+                    logger.error(f"Stale job recovery failed: {str(e)}")
+                next_recovery = loop.time() + RECOVERY_INTERVAL_SECONDS
+
+            free_slots = self.concurrency - len(self._tasks)
+            jobs = await self.queue.claim(self.worker_id, free_slots) if free_slots > 0 else []
+
+            for job in jobs:
+                task = asyncio.create_task(self._run_job(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._job_done)
+
+            if not jobs or len(self._tasks) >= self.concurrency:
+                # Sleep until the next poll, a freed slot or shutdown
+                self._slot_freed.clear()
+                waiters = [
+                    asyncio.create_task(self._stopping.wait()),
+                    asyncio.create_task(self._slot_freed.wait())
+                ]
+                await asyncio.wait(
+                    waiters,
+                    timeout=self.poll_interval if len(self._tasks) < self.concurrency else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for waiter in waiters:
+                    waiter.cancel()
+
+        if self._tasks:
+            logger.info(f"Worker {self.worker_id} draining {len(self._tasks)} in-flight jobs")
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; run() returns once in-flight jobs finish"""
+        self._stopping.set()
+
+    def _job_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        self._slot_freed.set()
+
+    async def _run_job(self, job: ProcessingJob) -> None:
+        """Run one job and record success, retry or failure"""
+        final_attempt = job.attempts >= job.max_attempts
+        try:
+            await self.processor.process_invoice_job(job, final_attempt=final_attempt)
+        except Exception as e:
+            try:
+                await self.queue.fail(job, str(e))
+            except Exception as record_error:
+                # Lock goes stale and recovery re-queues the job
+                logger.error(f"Could not record failure of job {job.id}: {str(record_error)}")
+            return
+
+        # Normally already committed with the job's results; this covers jobs
+        # that ended without writing any (e.g. the invoice was deleted)
+        try:
+            await self.queue.complete(job.id)
+        except Exception as e:
+            logger.error(f"Could not mark job {job.id} as succeeded: {str(e)}")
+
+
+async def run_worker() -> None:
+    """Worker process entry point with graceful shutdown on SIGINT/SIGTERM"""
+    from ...database.connection import init_database, close_database
+
+    await init_database()
+    worker = InvoiceWorker()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass  # Windows
+
+    try:
+        await worker.run()
+    finally:
+        await close_database()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,144 @@
 """
 ML-powered product category classification using zero-shot learning
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import logging
-from transformers import pipeline
 import re
 
+from ...config.settings import settings
+from .classification_cache import classifier_version, get_classification_cache
+from .classifier_backends import create_classifier_backend
+
 logger = logging.getLogger(__name__)
 
+# Fallback keyword categories (checked in this order; the first best score wins)
+KEYWORD_CATEGORIES = {
+    'shoes': {
+        'keywords': [
+            'zapato', 'calzado', 'sandalia', 'bota', 'tenis', 'chancleta',
+            'mocasin', 'tacón', 'deportivo', 'formal', 'casual', 'nike',
+            'adidas', 'converse', 'puma', 'crocs'
+        ],
+        'confidence': 0.90
+    },
+    'clothing': {
+        'keywords': [
+            'camiseta', 'camisa', 'pantalon', 'vestido', 'falda', 'sudadera',
+            'chaqueta', 'blusa', 'short', 'jean', 'algodón', 'polyester',
+            'talla', 'manga', 'cuello', 'polo', 'hoodie'
+        ],
+        'confidence': 0.85
+    },
+    'electronics': {
+        'keywords': [
+            'telefono', 'celular', 'computador', 'tablet', 'audifonos',
+            'parlante', 'cargador', 'cable', 'usb', 'bluetooth', 'wifi',
+            'samsung', 'apple', 'xiaomi', 'huawei', 'iphone', 'android'
+        ],
+        'confidence': 0.95
+    },
+    'sports': {
+        'keywords': [
+            'pelota', 'balon', 'deporte', 'gimnasio', 'ejercicio', 'fitness',
+            'pesa', 'yoga', 'natacion', 'futbol', 'basketball', 'tenis',
+            'mancuerna', 'banda', 'colchoneta'
+        ],
+        'confidence': 0.88
+    },
+    'beauty': {
+        'keywords': [
+            'crema', 'shampoo', 'perfume', 'maquillaje', 'labial', 'base',
+            'mascarilla', 'serum', 'locion', 'gel', 'jabon', 'cosmetico',
+            'skincare', 'facial'
+        ],
+        'confidence': 0.92
+    },
+    'accessories': {
+        'keywords': [
+            'collar', 'pulsera', 'reloj', 'gafas', 'bolsa', 'cartera',
+            'cinturon', 'sombrero', 'gorra', 'lentes', 'anillo', 'arete'
+        ],
+        'confidence': 0.87
+    },
+    'home': {
+        'keywords': [
+            'mesa', 'silla', 'sofa', 'cama', 'lampara', 'cortina',
+            'almohada', 'sabana', 'toalla', 'cocina', 'baño', 'decoracion',
+            'organizador', 'estante'
+        ],
+        'confidence': 0.80
+    }
+}
+
+# Accented and plain spellings match each other ("pantalón" / "pantalon"); ñ is kept
+_FOLD_ACCENTS = str.maketrans('áéíóúü', 'aeiouu')
+_WORD = re.compile(r'\w+')
+
+
+class KeywordCategoryMatcher:
+    """
+    Keyword -> category index built once, matched on whole words
+
+    Descriptions are split into words and each word is looked up in one
+    dict holding every keyword and its plurals, so "gel" and "geles" hit
+    but "angel" does not, and the cost is one hash lookup per word however
+    many keywords there are. Each distinct keyword of a description counts
+    one point for every category that lists it.
+    """
+
+    def __init__(self, keyword_categories: Dict[str, Dict[str, Any]],
+                 default: str = 'general', default_confidence: float = 0.60):
+        self.categories = list(keyword_categories)
+        self.confidences = [config['confidence'] for config in keyword_categories.values()]
+        self.default = default
+        self.default_confidence = default_confidence
+
+        # keyword -> indexes of the categories listing it
+        keyword_columns: Dict[str, List[int]] = {}
+        for column, config in enumerate(keyword_categories.values()):
+            for keyword in config['keywords']:
+                keyword_columns.setdefault(keyword.translate(_FOLD_ACCENTS), []).append(column)
+
+        self.keywords = list(keyword_columns)
+        self.keyword_columns = [tuple(columns) for columns in keyword_columns.values()]
+        self.lookup: Dict[str, int] = {}
+        for keyword_id, keyword in enumerate(self.keywords):
+            for form in (keyword + 'es', keyword + 's', keyword):  # the keyword itself wins a clash
+                self.lookup[form] = keyword_id
+
+    def _keyword_ids(self, description: Optional[str]) -> set:
+        lookup = self.lookup
+        words = _WORD.findall((description or '').lower().translate(_FOLD_ACCENTS))
+        return {lookup[word] for word in words if word in lookup}
+
+    def classify(self, descriptions: List[str]) -> List[Tuple[str, float, int]]:
+        """(category, confidence, keyword matches) per description"""
+        results = []
+        for description in descriptions:
+            keyword_ids = self._keyword_ids(description)
+            if not keyword_ids:
+                results.append((self.default, self.default_confidence, 0))
+                continue
+
+            counts = [0] * len(self.categories)
+            for keyword_id in keyword_ids:
+                for column in self.keyword_columns[keyword_id]:
+                    counts[column] += 1
+            best = max(range(len(counts)), key=counts.__getitem__)  # first category wins ties
+            results.append((self.categories[best], self.confidences[best], counts[best]))
+        return results
+
+
+KEYWORD_MATCHER = KeywordCategoryMatcher(KEYWORD_CATEGORIES)
+
+
 class ProductCategoryClassifier:
     """Smart product categorization using ML zero-shot classification"""
     
     def __init__(self):
-        self.classifier = None
+        self.backend = create_classifier_backend()
+        self.model_name = self.backend.model_name
+        self.batch_size = settings.ml_classifier_batch_size  # (description, label) pairs per forward pass
         self.categories = [
             'calzado y zapatos',           # shoes
             'ropa y vestimenta',           # clothing  
@@ -58,21 +184,23 @@ class ProductCategoryClassifier:
             'general': 50.0
         }
         
-        self._load_model()
-    
-    def _load_model(self):
-        """Load zero-shot classification model"""
-        try:
-            # Using a smaller, faster model for production
-            self.classifier = pipeline(
-                "zero-shot-classification",
-                model="facebook/bart-large-mnli",
-                device=-1  # Use CPU (set to 0 for GPU)
-            )
-            logger.info("Zero-shot classification model loaded successfully")
-        except Exception as e:
-            logger.error(f"Could not load ML classification model: {e}")
-            self.classifier = None
+        unknown = self.backend.unknown_labels(self.categories)
+        if unknown:
+            logger.warning(f"{self.backend.name} backend cannot predict {unknown}; retrain the category head")
+        
+        self.keyword_matcher = KEYWORD_MATCHER
+        self.cache = get_classification_cache()
+        self.cache.set_version(self.version)
+    
+    @property
+    def classifier(self):
+        """Backend model once loaded; None (keyword fallback) while it is still loading"""
+        return self.backend.model
+    
+    @property
+    def version(self) -> str:
+        """Fingerprint of model + label set; cached classifications are only valid for it"""
+        return classifier_version(self.model_name, self.categories, self.category_mapping)
     
     def classify_product(self, description: str) -> Dict[str, Any]:
         """
@@ -81,26 +209,69 @@ class ProductCategoryClassifier:
         Returns:
             Dict with category, confidence, and margin info
         """
-        if not description or not description.strip():
-            return self._get_default_classification()
+        return self.classify_products([description])[0]
+    
+    def classify_products(self,
+                          descriptions: List[str],
+                          batch_size: Optional[int] = None,
+                          tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Classify many product descriptions in one pipeline call
+        
+        With the zero-shot backend that is one NLI forward pass per
+        (description, label) pair. All pairs of all distinct descriptions go
+        through the pipeline together in padded batches of ``batch_size``
+        pairs instead of one description (11 sequential passes) at a time.
+        The embedding head backend needs one encoder pass per description.
+        Descriptions already in the classification cache (per
+        ``tenant_id``) skip the model entirely.
         
-        # Clean description for better classification
-        clean_desc = self._clean_description(description)
+        Returns:
+            One classification dict per description, in input order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(descriptions)
         
+        # Clean descriptions; repeated lines (same product, other size) are classified once
+        positions: Dict[str, List[int]] = {}
+        for position, description in enumerate(descriptions):
+            if not description or not description.strip():
+                results[position] = self._get_default_classification()
+            else:
+                positions.setdefault(self._clean_description(description), []).append(position)
+        
+        cached = self.cache.get_many(tenant_id, positions)
+        classified = {description: self._from_cache(entry) for description, entry in cached.items()}
+        
+        uncached = [description for description in positions if description not in cached]
+        if uncached:
+            for description, result in zip(uncached, self._classify_batch(uncached, batch_size)):
+                # Keyword fallbacks are cheap and would pin a poor answer once the model is back
+                if result['method'] == self.backend.method:
+                    self.cache.put(tenant_id, description, result)
+                classified[description] = result
+        
+        for description, result in classified.items():
+            for position in positions[description]:
+                results[position] = dict(result)
+        
+        return results
+    
+    def _classify_batch(self, descriptions: List[str], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """ML classification of cleaned descriptions, keyword fallback if the model is unavailable or fails"""
         if self.classifier:
             try:
-                result = self._ml_classify(clean_desc)
-                return result
+                return self._ml_classify_batch(descriptions, batch_size or self.batch_size)
             except Exception as e:
                 logger.warning(f"ML classification failed: {e}")
-                return self._fallback_classify(clean_desc)
-        else:
-            return self._fallback_classify(clean_desc)
+        return self._fallback_classify_batch(descriptions)
     
-    def _ml_classify(self, description: str) -> Dict[str, Any]:
-        """Use ML model for classification"""
-        result = self.classifier(description, self.categories)
-        
+    def _ml_classify_batch(self, descriptions: List[str], batch_size: int) -> List[Dict[str, Any]]:
+        """One backend call for all descriptions (see classifier_backends.py)"""
+        outputs = self.backend.classify(descriptions, self.categories, batch_size)
+        return [self._ml_result(result) for result in outputs]
+    
+    def _ml_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Classification dict from one backend output (labels/scores, best first)"""
         spanish_category = result['labels'][0]
         english_category = self.category_mapping.get(spanish_category, 'general')
         confidence = result['scores'][0]
@@ -110,96 +281,38 @@ class ProductCategoryClassifier:
             'category_spanish': spanish_category,
             'confidence': confidence,
             'margin_percentage': self.category_margins.get(english_category, 50.0),
-            'method': 'ml_zero_shot',
+            'method': self.backend.method,
             'all_scores': dict(zip(
                 [self.category_mapping.get(cat, 'general') for cat in result['labels']],
                 result['scores']
             ))
         }
     
+    def _from_cache(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Cached classification with the current category margin"""
+        return {**entry, 'margin_percentage': self.category_margins.get(entry['category'], 50.0)}
+    
     def _fallback_classify(self, description: str) -> Dict[str, Any]:
         """Fallback keyword-based classification"""
-        desc_lower = description.lower()
-        
-        # Enhanced keyword categories
-        keyword_categories = {
-            'shoes': {
-                'keywords': [
-                    'zapato', 'calzado', 'sandalia', 'bota', 'tenis', 'chancleta',
-                    'mocasin', 'tacón', 'deportivo', 'formal', 'casual', 'nike',
-                    'adidas', 'converse', 'puma', 'crocs'
-                ],
-                'confidence': 0.90
-            },
-            'clothing': {
-                'keywords': [
-                    'camiseta', 'camisa', 'pantalon', 'vestido', 'falda', 'sudadera',
-                    'chaqueta', 'blusa', 'short', 'jean', 'algodón', 'polyester',
-                    'talla', 'manga', 'cuello', 'polo', 'hoodie'
-                ],
-                'confidence': 0.85
-            },
-            'electronics': {
-                'keywords': [
-                    'telefono', 'celular', 'computador', 'tablet', 'audifonos',
-                    'parlante', 'cargador', 'cable', 'usb', 'bluetooth', 'wifi',
-                    'samsung', 'apple', 'xiaomi', 'huawei', 'iphone', 'android'
-                ],
-                'confidence': 0.95
-            },
-            'sports': {
-                'keywords': [
-                    'pelota', 'balon', 'deporte', 'gimnasio', 'ejercicio', 'fitness',
-                    'pesa', 'yoga', 'natacion', 'futbol', 'basketball', 'tenis',
-                    'mancuerna', 'banda', 'colchoneta'
-                ],
-                'confidence': 0.88
-            },
-            'beauty': {
-                'keywords': [
-                    'crema', 'shampoo', 'perfume', 'maquillaje', 'labial', 'base',
-                    'mascarilla', 'serum', 'locion', 'gel', 'jabon', 'cosmetico',
-                    'skincare', 'facial'
-                ],
-                'confidence': 0.92
-            },
-            'accessories': {
-                'keywords': [
-                    'collar', 'pulsera', 'reloj', 'gafas', 'bolsa', 'cartera',
-                    'cinturon', 'sombrero', 'gorra', 'lentes', 'anillo', 'arete'
-                ],
-                'confidence': 0.87
-            },
-            'home': {
-                'keywords': [
-                    'mesa', 'silla', 'sofa', 'cama', 'lampara', 'cortina',
-                    'almohada', 'sabana', 'toalla', 'cocina', 'baño', 'decoracion',
-                    'organizador', 'estante'
-                ],
-                'confidence': 0.80
+        return self._fallback_classify_batch([description])[0]
+    
+    def _fallback_classify_batch(self, descriptions: List[str]) -> List[Dict[str, Any]]:
+        """Keyword classification of many descriptions in one matcher scan"""
+        return [
+            {
+                'category': category,
+                'category_spanish': self._get_spanish_name(category),
+                'confidence': confidence,
+                'margin_percentage': self.category_margins.get(category, 50.0),
+                'method': 'keyword_fallback',
+                'keyword_matches': matches
             }
-        }
-        
-        # Calculate scores for each category
-        best_category = 'general'
-        best_score = 0
-        best_confidence = 0.60
-        
-        for category, config in keyword_categories.items():
-            score = sum(1 for keyword in config['keywords'] if keyword in desc_lower)
-            if score > best_score:
-                best_score = score
-                best_category = category
-                best_confidence = min(config['confidence'], config['confidence'] + (score - 1) * 0.05)
-        
-        return {
-            'category': best_category,
-            'category_spanish': self._get_spanish_name(best_category),
-            'confidence': best_confidence,
-            'margin_percentage': self.category_margins.get(best_category, 50.0),
-            'method': 'keyword_fallback',
-            'keyword_matches': best_score
-        }
+            for category, confidence, matches in self.keyword_matcher.classify(descriptions)
+        ]
+    
+    def description_keys(self, descriptions: List[str]) -> List[str]:
+        """Cache keys (cleaned descriptions) of the non-empty descriptions"""
+        return [self._clean_description(d) for d in descriptions if d and d.strip()]
     
     def _clean_description(self, description: str) -> str:
         """Clean and normalize product description"""
@@ -233,9 +346,25 @@ class ProductCategoryClassifier:
         return self.category_margins.get(category, 50.0)
     
     def update_category_margins(self, new_margins: Dict[str, float]):
-        """Update category margins based on business rules"""
+        """Update category margins based on business rules (cached classifications pick them up on read)"""
         self.category_margins.update(new_margins)
         logger.info(f"Updated category margins: {new_margins}")
+    
+    def update_categories(self, category_mapping: Dict[str, str]):
+        """
+        Replace the candidate label set (Spanish label -> English category); invalidates cached classifications
+        
+        Raises ValueError when the backend cannot score a new label (a
+        trained head must be retrained on it first).
+        """
+        unknown = self.backend.unknown_labels(list(category_mapping))
+        if unknown:
+            raise ValueError(f"{self.backend.name} backend cannot predict {unknown}; retrain the category head")
+        
+        self.category_mapping = dict(category_mapping)
+        self.categories = list(category_mapping)
+        self.cache.set_version(self.version)
+        logger.info(f"Updated candidate categories: {self.categories}")
 
 # Singleton instance
 _classifier_instance = None
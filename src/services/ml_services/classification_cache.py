@@ -0,0 +1,268 @@
+"""
+Memoized product classifications
+Supplier catalogs repeat line for line, so a cleaned description is
+classified by the model once per tenant and then served from memory or
+from the product_classifications table
+
+Rows of retired classifier versions are removed offline:
+    python -m src.services.ml_services.classification_cache --older-than-days 30
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...config.settings import settings
+from ...database.models import ProductClassification
+
+logger = logging.getLogger(__name__)
+
+# Parts of a classification that do not depend on business rules; the
+# margin is looked up at read time so update_category_margins applies at once
+CACHED_FIELDS = ('category', 'category_spanish', 'confidence', 'method', 'all_scores')
+
+# Rows per multi-row INSERT (9 columns each, asyncpg allows 32767 parameters)
+CLASSIFICATION_INSERT_BATCH = 1000
+
+# Rows a failed flush queues again; the rest are only kept in memory, so a
+# long outage cannot grow the next flush without bound
+CLASSIFICATION_REQUEUE_LIMIT = CLASSIFICATION_INSERT_BATCH
+
+
+def classifier_version(model_name: str, categories: List[str], category_mapping: Dict[str, str]) -> str:
+    """Fingerprint of everything a classification depends on (model + label set)"""
+    payload = json.dumps([model_name, categories, category_mapping], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ClassificationCache:
+    """
+    Per-tenant LRU of classifications keyed on the cleaned description
+
+    Lookups are in-process and thread safe (classification runs on executor
+    threads). New entries are queued and written by ``flush``; ``load``
+    pre-fills the LRU from the table before a batch. Rows carry the
+    classifier version, so a different model or label set never reads
+    entries made by the old one. Processes on other versions (rolling
+    deploys, API and worker on different backends) share the table, so
+    flush never deletes; see ``purge_stale``.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, enabled: Optional[bool] = None):
+        self.max_entries = max_entries or settings.ml_classification_cache_size
+        self.enabled = settings.ml_classification_cache_enabled if enabled is None else enabled
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self.evictions = 0
+
+        self._entries: "OrderedDict[Tuple[Optional[str], str], Dict[str, Any]]" = OrderedDict()
+        self._unsaved: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def set_version(self, version: str) -> None:
+        """Bind to a classifier version; everything cached for another version is dropped"""
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    logger.info(f"Classifier changed ({self.version} -> {version}), classification cache cleared")
+                self.version = version
+                self._entries.clear()
+                self._unsaved.clear()
+
+    def invalidate(self) -> None:
+        """Drop the in-process entries (the table is filtered by version instead)"""
+        with self._lock:
+            self._entries.clear()
+            self._unsaved.clear()
+
+    def get_many(self, tenant_id: Optional[str], keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Cached classifications for the keys that have one"""
+        found = {}
+        if not self.enabled:
+            return found
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get((tenant_id, key))
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end((tenant_id, key))
+                self.hits += 1
+                found[key] = entry
+        return found
+
+    def put(self, tenant_id: Optional[str], key: str, classification: Dict[str, Any]) -> None:
+        """Remember a model classification; queued for the table when the tenant is known"""
+        if not self.enabled:
+            return
+
+        entry = {field: classification.get(field) for field in CACHED_FIELDS}
+        with self._lock:
+            self._remember(tenant_id, key, entry)
+            if tenant_id is not None:
+                self._unsaved[(tenant_id, key)] = entry
+
+    def _remember(self, tenant_id: Optional[str], key: str, entry: Dict[str, Any]) -> None:
+        self._entries[(tenant_id, key)] = entry
+        self._entries.move_to_end((tenant_id, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def load(self, session: AsyncSession, tenant_id: str, keys: Iterable[str]) -> int:
+        """Fill the LRU from the table for keys not already in memory; returns rows loaded"""
+        if not self.enabled or self.version is None:
+            return 0
+
+        with self._lock:
+            missing = sorted({key for key in keys if (tenant_id, key) not in self._entries})
+        if not missing:
+            return 0
+
+        try:
+            result = await session.execute(
+                select(ProductClassification)
+                .where(ProductClassification.tenant_id == tenant_id)
+                .where(ProductClassification.classifier_version == self.version)
+                .where(ProductClassification.description_key.in_(missing))
+            )
+            rows = result.scalars().all()
+        except Exception as e:
+            # A broken cache must never block pricing
+            logger.warning(f"Classification cache load failed: {str(e)}")
+            return 0
+
+        with self._lock:
+            for row in rows:
+                self._remember(tenant_id, row.description_key, {
+                    'category': row.category,
+                    'category_spanish': row.category_spanish,
+                    'confidence': float(row.confidence),
+                    'method': row.method,
+                    'all_scores': row.all_scores
+                })
+            self.store_hits += len(rows)
+        return len(rows)
+
+    async def flush(self, session: AsyncSession) -> int:
+        """Write queued classifications (caller commits); returns rows written"""
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+            version = self.version
+        if not unsaved or version is None:
+            return 0
+
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                'tenant_id': tenant_id,
+                'description_key': key,
+                'classifier_version': version,
+                'created_at': created_at,
+                **entry
+            }
+            for (tenant_id, key), entry in unsaved.items()
+        ]
+        try:
+            for start in range(0, len(rows), CLASSIFICATION_INSERT_BATCH):
+                statement = insert(ProductClassification).values(rows[start:start + CLASSIFICATION_INSERT_BATCH])
+                await session.execute(statement.on_conflict_do_nothing(
+                    index_elements=[
+                        ProductClassification.tenant_id,
+                        ProductClassification.classifier_version,
+                        ProductClassification.description_key
+                    ]
+                ))
+        except Exception as e:
+            logger.warning(f"Classification cache flush failed: {str(e)}")
+            with self._lock:
+                if version == self.version:
+                    # Queued again for the next flush, the most recent first
+                    for item, entry in reversed(unsaved.items()):
+                        if len(self._unsaved) >= CLASSIFICATION_REQUEUE_LIMIT:
+                            break
+                        self._unsaved.setdefault(item, entry)
+            return 0
+        return len(rows)
+
+    async def purge_stale(
+        self,
+        session: AsyncSession,
+        keep_versions: Sequence[str],
+        older_than: timedelta
+    ) -> int:
+        """Delete rows of other classifier versions older than ``older_than`` (maintenance, caller commits)"""
+        result = await session.execute(
+            delete(ProductClassification)
+            .where(ProductClassification.classifier_version.not_in(list(keep_versions)))
+            .where(ProductClassification.created_at < datetime.utcnow() - older_than)
+        )
+        return result.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for health/metrics endpoints"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'version': self.version,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'store_hits': self.store_hits,
+            'evictions': self.evictions,
+            'unsaved': len(self._unsaved)
+        }
+
+
+# Singleton instance
+_classification_cache_instance = None
+
+def get_classification_cache() -> ClassificationCache:
+    """Get singleton instance of the classification cache"""
+    global _classification_cache_instance
+    if _classification_cache_instance is None:
+        _classification_cache_instance = ClassificationCache()
+    return _classification_cache_instance
+
+
+async def purge_stale_classifications(keep_versions: Sequence[str], older_than_days: int) -> int:
+    from ...database.connection import AsyncSessionFactory
+
+    async with AsyncSessionFactory() as session:
+        deleted = await get_classification_cache().purge_stale(
+            session, keep_versions, timedelta(days=older_than_days)
+        )
+        await session.commit()
+    return deleted
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Delete cached classifications of retired classifier versions")
+    parser.add_argument('--older-than-days', type=int, default=30, help="Only rows created before this many days ago")
+    parser.add_argument('--keep', action='append', default=[], help="Version to keep besides the configured classifier's (repeatable)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from .category_classifier import ProductCategoryClassifier
+
+    keep_versions = [ProductCategoryClassifier().version, *args.keep]
+    deleted = asyncio.run(purge_stale_classifications(keep_versions, args.older_than_days))
+    print(f"Deleted {deleted} cached classifications (kept versions {', '.join(keep_versions)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Backends behind ProductCategoryClassifier
+Every backend returns zero-shot pipeline style outputs ({'labels', 'scores'},
+best first), so classification, caching and the keyword fallback are shared
+"""
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ...config.settings import settings
+from .model_registry import (
+    SENTENCE_EMBEDDINGS, SENTENCE_EMBEDDINGS_MODEL, ZERO_SHOT, ZERO_SHOT_MODEL, get_model_registry
+)
+
+logger = logging.getLogger(__name__)
+
+ZERO_SHOT_BACKEND = "zero_shot"
+EMBEDDING_HEAD_BACKEND = "embedding_head"
+
+
+class ZeroShotBackend:
+    """NLI zero-shot over the candidate labels (bart-large-mnli, no training data needed)"""
+
+    name = ZERO_SHOT_BACKEND
+    method = "ml_zero_shot"
+    model_name = ZERO_SHOT_MODEL
+    model_key = ZERO_SHOT
+
+    def __init__(self, models=None):
+        self.models = models or get_model_registry()
+
+    @property
+    def model(self):
+        return self.models.get(ZERO_SHOT)
+
+    def unknown_labels(self, labels: List[str]) -> List[str]:
+        """Labels this backend cannot score (none: zero-shot takes any label)"""
+        return []
+
+    def classify(self, descriptions: List[str], labels: List[str], batch_size: int) -> List[Dict[str, Any]]:
+        """One pipeline call for all descriptions; pairs are batched and padded by the pipeline"""
+        outputs = self.model(descriptions, labels, batch_size=batch_size)
+        if isinstance(outputs, dict):  # single input returns a bare dict
+            outputs = [outputs]
+        return outputs
+
+
+@dataclass
+class CategoryHead:
+    """Multinomial logistic regression over normalized sentence embeddings"""
+    labels: List[str]  # Spanish candidate labels, one per row of coef
+    coef: np.ndarray  # (labels, embedding dim)
+    intercept: np.ndarray  # (labels,)
+    embedding_model: str = SENTENCE_EMBEDDINGS_MODEL
+
+    def predict_proba(self, embeddings: np.ndarray) -> np.ndarray:
+        logits = embeddings @ self.coef.T + self.intercept
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    @property
+    def fingerprint(self) -> str:
+        """Changes whenever the head is retrained"""
+        digest = hashlib.sha256(self.coef.astype(np.float32).tobytes())
+        digest.update(self.intercept.astype(np.float32).tobytes())
+        digest.update("\n".join(self.labels).encode('utf-8'))
+        return digest.hexdigest()[:12]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'wb') as handle:
+            np.savez_compressed(
+                handle,
+                labels=np.array(self.labels),
+                coef=self.coef.astype(np.float32),
+                intercept=self.intercept.astype(np.float32),
+                embedding_model=np.array(self.embedding_model)
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "CategoryHead":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                labels=[str(label) for label in data['labels']],
+                coef=data['coef'],
+                intercept=data['intercept'],
+                embedding_model=str(data['embedding_model'])
+            )
+
+
+class EmbeddingHeadBackend:
+    """
+    Supervised head on multilingual MiniLM embeddings
+
+    One encoder pass per description (MiniLM, ~118M parameters) plus a
+    matrix product, instead of one bart-large pass per (description,
+    label) pair. The head is trained on our own labelled line items with
+    python -m src.services.ml_services.train_category_head.
+    """
+
+    name = EMBEDDING_HEAD_BACKEND
+    method = "ml_supervised"
+    model_key = SENTENCE_EMBEDDINGS
+
+    def __init__(self, head: CategoryHead, models=None):
+        self.head = head
+        self.models = models or get_model_registry()
+        self.model_name = f"{head.embedding_model}+head:{head.fingerprint}"
+
+    @property
+    def model(self):
+        return self.models.get(SENTENCE_EMBEDDINGS)
+
+    def unknown_labels(self, labels: List[str]) -> List[str]:
+        """Labels the head was not trained on (it can never predict them)"""
+        known = set(self.head.labels)
+        return [label for label in labels if label not in known]
+
+    def classify(self, descriptions: List[str], labels: List[str], batch_size: int) -> List[Dict[str, Any]]:
+        """Head probabilities restricted to ``labels`` (renormalized), so removed categories are never returned"""
+        candidates = set(labels)
+        columns = [i for i, label in enumerate(self.head.labels) if label in candidates]
+        if not columns:
+            raise ValueError("None of the candidate labels is known to the category head")
+
+        embeddings = self.model.encode(
+            descriptions, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+        probabilities = self.head.predict_proba(np.asarray(embeddings, dtype=np.float32))[:, columns]
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+        outputs = []
+        for row in probabilities:
+            order = np.argsort(-row)
+            outputs.append({
+                'labels': [self.head.labels[columns[i]] for i in order],
+                'scores': [float(row[i]) for i in order]
+            })
+        return outputs
+
+
+def create_classifier_backend(name: Optional[str] = None, head_path: Optional[str] = None, models=None):
+    """Backend selected by ML_CLASSIFIER_BACKEND; zero-shot if the head cannot be used"""
+    name = name or settings.ml_classifier_backend
+    if name == EMBEDDING_HEAD_BACKEND:
+        head_path = head_path or settings.ml_classifier_head_path
+        try:
+            head = CategoryHead.load(head_path)
+        except Exception as e:
+            logger.error(f"Could not load category head {head_path}, using zero-shot: {e}")
+        else:
+            # The head's weights only make sense on the encoder it was trained on
+            if head.embedding_model == SENTENCE_EMBEDDINGS_MODEL:
+                return EmbeddingHeadBackend(head, models)
+            logger.error(
+                f"Category head {head_path} was trained on {head.embedding_model}, "
+                f"not {SENTENCE_EMBEDDINGS_MODEL}; using zero-shot"
+            )
+    elif name != ZERO_SHOT_BACKEND:
+        logger.error(f"Unknown classifier backend '{name}', using zero-shot")
+    return ZeroShotBackend(models)
@@ -0,0 +1,197 @@
+"""
+Registry of the heavy ML models, loaded off the request path
+transformers/sentence-transformers are only imported by the loaders, and
+loading runs on a background thread, so the API starts in seconds and
+callers use their non-ML fallback until a model is ready
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a failed load is retried, doubling per failure up to the cap
+RETRY_BACKOFF_SECONDS = 30.0
+MAX_RETRY_BACKOFF_SECONDS = 1800.0
+
+ZERO_SHOT = "zero_shot"
+SENTENCE_EMBEDDINGS = "sentence_embeddings"
+
+ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+SENTENCE_EMBEDDINGS_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def _load_zero_shot() -> Any:
+    from transformers import pipeline
+
+    return pipeline(
+        "zero-shot-classification",
+        model=ZERO_SHOT_MODEL,
+        device=-1  # Use CPU (set to 0 for GPU)
+    )
+
+
+def _load_sentence_embeddings() -> Any:
+    from sentence_transformers import SentenceTransformer
+
+    # Multilingual model for Spanish descriptions
+    return SentenceTransformer(SENTENCE_EMBEDDINGS_MODEL)
+
+
+@dataclass
+class ModelEntry:
+    """One registered model and its loading state"""
+    name: str
+    model_name: str
+    loader: Callable[[], Any]
+    state: str = "not_loaded"  # not_loaded -> loading -> ready | failed (-> loading after backoff)
+    model: Any = None
+    error: Optional[str] = None
+    load_seconds: Optional[float] = None
+    failures: int = 0
+    retry_at: float = 0.0  # time.monotonic() after which a failed load is retried
+    loaded: threading.Event = field(default_factory=threading.Event)
+
+
+class ModelRegistry:
+    """
+    Named models loaded at most once, never on the caller's thread
+
+    ``get`` never blocks: it returns the model when ready, otherwise None
+    and (on first use) starts loading it in the background. A failed load
+    (Hub or network blip) is retried by the next ``get`` after a backoff
+    that doubles per failure; callers keep using their fallback meanwhile.
+    ``reload`` retries at once.
+    """
+
+    def __init__(self, retry_backoff: float = RETRY_BACKOFF_SECONDS, max_retry_backoff: float = MAX_RETRY_BACKOFF_SECONDS):
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.Lock()
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+
+    def register(self, name: str, loader: Callable[[], Any], model_name: str = "") -> None:
+        with self._lock:
+            self._entries[name] = ModelEntry(name=name, model_name=model_name or name, loader=loader)
+
+    def provide(self, name: str, model: Any) -> None:
+        """Register an already built model as ready (tests, custom deployments)"""
+        with self._lock:
+            entry = ModelEntry(name=name, model_name=name, loader=lambda: model, state="ready", model=model)
+            entry.loaded.set()
+            self._entries[name] = entry
+
+    def get(self, name: str) -> Optional[Any]:
+        """The model if ready, else None (loading starts in the background if it had not)"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        if entry.state == "ready":
+            return entry.model
+        if self._due(entry):
+            self.start_background_loading([name])
+        return None
+
+    def is_ready(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.state == "ready"
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> Optional[Any]:
+        """Block until the model finished loading (scripts, benchmarks); None if it failed"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        if self._due(entry):
+            self.start_background_loading([name])
+        entry.loaded.wait(timeout)
+        return entry.model if entry.state == "ready" else None
+
+    def start_background_loading(self, names: Optional[Iterable[str]] = None) -> Optional[threading.Thread]:
+        """
+        Load the given (default: all) models one after another on a daemon thread
+
+        Sequential on purpose: two models loading at once double peak memory
+        and compete for the CPU with the requests being served. Failed
+        models are included once their backoff has passed.
+        """
+        with self._lock:
+            pending = [
+                self._entries[name] for name in (names if names is not None else list(self._entries))
+                if name in self._entries and self._due(self._entries[name])
+            ]
+            for entry in pending:
+                entry.state = "loading"
+                entry.loaded.clear()
+        if not pending:
+            return None
+
+        thread = threading.Thread(target=self._load_all, args=(pending,), name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def reload(self, name: str) -> Optional[threading.Thread]:
+        """Retry a failed model now instead of after its backoff"""
+        entry = self._entries.get(name)
+        if entry is None or entry.state != "failed":
+            return None
+        entry.retry_at = 0.0
+        return self.start_background_loading([name])
+
+    @staticmethod
+    def _due(entry: ModelEntry) -> bool:
+        return entry.state == "not_loaded" or (entry.state == "failed" and time.monotonic() >= entry.retry_at)
+
+    def _load_all(self, entries) -> None:
+        for entry in entries:
+            started = time.perf_counter()
+            try:
+                model = entry.loader()
+            except Exception as e:
+                entry.error = str(e)
+                entry.failures += 1
+                backoff = min(self.retry_backoff * 2 ** (entry.failures - 1), self.max_retry_backoff)
+                entry.retry_at = time.monotonic() + backoff
+                entry.state = "failed"
+                logger.error(f"Could not load ML model {entry.model_name} (retry in {backoff:.0f}s): {e}")
+            else:
+                entry.model = model
+                entry.error = None
+                entry.state = "ready"
+                logger.info(f"ML model {entry.model_name} loaded in {time.perf_counter() - started:.1f}s")
+            entry.load_seconds = round(time.perf_counter() - started, 1)
+            entry.loaded.set()
+
+    @property
+    def degraded(self) -> bool:
+        """Some model failed to load and callers are on their fallback"""
+        return any(entry.state == "failed" for entry in self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model readiness for health endpoints"""
+        now = time.monotonic()
+        return {
+            name: {
+                'model': entry.model_name,
+                'state': entry.state,
+                'load_seconds': entry.load_seconds,
+                'error': entry.error,
+                'failures': entry.failures,
+                'retry_in_seconds': round(max(entry.retry_at - now, 0.0)) if entry.state == "failed" else None
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+# Singleton instance
+_model_registry_instance = None
+
+def get_model_registry() -> ModelRegistry:
+    """Get singleton instance of the model registry (zero-shot classifier + sentence embeddings)"""
+    global _model_registry_instance
+    if _model_registry_instance is None:
+        _model_registry_instance = ModelRegistry()
+        _model_registry_instance.register(ZERO_SHOT, _load_zero_shot, ZERO_SHOT_MODEL)
+        _model_registry_instance.register(SENTENCE_EMBEDDINGS, _load_sentence_embeddings, SENTENCE_EMBEDDINGS_MODEL)
+    return _model_registry_instance
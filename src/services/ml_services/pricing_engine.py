@@ -3,9 +3,11 @@ ML-powered pricing recommendation engine with smart categorization
 """
 from typing import Dict, List, Optional
 from decimal import Decimal
+import asyncio
 import logging
 from datetime import datetime, timedelta
 import statistics
+from ...database.connection import AsyncSessionFactory
 from .category_classifier import get_category_classifier
 from .price_utils import (
     round_price_colombian, 
@@ -40,15 +42,20 @@ class PricingRecommendationEngine:
                                  cost_price: Decimal,
                                  quantity: Decimal,
                                  historical_data: List[Dict] = None,
-                                 supplier: Optional[str] = None) -> Dict:
+                                 supplier: Optional[str] = None,
+                                 category_info: Optional[Dict] = None) -> Dict:
         """
         Comprehensive pricing recommendation using multiple ML and business factors
+        
+        category_info: classification already computed (recommend_sale_prices
+        classifies a whole invoice in one batch); classified here when omitted
         """
         historical_data = historical_data or []
         
         try:
             # 1. ML-powered product categorization
-            category_info = self.category_classifier.classify_product(description)
+            if category_info is None:
+                category_info = self.category_classifier.classify_product(description)
             logger.info(f"Product '{description[:50]}...' classified as: {category_info['category']} "
                        f"(confidence: {category_info['confidence']:.2f})")
             
@@ -172,6 +179,51 @@ class PricingRecommendationEngine:
             # Fallback to simple calculation
             return self._fallback_pricing(cost_price, quantity)
     
+    async def recommend_sale_prices(self,
+                                    line_items: List[Dict],
+                                    historical_data: List[Dict] = None,
+                                    supplier: Optional[str] = None,
+                                    tenant_id: Optional[str] = None) -> List[Dict]:
+        """
+        Recommendations for every line item of an invoice
+        
+        All descriptions are classified in one batched zero-shot call, run off
+        the event loop; the per-item pricing rules are cheap. With a
+        ``tenant_id`` the tenant's stored classifications are loaded first
+        and new ones saved after, so known products never reach the model.
+        Line items need product_code, description, unit_price and quantity.
+        """
+        classifier = self.category_classifier
+        descriptions = [item.get('description') or '' for item in line_items]
+        
+        if tenant_id is not None:
+            async with AsyncSessionFactory() as session:
+                await classifier.cache.load(session, tenant_id, classifier.description_keys(descriptions))
+        
+        loop = asyncio.get_running_loop()
+        categories = await loop.run_in_executor(
+            None,
+            lambda: classifier.classify_products(descriptions, tenant_id=tenant_id)
+        )
+        
+        if tenant_id is not None:
+            async with AsyncSessionFactory() as session:
+                if await classifier.cache.flush(session):
+                    await session.commit()
+        
+        return [
+            await self.recommend_sale_price(
+                product_code=item.get('product_code'),
+                description=item.get('description') or '',
+                cost_price=Decimal(str(item['unit_price'])),
+                quantity=Decimal(str(item['quantity'])),
+                historical_data=historical_data,
+                supplier=supplier,
+                category_info=category_info
+            )
+            for item, category_info in zip(line_items, categories)
+        ]
+    
     def _get_historical_price(self, product_code: str, historical_data: List[Dict]) -> Optional[Decimal]:
         """Analyze historical pricing for this specific product"""
         if not product_code:
@@ -0,0 +1,317 @@
+"""
+Per-tenant embedding index of the product catalog
+Each product description is embedded once (by add_products, or by a
+background backfill started with every index refresh) and stored in
+product_embeddings; lookups are one matrix-vector product over the
+tenant's normalized embeddings plus an argpartition top-k
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...config.settings import settings
+from ...database.connection import AsyncSessionFactory
+from ...database.models import Product, ProductEmbedding
+from .model_registry import SENTENCE_EMBEDDINGS, SENTENCE_EMBEDDINGS_MODEL, get_model_registry
+
+logger = logging.getLogger(__name__)
+
+# Products embedded per model call when backfilling a catalog
+EMBED_BATCH = 256
+
+# Refreshes re-read rows this far behind the newest one seen: created_at is
+# the writing transaction's start, so a long transaction can commit a row
+# older than rows another worker committed (and this one read) before it
+RESCAN_WINDOW = timedelta(minutes=5)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class ProductEmbeddingIndex:
+    """
+    Exact cosine-similarity index over unit vectors (in memory, one tenant)
+
+    Rows live in one preallocated float32 matrix that grows by half when full.
+    Adding an existing id overwrites its row; removing moves the last row
+    into the hole, so both are O(1) per product and the live rows stay
+    contiguous for the matrix product.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((max(capacity, 1), dim), dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, product_id: str) -> bool:
+        return str(product_id) in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        return self._vectors.nbytes
+
+    def add(self, product_ids: Sequence[str], embeddings: np.ndarray) -> None:
+        vectors = _normalize(np.asarray(embeddings).reshape(len(product_ids), self.dim))
+        with self._lock:
+            for product_id, vector in zip(map(str, product_ids), vectors):
+                row = self._rows.get(product_id)
+                if row is None:
+                    row = len(self._ids)
+                    if row == len(self._vectors):
+                        self._grow()
+                    self._rows[product_id] = row
+                    self._ids.append(product_id)
+                self._vectors[row] = vector
+
+    def _grow(self) -> None:
+        grown = np.zeros((len(self._vectors) * 3 // 2 + 1, self.dim), dtype=np.float32)
+        grown[:len(self._vectors)] = self._vectors
+        self._vectors = grown
+
+    def remove(self, product_ids: Sequence[str]) -> int:
+        removed = 0
+        with self._lock:
+            for product_id in map(str, product_ids):
+                row = self._rows.pop(product_id, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    moved = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                self._ids.pop()
+                removed += 1
+        return removed
+
+    def search(self, query: np.ndarray, k: int = 10, min_score: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Top ``k`` (product id, cosine similarity), best first"""
+        query = _normalize(np.asarray(query).reshape(self.dim))
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or k <= 0:
+                return []
+            scores = self._vectors[:count] @ query
+            if k < count:
+                top = np.argpartition(scores, count - k)[count - k:]
+            else:
+                top = np.arange(count)
+            top = top[np.argsort(-scores[top], kind='stable')]
+            ids = [self._ids[row] for row in top]
+
+        return [
+            (product_id, float(scores[row]))
+            for product_id, row in zip(ids, top)
+            if min_score is None or scores[row] >= min_score
+        ]
+
+
+class ProductEmbeddingStore:
+    """
+    Embeddings in product_embeddings, indexes cached per tenant and process
+
+    ``add_products``/``remove_products`` write the table and keep a loaded
+    index in step. Every PRODUCT_INDEX_REFRESH_SECONDS an index picks up
+    rows other workers added and starts a background task embedding catalog
+    products that still have none (created without add_products, or while
+    the model was loading), so a large backfill never holds up lookups.
+    Products deleted elsewhere may still be returned by a stale index, so
+    callers resolve hits against the products table. Until a backfill has
+    found nothing left to embed, ``is_complete`` is False and part of the
+    catalog is missing from the index.
+    """
+
+    def __init__(self, models=None, refresh_seconds: Optional[int] = None):
+        self.models = models or get_model_registry()
+        self.model_name = SENTENCE_EMBEDDINGS_MODEL
+        self.refresh_seconds = settings.product_index_refresh_seconds if refresh_seconds is None else refresh_seconds
+
+        self._indexes: Dict[str, ProductEmbeddingIndex] = {}
+        self._watermarks: Dict[str, Tuple[Optional[datetime], float]] = {}  # newest row, refreshed at
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._backfills: Dict[str, asyncio.Task] = {}
+        self._complete: Dict[str, bool] = {}  # every product embedded, as of the last backfill
+
+    async def encode(self, descriptions: List[str]) -> Optional[np.ndarray]:
+        """Normalized embeddings off the event loop; None while the model is not ready"""
+        model = self.models.get(SENTENCE_EMBEDDINGS)
+        if model is None:
+            return None
+        loop = asyncio.get_running_loop()
+        embeddings = await loop.run_in_executor(
+            None,
+            lambda: model.encode(descriptions, batch_size=64, normalize_embeddings=True, convert_to_numpy=True)
+        )
+        return _normalize(embeddings)
+
+    async def add_products(self, session: AsyncSession, tenant_id: str, products: Sequence[Any]) -> int:
+        """
+        Embed and store products (objects or dicts with id and description); caller commits
+
+        Returns the number stored, 0 when the model is not ready yet (the
+        next index load embeds whatever is missing).
+        """
+        products = [product for product in products if _field(product, 'description')]
+        if not products:
+            return 0
+        embeddings = await self.encode([_field(product, 'description') for product in products])
+        if embeddings is None:
+            return 0
+
+        statement = insert(ProductEmbedding).values([
+            {
+                'product_id': as_uuid(_field(product, 'id')),
+                'tenant_id': tenant_id,
+                'model': self.model_name,
+                'embedding': vector.astype(np.float32).tobytes(),
+                'created_at': func.now()  # Database clock, like the refresh watermark
+            }
+            for product, vector in zip(products, embeddings)
+        ])
+        await session.execute(statement.on_conflict_do_update(
+            index_elements=[ProductEmbedding.product_id],
+            set_={
+                'model': statement.excluded.model,
+                'embedding': statement.excluded.embedding,
+                'created_at': statement.excluded.created_at
+            }
+        ))
+
+        index = self._indexes.get(tenant_id)
+        if index is None and tenant_id in self._watermarks:
+            # Loaded tenant whose catalog had no embeddings yet
+            index = self._indexes[tenant_id] = ProductEmbeddingIndex(embeddings.shape[1])
+        if index is not None:
+            index.add([str(_field(product, 'id')) for product in products], embeddings)
+        return len(products)
+
+    async def remove_products(self, session: AsyncSession, tenant_id: str, product_ids: Sequence[Any]) -> int:
+        """Drop products from the table and the loaded index; caller commits"""
+        await session.execute(
+            delete(ProductEmbedding)
+            .where(ProductEmbedding.tenant_id == tenant_id)
+            .where(ProductEmbedding.product_id.in_([as_uuid(product_id) for product_id in product_ids]))
+        )
+        index = self._indexes.get(tenant_id)
+        return index.remove([str(product_id) for product_id in product_ids]) if index is not None else 0
+
+    def is_complete(self, tenant_id: str) -> bool:
+        """Whether the tenant's index covers its whole catalog (False until a backfill confirms it)"""
+        return self._complete.get(tenant_id, False)
+
+    async def get_index(self, session: AsyncSession, tenant_id: str) -> Optional[ProductEmbeddingIndex]:
+        """The tenant's index, loaded on first use and refreshed periodically; None if it has no embeddings"""
+        lock = self._locks.setdefault(tenant_id, asyncio.Lock())
+        async with lock:
+            watermark, refreshed_at = self._watermarks.get(tenant_id, (None, 0.0))
+            if tenant_id not in self._indexes or time.monotonic() - refreshed_at >= self.refresh_seconds:
+                await self._load(session, tenant_id, watermark)
+            index = self._indexes.get(tenant_id)
+        return index if index is not None and len(index) else None
+
+    async def _load(self, session: AsyncSession, tenant_id: str, since: Optional[datetime]) -> None:
+        """Rows written since ``since`` (all when None), then starts the backfill of products that have none"""
+        query = (
+            select(ProductEmbedding.product_id, ProductEmbedding.embedding, ProductEmbedding.created_at)
+            .where(ProductEmbedding.tenant_id == tenant_id)
+            .where(ProductEmbedding.model == self.model_name)
+        )
+        if since is not None:
+            query = query.where(ProductEmbedding.created_at >= since - RESCAN_WINDOW)  # re-adding a row is idempotent
+        rows = (await session.execute(query)).all()
+
+        index = self._indexes.get(tenant_id)
+        if rows:
+            matrix = np.frombuffer(b"".join(row.embedding for row in rows), dtype=np.float32).reshape(len(rows), -1)
+            if index is None:
+                index = ProductEmbeddingIndex(matrix.shape[1], capacity=len(rows))
+            index.add([str(row.product_id) for row in rows], matrix)
+            since = max([row.created_at for row in rows] + ([since] if since else []))
+        if index is not None:
+            self._indexes[tenant_id] = index
+        self._watermarks[tenant_id] = (since, time.monotonic())
+
+        self._start_backfill(tenant_id)
+
+    def _start_backfill(self, tenant_id: str) -> None:
+        """Embed missing products in the background, one task per tenant at a time"""
+        if self.models.get(SENTENCE_EMBEDDINGS) is None:
+            return
+        task = self._backfills.get(tenant_id)
+        if task is None or task.done():
+            self._backfills[tenant_id] = asyncio.create_task(self._embed_missing(tenant_id))
+
+    async def _embed_missing(self, tenant_id: str) -> None:
+        """Backfill catalog products without an embedding from the current model, on a session of its own"""
+        try:
+            async with AsyncSessionFactory() as session:
+                result = await session.execute(
+                    select(Product.id, Product.description)
+                    .outerjoin(ProductEmbedding, (ProductEmbedding.product_id == Product.id)
+                               & (ProductEmbedding.model == self.model_name))
+                    .where(Product.tenant_id == tenant_id)
+                    .where(Product.description.isnot(None))
+                    .where(Product.description != '')
+                    .where(ProductEmbedding.product_id.is_(None))
+                )
+                missing = result.all()
+                if not missing:
+                    self._complete[tenant_id] = True
+                    return
+
+                self._complete[tenant_id] = False
+                # Committed per batch: a long backfill keeps its progress
+                embedded = 0
+                for start in range(0, len(missing), EMBED_BATCH):
+                    embedded += await self.add_products(session, tenant_id, missing[start:start + EMBED_BATCH])
+                    await session.commit()
+            self._complete[tenant_id] = embedded == len(missing)
+            logger.info(f"Embedded {embedded} of {len(missing)} catalog products for tenant {tenant_id}")
+        except Exception as e:
+            self._complete[tenant_id] = False
+            logger.error(f"Embedding backfill failed for tenant {tenant_id}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Index sizes for health/metrics endpoints"""
+        return {
+            'tenants': len(self._indexes),
+            'products': sum(len(index) for index in self._indexes.values()),
+            'memory_mb': round(sum(index.nbytes for index in self._indexes.values()) / 2 ** 20, 1)
+        }
+
+
+def _field(product: Any, name: str) -> Any:
+    return product.get(name) if isinstance(product, dict) else getattr(product, name)
+
+
+def as_uuid(product_id: Any) -> uuid.UUID:
+    return product_id if isinstance(product_id, uuid.UUID) else uuid.UUID(str(product_id))
+
+
+# Singleton instance
+_product_embedding_store_instance = None
+
+def get_product_embedding_store() -> ProductEmbeddingStore:
+    """Get singleton instance of the product embedding store"""
+    global _product_embedding_store_instance
+    if _product_embedding_store_instance is None:
+        _product_embedding_store_instance = ProductEmbeddingStore()
+    return _product_embedding_store_instance
@@ -5,9 +5,12 @@ import asyncio
 from typing import List, Dict, Any, Tuple, Optional
 from decimal import Decimal
 import logging
-from sentence_transformers import SentenceTransformer
 from fuzzywuzzy import fuzz
-import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...database.models import Product
+from .product_index import as_uuid, get_product_embedding_store
 
 logger = logging.getLogger(__name__)
 
@@ -15,32 +18,22 @@ class IntelligentProductMatcher:
     """Smart product matching using ML + fuzzy matching"""
     
     def __init__(self):
-        self.model = None
-        self._load_model()
-    
-    def _load_model(self):
-        """Load sentence transformer model"""
-        try:
-            # Usar modelo multilingüe para español
-            self.model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-            logger.info("Product matching model loaded successfully")
-        except Exception as e:
-            logger.warning(f"Could not load ML model: {e}")
-            self.model = None
+        self.store = get_product_embedding_store()
     
     async def find_similar_products(self, 
                                    new_description: str, 
                                    existing_products: List[Dict],
                                    threshold: float = 0.75) -> List[Dict]:
         """
-        Find similar products using ML + fuzzy matching
+        Find similar products by fuzzy string matching
+        
+        Semantic matching needs stored embeddings, so it only runs against a
+        tenant's catalog: use find_catalog_matches.
         """
         if not existing_products:
             return []
         
         matches = []
-        
-        # 1. Fuzzy string matching (fast)
         for product in existing_products:
             existing_desc = product.get('description', '')
             fuzzy_score = fuzz.ratio(new_description.lower(), existing_desc.lower()) / 100
@@ -53,47 +46,91 @@ class IntelligentProductMatcher:
                     'confidence': 'high' if fuzzy_score > 0.9 else 'medium'
                 })
         
-        # 2. ML semantic matching (if available and no good fuzzy matches)
-        if self.model and len(matches) < 3:
-            try:
-                semantic_matches = await self._semantic_matching(
-                    new_description, existing_products, threshold
-                )
-                matches.extend(semantic_matches)
-            except Exception as e:
-                logger.warning(f"Semantic matching failed: {e}")
-        
         # Sort by similarity score
         matches.sort(key=lambda x: x['similarity_score'], reverse=True)
         
         return matches[:5]  # Top 5 matches
     
-    async def _semantic_matching(self, 
-                                new_description: str,
-                                existing_products: List[Dict],
-                                threshold: float) -> List[Dict]:
-        """Semantic similarity using embeddings"""
+    async def find_catalog_matches(self,
+                                   session: AsyncSession,
+                                   tenant_id: str,
+                                   new_description: str,
+                                   threshold: float = 0.75,
+                                   limit: int = 5,
+                                   candidates: int = 50) -> List[Dict]:
+        """
+        Similar products from the tenant's catalog (products table)
         
-        # Get embeddings
-        descriptions = [new_description] + [p.get('description', '') for p in existing_products]
-        embeddings = self.model.encode(descriptions)
+        Semantic candidates come from the tenant's embedding index: one
+        matrix product over stored embeddings, nothing re-encoded but the
+        new description. Fuzzy scoring then runs on those ``candidates``
+        only. Until every product of the tenant is embedded (see
+        ProductEmbeddingStore.is_complete) the whole catalog is fuzzy
+        matched as well, so products not in the index yet are still found.
+        """
+        index = await self.store.get_index(session, tenant_id)
+        query = await self.store.encode([new_description]) if index is not None else None
+        if query is None:
+            return await self.find_similar_products(
+                new_description, await self._load_catalog(session, tenant_id), threshold
+            )
         
-        new_embedding = embeddings[0]
-        existing_embeddings = embeddings[1:]
+        hits = index.search(query[0], k=candidates)
+        if self.store.is_complete(tenant_id):
+            catalog = await self._load_catalog(session, tenant_id, [product_id for product_id, _ in hits])
+        else:
+            catalog = await self._load_catalog(session, tenant_id)
+        products = {product['id']: product for product in catalog}
         
-        # Calculate cosine similarity
-        similarities = np.dot(existing_embeddings, new_embedding) / (
-            np.linalg.norm(existing_embeddings, axis=1) * np.linalg.norm(new_embedding)
-        )
+        # Hits first, then (partial index) every other product by fuzzy score alone
+        scored = dict(hits)
+        scored.update((product_id, 0.0) for product_id in products if product_id not in scored)
         
         matches = []
-        for i, similarity in enumerate(similarities):
-            if similarity >= threshold:
+        for product_id, similarity in scored.items():
+            product = products.get(product_id)
+            if product is None:
+                continue  # deleted since the index was loaded
+            
+            # One entry per product, from whichever score is higher
+            fuzzy_score = fuzz.ratio(new_description.lower(), product['description'].lower()) / 100
+            if fuzzy_score >= threshold and fuzzy_score >= similarity:
+                matches.append({
+                    'product': product,
+                    'similarity_score': fuzzy_score,
+                    'match_type': 'fuzzy',
+                    'confidence': 'high' if fuzzy_score > 0.9 else 'medium'
+                })
+            elif similarity >= threshold:
                 matches.append({
-                    'product': existing_products[i],
-                    'similarity_score': float(similarity),
+                    'product': product,
+                    'similarity_score': similarity,
                     'match_type': 'semantic',
                     'confidence': 'high' if similarity > 0.85 else 'medium'
                 })
         
-        return matches
+        matches.sort(key=lambda x: x['similarity_score'], reverse=True)
+        return matches[:limit]
+    
+    async def _load_catalog(self,
+                            session: AsyncSession,
+                            tenant_id: str,
+                            product_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Catalog products of a tenant (only ``product_ids`` when given)"""
+        query = (
+            select(Product.id, Product.product_code, Product.description, Product.last_purchase_price)
+            .where(Product.tenant_id == tenant_id)
+        )
+        if product_ids is not None:
+            query = query.where(Product.id.in_([as_uuid(product_id) for product_id in product_ids]))
+        
+        result = await session.execute(query)
+        return [
+            {
+                'id': str(row.id),
+                'product_code': row.product_code,
+                'description': row.description,
+                'last_purchase_price': float(row.last_purchase_price) if row.last_purchase_price is not None else None
+            }
+            for row in result
+        ]
@@ -0,0 +1,176 @@
+"""
+Train the supervised category head used by ML_CLASSIFIER_BACKEND=embedding_head
+
+Labelled line items come from a CSV (description,category) and/or are
+distilled from confident zero-shot classifications already stored in
+product_classifications. Descriptions are cleaned like at inference,
+embedded with multilingual MiniLM and fitted with a softmax regression.
+
+Usage:
+    python -m src.services.ml_services.train_category_head --data labelled.csv
+    python -m src.services.ml_services.train_category_head --from-cache --min-confidence 0.8
+"""
+import argparse
+import asyncio
+import csv
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ...config.settings import settings
+from .category_classifier import ProductCategoryClassifier
+from .classifier_backends import CategoryHead
+from .model_registry import SENTENCE_EMBEDDINGS, SENTENCE_EMBEDDINGS_MODEL, get_model_registry
+
+logger = logging.getLogger(__name__)
+
+
+def fit_category_head(
+    embeddings: np.ndarray,
+    labels: List[str],
+    epochs: int = 500,
+    learning_rate: float = 2.0,
+    l2: float = 1e-4
+) -> CategoryHead:
+    """Full-batch gradient descent on the L2-regularized softmax cross-entropy"""
+    classes = sorted(set(labels))
+    index = {label: i for i, label in enumerate(classes)}
+    targets = np.zeros((len(labels), len(classes)), dtype=np.float32)
+    targets[np.arange(len(labels)), [index[label] for label in labels]] = 1.0
+
+    x = np.asarray(embeddings, dtype=np.float32)
+    head = CategoryHead(
+        labels=classes,
+        coef=np.zeros((len(classes), x.shape[1]), dtype=np.float32),
+        intercept=np.zeros(len(classes), dtype=np.float32)
+    )
+    for _ in range(epochs):
+        error = (head.predict_proba(x) - targets) / len(x)
+        head.coef -= learning_rate * (error.T @ x + l2 * head.coef)
+        head.intercept -= learning_rate * error.sum(axis=0)
+    return head
+
+
+def accuracy(head: CategoryHead, embeddings: np.ndarray, labels: List[str]) -> float:
+    if not labels:
+        return 0.0
+    predicted = np.argmax(head.predict_proba(np.asarray(embeddings, dtype=np.float32)), axis=1)
+    return float(np.mean([head.labels[i] == label for i, label in zip(predicted, labels)]))
+
+
+def load_labelled_csv(path: str, classifier: ProductCategoryClassifier) -> List[Tuple[str, str]]:
+    """(cleaned description, Spanish label) pairs; category may be English ('shoes') or the Spanish label"""
+    spanish = {english: label for label, english in classifier.category_mapping.items()}
+    examples = []
+    with open(path, newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            description = (row.get('description') or '').strip()
+            category = (row.get('category') or '').strip()
+            label = spanish.get(category, category)
+            if not description or label not in classifier.category_mapping:
+                logger.warning(f"Skipping row with unknown category '{category}': {description[:50]}")
+                continue
+            examples.append((classifier._clean_description(description), label))
+    return examples
+
+
+async def load_cached_examples(
+    classifier: ProductCategoryClassifier,
+    min_confidence: float,
+    tenant_id: Optional[str] = None
+) -> List[Tuple[str, str]]:
+    """Confident zero-shot classifications from product_classifications (distillation)"""
+    from sqlalchemy import select
+
+    from ...database.connection import AsyncSessionFactory
+    from ...database.models import ProductClassification
+
+    query = (
+        select(ProductClassification.description_key, ProductClassification.category_spanish)
+        .where(ProductClassification.method == "ml_zero_shot")
+        .where(ProductClassification.confidence >= min_confidence)
+    )
+    if tenant_id:
+        query = query.where(ProductClassification.tenant_id == tenant_id)
+
+    async with AsyncSessionFactory() as session:
+        result = await session.execute(query)
+        return [
+            (row.description_key, row.category_spanish) for row in result
+            if row.category_spanish in classifier.category_mapping
+        ]
+
+
+def split_examples(
+    examples: List[Tuple[str, str]],
+    eval_fraction: float,
+    seed: int
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Deduplicated, shuffled train/eval split (a description never lands in both)"""
+    unique: Dict[str, str] = dict(examples)
+    items = sorted(unique.items())
+    np.random.default_rng(seed).shuffle(items)
+    eval_count = int(len(items) * eval_fraction)
+    return items[eval_count:], items[:eval_count]
+
+
+def embed(descriptions: List[str], batch_size: int) -> np.ndarray:
+    model = get_model_registry().wait(SENTENCE_EMBEDDINGS)
+    if model is None:
+        raise RuntimeError(f"Could not load {SENTENCE_EMBEDDINGS_MODEL} (install sentence-transformers)")
+    return np.asarray(
+        model.encode(descriptions, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True),
+        dtype=np.float32
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train the embedding + logistic regression category head")
+    parser.add_argument('--data', action='append', default=[], help="CSV with description,category columns (repeatable)")
+    parser.add_argument('--from-cache', action='store_true', help="Also distill from stored zero-shot classifications")
+    parser.add_argument('--min-confidence', type=float, default=0.8, help="Zero-shot confidence needed to distill a row")
+    parser.add_argument('--tenant', help="Only this tenant's stored classifications")
+    parser.add_argument('--output', default=settings.ml_classifier_head_path, help="Where to write the head (.npz)")
+    parser.add_argument('--eval-fraction', type=float, default=0.2, help="Held-out share for the accuracy report")
+    parser.add_argument('--epochs', type=int, default=500)
+    parser.add_argument('--l2', type=float, default=1e-4)
+    parser.add_argument('--batch-size', type=int, default=64, help="Descriptions per embedding batch")
+    parser.add_argument('--seed', type=int, default=7)
+    return parser.parse_args(argv)
+
+
+async def train(args: argparse.Namespace) -> CategoryHead:
+    classifier = ProductCategoryClassifier()
+    examples = []
+    for path in args.data:
+        examples.extend(load_labelled_csv(path, classifier))
+    if args.from_cache:
+        examples.extend(await load_cached_examples(classifier, args.min_confidence, args.tenant))
+
+    train_set, eval_set = split_examples(examples, args.eval_fraction, args.seed)
+    if len({label for _, label in train_set}) < 2:
+        raise SystemExit("Need labelled examples of at least two categories")
+
+    train_x = embed([description for description, _ in train_set], args.batch_size)
+    head = fit_category_head(train_x, [label for _, label in train_set], epochs=args.epochs, l2=args.l2)
+
+    report = f"Trained on {len(train_set)} descriptions, {len(head.labels)} categories"
+    report += f", train accuracy {accuracy(head, train_x, [label for _, label in train_set]):.3f}"
+    if eval_set:
+        eval_x = embed([description for description, _ in eval_set], args.batch_size)
+        report += f", held-out accuracy {accuracy(head, eval_x, [label for _, label in eval_set]):.3f} ({len(eval_set)})"
+    print(report)
+
+    head.save(args.output)
+    print(f"Wrote {args.output} (head {head.fingerprint}); set ML_CLASSIFIER_BACKEND=embedding_head to use it")
+    return head
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(train(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Offline reprocessing of stored Textract responses
+"""
+from .backfill import InvoiceReprocessor, ReprocessCheckpoint, ReprocessStats
+
+__all__ = ['InvoiceReprocessor', 'ReprocessCheckpoint', 'ReprocessStats']
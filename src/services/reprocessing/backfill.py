@@ -0,0 +1,367 @@
+"""
+Offline re-extraction of invoices from their stored Textract responses
+Re-runs TextractService parsing without calling AWS again:
+
+    python -m src.services.reprocessing.backfill --dry-run
+    python -m src.services.reprocessing.backfill --tenant acme --workers 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+
+from sqlalchemy import select, update, delete, or_
+
+from ...database.connection import AsyncSessionFactory
+from ...database.models import ProcessedInvoice, InvoiceLineItem, TextractArtifact
+from ..document_processing.textract.archive import decode_textract_response
+from ..document_processing.textract.artifact_store import ARTIFACT_OWNER_ID
+from ..document_processing.textract.document_index import TextractDocumentIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_CHECKPOINT = ".reprocess_checkpoint.json"
+
+# Invoices a user has started pricing: replacing their line items would drop the prices
+PRICED_STATUSES = ("partial", "completed", "confirmed")
+
+# Line item columns compared by the dry-run diff
+LINE_ITEM_DIFF_FIELDS = ('product_code', 'description', 'reference', 'quantity', 'unit_price', 'subtotal', 'unit_measure')
+
+# Parts of the extraction result that are written back (the rest stays in the worker)
+EXTRACTED_KEYS = ('invoice_number', 'issue_date', 'due_date', 'supplier', 'customer', 'totals', 'payment_info', 'line_items')
+
+
+# --- Process pool side -------------------------------------------------------
+
+_worker_service = None
+
+
+def init_worker() -> None:
+    """Process pool initializer: one TextractService per worker process"""
+    global _worker_service
+    from ..document_processing.textract.textract_service import TextractService
+
+    logging.getLogger('src').setLevel(logging.WARNING)  # per-invoice INFO logs would drown the report
+    _worker_service = TextractService(max_concurrency=1)
+
+
+def reextract(payload: Tuple[str, Optional[bytes], Optional[Dict[str, Any]]]) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """(invoice_id, archive, raw_response) -> (invoice_id, extracted_data, error)"""
+    invoice_id, archive, raw_response = payload
+    try:
+        # Geometry is never read by the extractors
+        response = decode_textract_response(archive, geometry=False) if archive is not None else raw_response
+        extracted = _worker_service._extract_invoice_data(response, TextractDocumentIndex(response))
+        return invoice_id, {key: extracted.get(key) for key in EXTRACTED_KEYS}, None
+    except Exception as e:
+        return invoice_id, None, str(e)
+
+
+# --- Checkpoint and stats ----------------------------------------------------
+
+@dataclass
+class ReprocessStats:
+    scanned: int = 0
+    changed: int = 0
+    written: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Invoices per second"""
+        return self.scanned / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+class ReprocessCheckpoint:
+    """
+    Last committed invoice id and running totals, kept in a JSON file
+
+    Invoices are streamed in invoice_id order, so everything up to the
+    checkpoint is done and a resumed run continues right after it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self, tenant_id: Optional[str]) -> Tuple[Optional[uuid.UUID], ReprocessStats]:
+        if not os.path.exists(self.path):
+            return None, ReprocessStats()
+
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get('tenant_id') != tenant_id:
+            raise ValueError(
+                f"Checkpoint {self.path} belongs to tenant {state.get('tenant_id')!r}, "
+                f"not {tenant_id!r}; use --restart or another --checkpoint"
+            )
+        return uuid.UUID(state['last_invoice_id']), ReprocessStats(**state['stats'])
+
+    def save(self, last_invoice_id: uuid.UUID, tenant_id: Optional[str], stats: ReprocessStats) -> None:
+        """Write atomically so a crash never leaves a half-written checkpoint"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'last_invoice_id': str(last_invoice_id), 'tenant_id': tenant_id, 'stats': asdict(stats)}, f)
+        os.replace(temp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# --- Runner ------------------------------------------------------------------
+
+class InvoiceReprocessor:
+    """
+    Streams stored Textract responses, re-extracts them on a process pool
+    and writes changed invoices back in bulk, one transaction per batch
+    """
+
+    def __init__(
+        self,
+        processor=None,
+        tenant_id: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: Optional[int] = None,
+        dry_run: bool = False,
+        include_priced: bool = False,
+        limit: Optional[int] = None,
+        checkpoint: Optional[ReprocessCheckpoint] = None,
+        executor: Optional[Executor] = None,
+        report=print
+    ):
+        if processor is None:
+            from ..document_processing import InvoiceProcessorService
+            processor = InvoiceProcessorService()
+
+        self.processor = processor
+        self.tenant_id = tenant_id
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.dry_run = dry_run
+        self.include_priced = include_priced
+        self.limit = limit
+        self.checkpoint = checkpoint
+        self.executor = executor
+        self.report = report
+
+        # Same column set the processor writes on first extraction
+        self.field_columns = list(processor._invoice_field_values({}).keys())
+
+    def build_stream_query(self, after_invoice_id: Optional[uuid.UUID] = None):
+        """
+        Stored responses with the current invoice fields, in invoice_id order
+
+        Cache-served invoices have no artifact of their own and are streamed
+        with their original invoice's response.
+        """
+        query = (
+            select(
+                ProcessedInvoice.id.label('invoice_id'),
+                TextractArtifact.archive,
+                TextractArtifact.raw_response,
+                ProcessedInvoice.pricing_status,
+                *[getattr(ProcessedInvoice, column) for column in self.field_columns]
+            )
+            .join(TextractArtifact, TextractArtifact.invoice_id == ARTIFACT_OWNER_ID)
+            .where(ProcessedInvoice.status == "completed")
+            .order_by(ProcessedInvoice.id)
+        )
+        if self.tenant_id:
+            query = query.where(ProcessedInvoice.tenant_id == self.tenant_id)
+        if after_invoice_id is not None:
+            query = query.where(ProcessedInvoice.id > after_invoice_id)
+        if not self.include_priced:
+            query = query.where(or_(
+                ProcessedInvoice.pricing_status.is_(None),
+                ProcessedInvoice.pricing_status.notin_(PRICED_STATUSES)
+            ))
+        if self.limit:
+            query = query.limit(self.limit)
+        return query
+
+    async def stream_batches(self, after_invoice_id: Optional[uuid.UUID]) -> AsyncIterator[List[Any]]:
+        """Server-side cursor: only ``batch_size`` rows are held in memory at a time"""
+        async with AsyncSessionFactory() as session:
+            result = await session.stream(
+                self.build_stream_query(after_invoice_id).execution_options(yield_per=self.batch_size)
+            )
+            async for partition in result.partitions(self.batch_size):
+                yield partition
+
+    async def load_line_items(self, invoice_ids: List[uuid.UUID]) -> Dict[uuid.UUID, List[Any]]:
+        """Current line items of a batch, one IN query"""
+        async with AsyncSessionFactory() as session:
+            result = await session.execute(
+                select(InvoiceLineItem.invoice_id, *[getattr(InvoiceLineItem, field) for field in LINE_ITEM_DIFF_FIELDS])
+                .where(InvoiceLineItem.invoice_id.in_(invoice_ids))
+            )
+            items: Dict[uuid.UUID, List[Any]] = {}
+            for row in result:
+                items.setdefault(row.invoice_id, []).append(row)
+            return items
+
+    async def write_batch(
+        self,
+        invoice_updates: List[Dict[str, Any]],
+        line_item_rows: List[Dict[str, Any]]
+    ) -> None:
+        """Bulk UPDATE by primary key, replace line items, one transaction"""
+        invoice_ids = [values['id'] for values in invoice_updates]
+        async with AsyncSessionFactory() as session:
+            try:
+                await session.execute(update(ProcessedInvoice), invoice_updates)
+                await session.execute(delete(InvoiceLineItem).where(InvoiceLineItem.invoice_id.in_(invoice_ids)))
+                await self.processor._bulk_insert_line_items(session, line_item_rows)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    def diff_invoice(self, row, current_items: List[Any], fields: Dict[str, Any], new_items: List[Dict[str, Any]]) -> List[str]:
+        """Human-readable differences between stored and re-extracted data"""
+        changes = [
+            f"{column}: {getattr(row, column)!r} -> {fields[column]!r}"
+            for column in self.field_columns
+            if getattr(row, column) != fields[column]
+        ]
+
+        # Compared as multisets: stored rows may lack a usable line_number order
+        current = Counter(tuple(getattr(item, field) for field in LINE_ITEM_DIFF_FIELDS) for item in current_items)
+        new = Counter(tuple(item[field] for field in LINE_ITEM_DIFF_FIELDS) for item in new_items)
+        if current != new:
+            removed, added = sum((current - new).values()), sum((new - current).values())
+            changes.append(
+                f"line_items: {sum(current.values())} -> {sum(new.values())} rows "
+                f"({removed} removed, {added} added)"
+            )
+        return changes
+
+    async def _extract(self, pool: Executor, rows: List[Any]) -> List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*[
+            loop.run_in_executor(pool, reextract, (str(row.invoice_id), row.archive, row.raw_response))
+            for row in rows
+        ])
+
+    async def process_batch(self, pool: Executor, rows: List[Any], stats: ReprocessStats) -> None:
+        results = await self._extract(pool, rows)
+        current_items = await self.load_line_items([row.invoice_id for row in rows])
+
+        invoice_updates, line_item_rows = [], []
+        for row, (invoice_id, extracted, error) in zip(rows, results):
+            stats.scanned += 1
+            if error is not None:
+                stats.failed += 1
+                logger.warning(f"Re-extraction failed for {invoice_id}: {error}")
+                continue
+
+            fields = self.processor._invoice_field_values(extracted)
+            new_items = self.processor._build_line_item_rows(row.invoice_id, extracted.get('line_items') or [])
+            changes = self.diff_invoice(row, current_items.get(row.invoice_id, []), fields, new_items)
+            if not changes:
+                continue
+
+            stats.changed += 1
+            if self.dry_run:
+                self.report(f"~ {invoice_id}")
+                for change in changes:
+                    self.report(f"    {change}")
+                continue
+
+            values = {'id': row.invoice_id, **fields}
+            if row.pricing_status in PRICED_STATUSES:
+                values['pricing_status'] = "pending"  # --include-priced: prices go with the old lines
+            invoice_updates.append(values)
+            line_item_rows.extend(new_items)
+
+        if invoice_updates:
+            await self.write_batch(invoice_updates, line_item_rows)
+            stats.written += len(invoice_updates)
+
+    async def run(self, restart: bool = False) -> ReprocessStats:
+        """Reprocess everything after the checkpoint; returns cumulative stats"""
+        after_invoice_id, stats = None, ReprocessStats()
+        if self.checkpoint and not self.dry_run:
+            if restart:
+                self.checkpoint.clear()
+            after_invoice_id, stats = self.checkpoint.load(self.tenant_id)
+            if after_invoice_id:
+                logger.info(f"Resuming after invoice {after_invoice_id} ({stats.scanned} already scanned)")
+
+        pool = self.executor or ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+        previous_elapsed = stats.elapsed_seconds
+        started = time.perf_counter()
+        try:
+            async for rows in self.stream_batches(after_invoice_id):
+                batch_started = time.perf_counter()
+                await self.process_batch(pool, rows, stats)
+                stats.elapsed_seconds = previous_elapsed + time.perf_counter() - started
+
+                if self.checkpoint and not self.dry_run:
+                    self.checkpoint.save(rows[-1].invoice_id, self.tenant_id, stats)
+
+                batch_rate = len(rows) / max(time.perf_counter() - batch_started, 1e-9)
+                logger.info(
+                    f"Reprocessed {stats.scanned} invoices: {stats.rate:.1f}/s overall, "
+                    f"{batch_rate:.1f}/s last batch, {stats.changed} changed, {stats.failed} failed"
+                )
+        finally:
+            if self.executor is None:
+                pool.shutdown()
+
+        self.report(
+            f"{'Dry run: ' if self.dry_run else ''}{stats.scanned} invoices in {stats.elapsed_seconds:.1f}s "
+            f"({stats.rate:.1f} invoices/s), {stats.changed} changed, {stats.written} written, {stats.failed} failed"
+        )
+        return stats
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-extract invoices from stored Textract responses")
+    parser.add_argument('--tenant', help="Only this tenant's invoices")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Invoices per fetch/write batch")
+    parser.add_argument('--workers', type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument('--dry-run', action='store_true', help="Print differences, write nothing")
+    parser.add_argument('--include-priced', action='store_true', help="Also rewrite invoices that have prices (they are lost)")
+    parser.add_argument('--limit', type=int, default=None, help="Stop after this many invoices")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="Checkpoint file for resuming")
+    parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint")
+    return parser.parse_args(argv)
+
+
+async def run_backfill(args: argparse.Namespace) -> ReprocessStats:
+    from ...database.connection import init_database, close_database
+
+    await init_database()
+    try:
+        reprocessor = InvoiceReprocessor(
+            tenant_id=args.tenant,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            dry_run=args.dry_run,
+            include_priced=args.include_priced,
+            limit=args.limit,
+            checkpoint=ReprocessCheckpoint(args.checkpoint)
+        )
+        return await reprocessor.run(restart=args.restart)
+    finally:
+        await close_database()
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_backfill(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
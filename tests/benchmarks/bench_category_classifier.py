@@ -0,0 +1,74 @@
+"""
+Benchmark: per-item zero-shot classification vs. one batched call
+
+Classifies a synthetic invoice's line-item descriptions with the real
+zero-shot model, first one classify_product() call per item (the previous
+pricing-endpoint loop), then one classify_products() call, and reports
+items/second for each batch size. Needs transformers + torch and the model
+weights (downloaded on first run).
+
+Usage: python tests/benchmarks/bench_category_classifier.py [items] [batch_sizes...]
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import logging
+
+from src.services.ml_services.category_classifier import ProductCategoryClassifier
+from src.services.ml_services.classifier_backends import ZeroShotBackend
+from src.services.ml_services.model_registry import ZERO_SHOT
+
+logging.disable(logging.CRITICAL)
+
+PRODUCTS = [
+    "CHANCLA RAJADO DAMA 36-40 (X7)", "SANDALIA PLATAFORMA NIÑA 28-33", "BOTA CUERO HOMBRE 38-43",
+    "CAMISETA POLO ALGODON TALLA M", "JEAN SKINNY DAMA TALLA 10", "AUDIFONOS BLUETOOTH INALAMBRICOS",
+    "CARGADOR USB TIPO C 20W", "CREMA HIDRATANTE FACIAL 50ML", "PERFUME DAMA 100ML",
+    "BALON FUTBOL NUMERO 5", "COLCHONETA YOGA 6MM", "LAMPARA ESCRITORIO LED",
+    "TOALLA BAÑO ALGODON", "RELOJ DEPORTIVO DIGITAL", "GORRA BEISBOLERA BORDADA",
+]
+
+
+def invoice_descriptions(items: int):
+    """Distinct descriptions, as the batch path dedupes repeats"""
+    return [f"{PRODUCTS[n % len(PRODUCTS)]} REF{n:04d}" for n in range(items)]
+
+
+def main(items: int, batch_sizes):
+    classifier = ProductCategoryClassifier()
+    classifier.backend = ZeroShotBackend()
+    classifier.cache.enabled = False  # measure the model, not the classification cache
+    if classifier.backend.models.wait(ZERO_SHOT) is None:
+        print("Zero-shot model could not be loaded (install transformers + torch)")
+        return
+
+    descriptions = invoice_descriptions(items)
+    classifier.classify_products(descriptions[:2])  # warm up
+
+    started = time.perf_counter()
+    loop_results = [classifier.classify_product(description) for description in descriptions]
+    loop_seconds = time.perf_counter() - started
+
+    print(f"{items} line items, {len(classifier.categories)} candidate labels")
+    print(f"{'mode':>14} {'seconds':>9} {'items/s':>9} {'speedup':>8} {'same labels':>12}")
+    print(f"{'per-item loop':>14} {loop_seconds:>9.2f} {items / loop_seconds:>9.1f} {'1.0x':>8} {'-':>12}")
+
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        batch_results = classifier.classify_products(descriptions, batch_size=batch_size)
+        seconds = time.perf_counter() - started
+        same = sum(a['category'] == b['category'] for a, b in zip(loop_results, batch_results))
+        print(f"{'batch ' + str(batch_size):>14} {seconds:>9.2f} {items / seconds:>9.1f} "
+              f"{loop_seconds / seconds:>7.1f}x {same:>6}/{items}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 40,
+        [int(size) for size in sys.argv[2:]] or [8, 32, 64]
+    )
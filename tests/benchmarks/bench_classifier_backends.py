@@ -0,0 +1,102 @@
+"""
+Benchmark: zero-shot (bart-large-mnli) vs. embedding head backend on CPU
+
+Splits labelled line items into train/held-out, trains the MiniLM +
+logistic regression head on the train part, then classifies the held-out
+part with both backends and reports accuracy and items/second. Without
+--data a small built-in labelled set is used (enough for a throughput
+comparison; use real labelled invoices for the accuracy number).
+Needs transformers, sentence-transformers and torch.
+
+Usage: python tests/benchmarks/bench_classifier_backends.py [--data labelled.csv] [--repeat N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import logging
+
+from src.services.ml_services.category_classifier import ProductCategoryClassifier
+from src.services.ml_services.classifier_backends import EmbeddingHeadBackend, ZeroShotBackend
+from src.services.ml_services.model_registry import SENTENCE_EMBEDDINGS, ZERO_SHOT
+from src.services.ml_services.train_category_head import (
+    embed, fit_category_head, load_labelled_csv, split_examples
+)
+
+logging.disable(logging.CRITICAL)
+
+LABELLED = {
+    'shoes': ["CHANCLA RAJADO DAMA 36-40", "SANDALIA PLATAFORMA NIÑA", "BOTA CUERO HOMBRE", "TENIS RUNNING UNISEX",
+              "MOCASIN CABALLERO", "ZAPATO ESCOLAR NEGRO", "CROCS CLASICA ADULTO", "BALETA DAMA CHAROL"],
+    'clothing': ["CAMISETA POLO ALGODON", "JEAN SKINNY DAMA", "SUDADERA CON CAPOTA", "BLUSA MANGA LARGA",
+                 "PANTALON DRIL HOMBRE", "VESTIDO FLORES NIÑA", "CHAQUETA JEAN", "SHORT DEPORTIVO"],
+    'electronics': ["AUDIFONOS BLUETOOTH", "CARGADOR USB TIPO C", "CABLE LIGHTNING 1M", "PARLANTE PORTATIL",
+                    "MOUSE INALAMBRICO", "MEMORIA USB 32GB", "TECLADO GAMER", "POWER BANK 10000MAH"],
+    'beauty': ["CREMA HIDRATANTE FACIAL", "SHAMPOO ANTICASPA", "PERFUME DAMA 100ML", "LABIAL MATE",
+               "SERUM VITAMINA C", "JABON ANTIBACTERIAL", "BASE MAQUILLAJE", "GEL FIJADOR"],
+    'home': ["TOALLA BAÑO ALGODON", "LAMPARA ESCRITORIO LED", "JUEGO DE SABANAS", "CORTINA BLACKOUT",
+             "ORGANIZADOR PLASTICO", "ALMOHADA FIBRA", "SET OLLAS ANTIADHERENTE", "ESTANTE FLOTANTE"],
+}
+
+
+def builtin_examples(classifier):
+    spanish = {english: label for label, english in classifier.category_mapping.items()}
+    return [
+        (classifier._clean_description(description), spanish[category])
+        for category, descriptions in LABELLED.items()
+        for description in descriptions
+    ]
+
+
+def run_backend(classifier, backend, examples, repeat):
+    classifier.backend = backend
+    descriptions = [description for description, _ in examples]
+    classifier.classify_products(descriptions[:2])  # warm up
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        results = classifier.classify_products(descriptions)
+    seconds = (time.perf_counter() - started) / repeat
+
+    correct = sum(result['category_spanish'] == label for result, (_, label) in zip(results, examples))
+    methods = {result['method'] for result in results}
+    print(f"{backend.name:>15} {correct / len(examples):>9.3f} {len(examples) / seconds:>9.1f} "
+          f"{seconds * 1000:>9.0f}ms  {','.join(sorted(methods))}")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--data', help="CSV with description,category columns")
+    parser.add_argument('--eval-fraction', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    classifier = ProductCategoryClassifier()
+    classifier.cache.enabled = False  # measure the backends, not the classification cache
+    examples = load_labelled_csv(args.data, classifier) if args.data else builtin_examples(classifier)
+    train, held_out = split_examples(examples, args.eval_fraction, seed=7)
+
+    zero_shot = ZeroShotBackend()
+    if zero_shot.models.wait(ZERO_SHOT) is None or zero_shot.models.wait(SENTENCE_EMBEDDINGS) is None:
+        print("Models could not be loaded (install transformers, sentence-transformers and torch)")
+        return
+
+    started = time.perf_counter()
+    head = fit_category_head(embed([d for d, _ in train], 64), [label for _, label in train])
+    print(f"Head trained on {len(train)} descriptions in {time.perf_counter() - started:.1f}s; "
+          f"{len(held_out)} held out")
+
+    print(f"{'backend':>15} {'accuracy':>9} {'items/s':>9} {'batch':>11}  method")
+    zero_shot_seconds = run_backend(classifier, zero_shot, held_out, args.repeat)
+    head_seconds = run_backend(classifier, EmbeddingHeadBackend(head), held_out, args.repeat)
+    print(f"embedding head is {zero_shot_seconds / head_seconds:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
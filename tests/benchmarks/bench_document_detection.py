@@ -0,0 +1,53 @@
+"""
+Benchmark: document corner detection at full resolution vs. on a ~500px proxy
+
+Runs both methods over the synthetic regression photos and reports the best
+of N timings plus the largest corner disagreement between them.
+
+Usage: python tests/benchmarks/bench_document_detection.py [repeats]
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+import numpy as np
+
+from src.services.document_processing.computer_vision import DocumentImageEnhancer
+from photo_samples import REGRESSION_PHOTOS, build_invoice_photo
+
+
+def best_of(enhancer, photo, repeats):
+    best, corners = float("inf"), None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        corners = enhancer._find_document_corners(photo)
+        best = min(best, time.perf_counter() - started)
+    return corners, best
+
+
+def main(repeats: int):
+    full = DocumentImageEnhancer()
+    full.detection_max_side = None
+    proxy = DocumentImageEnhancer()
+
+    print(f"{'photo':>20} {'size':>10} {'full':>9} {'proxy':>9} {'speedup':>8} {'corner diff':>12}")
+    for name, kwargs in REGRESSION_PHOTOS.items():
+        photo, _ = build_invoice_photo(**kwargs)
+        full_corners, full_time = best_of(full, photo, repeats)
+        proxy_corners, proxy_time = best_of(proxy, photo, repeats)
+
+        if full_corners is None or proxy_corners is None:
+            diff = f"found {full_corners is not None}/{proxy_corners is not None}"
+        else:
+            diff = f"{np.abs(proxy._order_points(full_corners) - proxy._order_points(proxy_corners)).max():.1f}px"
+        print(f"{name:>20} {photo.shape[1]:>4}x{photo.shape[0]:<5} {full_time * 1000:>7.1f}ms "
+              f"{proxy_time * 1000:>7.1f}ms {full_time / proxy_time:>7.1f}x {diff:>12}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
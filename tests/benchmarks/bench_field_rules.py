@@ -0,0 +1,142 @@
+"""
+Benchmark: single-pass field rules vs. the previous per-field regex loops
+
+Usage: python tests/benchmarks/bench_field_rules.py
+"""
+import re
+import sys
+import time
+import logging
+from pathlib import Path
+
+# Add project root and tests/ to path
+project_root = Path(__file__).parent.parent.parent
+sys.path[:0] = [str(project_root), str(project_root / "tests")]
+
+from src.services.document_processing.textract.document_index import TextractDocumentIndex
+from src.services.document_processing.textract.textract_service import TextractService
+from textract_samples import build_invoice_response
+
+
+class LegacyFieldLoops:
+    """Line scanning as it was before the rule table: one loop per field"""
+
+    def invoice_number(self, lines):
+        patterns = [
+            r'(?:FACTURA|INVOICE|No\.?|#)\s*:?\s*([A-Z0-9]+)',
+            r'PMB(\d+)',
+            r'(?:REF|REFERENCIA)\s*:?\s*([A-Z0-9]+)'
+        ]
+        for line in lines:
+            for pattern in patterns:
+                match = re.search(pattern, line, re.IGNORECASE)
+                if match:
+                    return match.group(1)
+        return None
+
+    def date(self, lines, date_type):
+        date_patterns = [
+            r'(\d{1,2}[/-]\d{1,2}[/-]\d{4})',
+            r'(\d{4}[/-]\d{1,2}[/-]\d{1,2})',
+            r'(\d{1,2}\s+de\s+\w+\s+de\s+\d{4})'
+        ]
+        for line in lines:
+            if date_type.lower() in line.lower():
+                for pattern in date_patterns:
+                    match = re.search(pattern, line)
+                    if match:
+                        return match.group(1)
+        return None
+
+    def supplier(self, lines):
+        supplier = {'company_name': None, 'nit': None}
+        for line in lines:
+            nit_match = re.search(r'NIT\s*:?\s*([0-9-]+)', line, re.IGNORECASE)
+            if nit_match:
+                supplier['nit'] = nit_match.group(1)
+            if not supplier['company_name'] and len(line) > 10 and any(
+                word in line.upper() for word in ['LTDA', 'S.A.S', 'EMPRESA', 'COMERCIAL']
+            ):
+                supplier['company_name'] = line.strip()
+        return supplier
+
+    def customer(self, lines):
+        customer = {'customer_name': None, 'phone': None}
+        for line in lines:
+            if 'CLIENTE' in line.upper() or 'NOMBRE' in line.upper():
+                parts = line.split(':')
+                if len(parts) > 1:
+                    customer['customer_name'] = parts[1].strip()
+            phone_match = re.search(r'(\d{10})', line)
+            if phone_match and not customer['phone']:
+                customer['phone'] = phone_match.group(1)
+        return customer
+
+    def totals(self, lines):
+        totals = {'subtotal': None, 'iva_rate': None, 'iva_amount': None, 'total': None}
+        for line in lines:
+            if 'SUBTOTAL' in line.upper():
+                match = re.search(r'[\$]?\s*([\d,]+)', line)
+                if match:
+                    totals['subtotal'] = match.group(1)
+            if 'IVA' in line.upper():
+                match = re.search(r'[\$]?\s*([\d,]+)', line)
+                if match:
+                    totals['iva_amount'] = match.group(1)
+                rate_match = re.search(r'(\d+)%', line)
+                if rate_match:
+                    totals['iva_rate'] = rate_match.group(1)
+            if 'TOTAL' in line.upper() and 'SUBTOTAL' not in line.upper():
+                match = re.search(r'[\$]?\s*([\d,]+)', line)
+                if match:
+                    totals['total'] = match.group(1)
+        return totals
+
+    def payment(self, lines):
+        payment = {'payment_method': None, 'credit_days': None, 'discount_percentage': None}
+        for line in lines:
+            if 'CREDITO' in line.upper():
+                payment['payment_method'] = 'CREDITO'
+                days_match = re.search(r'(\d+)\s*DIAS?', line, re.IGNORECASE)
+                if days_match:
+                    payment['credit_days'] = days_match.group(1)
+            if 'DESCUENTO' in line.upper() or 'DCTO' in line.upper():
+                discount_match = re.search(r'(\d+)%', line)
+                if discount_match:
+                    payment['discount_percentage'] = discount_match.group(1)
+        return payment
+
+    def extract(self, lines):
+        return (
+            self.invoice_number(lines), self.date(lines, 'fecha'), self.date(lines, 'vencimiento'),
+            self.supplier(lines), self.customer(lines), self.totals(lines), self.payment(lines),
+        )
+
+
+def best_of(func, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    service = TextractService(max_concurrency=1)
+    legacy = LegacyFieldLoops()
+
+    print(f"{'items':>7} {'lines':>7} {'per-field loops':>16} {'rule table':>11} {'speedup':>8}")
+    for num_items in [10, 100, 500, 2000]:
+        response = build_invoice_response(num_items=num_items, pages=max(1, num_items // 100))
+        lines = TextractDocumentIndex(response).lines
+
+        loops = best_of(lambda: legacy.extract(lines))
+        rules = best_of(lambda: service.field_extractor.extract(lines))
+
+        print(f"{num_items:>7} {len(lines):>7} {loops * 1000:>14.2f}ms {rules * 1000:>9.2f}ms {loops / rules:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
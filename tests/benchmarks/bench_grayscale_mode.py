@@ -0,0 +1,124 @@
+"""
+Benchmark: colour vs. grayscale photo enhancement
+
+For each sample photo reports enhancement CPU time, PDF size and how closely
+the grayscale page matches the luma of the colour page (PSNR). With
+--textract both PDFs are also sent to AnalyzeDocument (needs AWS credentials)
+and the extraction is compared: word agreement, mean word confidence and the
+invoice fields the processor stores. Use it on a tenant's own photos before
+enabling tenants.photo_grayscale for them.
+
+Usage: python tests/benchmarks/bench_grayscale_mode.py [--textract] [photo.jpg ...]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+import logging
+
+import cv2
+import numpy as np
+
+from src.services.document_processing.computer_vision import DocumentImageEnhancer, ImageToPDFConverter
+from photo_samples import REGRESSION_PHOTOS, build_invoice_photo, encode_jpeg
+
+logging.disable(logging.CRITICAL)
+
+COMPARED_FIELDS = ('invoice_number', 'issue_date', 'supplier_name', 'supplier_nit', 'subtotal', 'total_amount')
+
+
+def sample_photos(paths):
+    if paths:
+        return {Path(path).name: Path(path).read_bytes() for path in paths}
+    photos = {name: encode_jpeg(build_invoice_photo(**REGRESSION_PHOTOS[name])[0])
+              for name in ('tilted_keystone', 'noisy_phone_sensor', 'landscape_phone')}
+    example = project_root / "invoice_test.jpg"
+    if example.exists():
+        photos[example.name] = example.read_bytes()
+    return photos
+
+
+def enhance(enhancer, converter, photo, grayscale, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.process_time()
+        image = enhancer.enhance_invoice_photo(photo, grayscale)
+        best = min(best, time.process_time() - started)
+    return image, converter.convert_to_pdf(image), best
+
+
+def textract_summary(service, pdf_content):
+    """Words, mean word confidence and stored invoice fields for one PDF"""
+    from src.services.document_processing.textract.document_index import TextractDocumentIndex
+
+    response = service.textract_client.analyze_document(
+        Document={'Bytes': pdf_content}, FeatureTypes=service.FEATURE_TYPES
+    )
+    result = service._build_analysis_result(response, TextractDocumentIndex(response))
+    words = [block for block in response['Blocks'] if block['BlockType'] == 'WORD']
+    extracted = result['extracted_data']
+    return {
+        'words': [block['Text'] for block in words],
+        'confidence': sum(block['Confidence'] for block in words) / max(len(words), 1),
+        'fields': {field: extracted.get(field) for field in COMPARED_FIELDS},
+        'line_items': len(extracted.get('line_items') or []),
+    }
+
+
+def word_agreement(reference, candidate):
+    """Share of reference words (as a multiset) also read from the candidate"""
+    remaining = {}
+    for word in candidate:
+        remaining[word] = remaining.get(word, 0) + 1
+    matched = 0
+    for word in reference:
+        if remaining.get(word):
+            remaining[word] -= 1
+            matched += 1
+    return matched / max(len(reference), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('photos', nargs='*', help="Photos to compare (default: synthetic samples)")
+    parser.add_argument('--textract', action='store_true', help="Also compare Textract extraction")
+    args = parser.parse_args()
+
+    enhancer, converter = DocumentImageEnhancer(), ImageToPDFConverter()
+    service = None
+    if args.textract:
+        from src.services.document_processing.textract.textract_service import TextractService
+        service = TextractService()
+
+    print(f"{'photo':>20} {'cpu colour':>11} {'cpu gray':>9} {'speedup':>8} "
+          f"{'pdf colour':>11} {'pdf gray':>9} {'ratio':>6} {'luma PSNR':>10}")
+    for name, photo in sample_photos(args.photos).items():
+        color_image, color_pdf, color_cpu = enhance(enhancer, converter, photo, False)
+        gray_image, gray_pdf, gray_cpu = enhance(enhancer, converter, photo, True)
+
+        color = cv2.imdecode(np.frombuffer(color_image, np.uint8), cv2.IMREAD_GRAYSCALE)
+        gray = cv2.imdecode(np.frombuffer(gray_image, np.uint8), cv2.IMREAD_GRAYSCALE)
+        psnr = cv2.PSNR(color, gray) if color.shape == gray.shape else float('nan')
+
+        print(f"{name:>20} {color_cpu * 1000:>9.0f}ms {gray_cpu * 1000:>7.0f}ms {color_cpu / gray_cpu:>7.1f}x "
+              f"{len(color_pdf) / 1024:>9.0f}KB {len(gray_pdf) / 1024:>7.0f}KB "
+              f"{len(color_pdf) / len(gray_pdf):>5.1f}x {psnr:>8.1f}dB")
+
+        if service is not None:
+            color_ocr, gray_ocr = textract_summary(service, color_pdf), textract_summary(service, gray_pdf)
+            differing = [field for field in COMPARED_FIELDS if color_ocr['fields'][field] != gray_ocr['fields'][field]]
+            print(f"{'':>20} textract: words {len(color_ocr['words'])}/{len(gray_ocr['words'])}, "
+                  f"agreement {word_agreement(color_ocr['words'], gray_ocr['words']):.1%}, "
+                  f"confidence {color_ocr['confidence']:.1f}/{gray_ocr['confidence']:.1f}, "
+                  f"line items {color_ocr['line_items']}/{gray_ocr['line_items']}, "
+                  f"fields differing: {', '.join(differing) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
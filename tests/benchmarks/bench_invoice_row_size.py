@@ -0,0 +1,98 @@
+"""
+Benchmark: invoice rows with inline Textract JSONB vs. a separate artifact table
+
+Builds two temporary layouts in PostgreSQL with the same synthetic invoices:
+  inline   - summary columns + raw_response JSONB on the same row (old layout)
+  split    - summary columns only, raw_response in a side table (new layout)
+and reports per-row size and the latency of full-row fetches that the
+status/data/pricing endpoints perform.
+
+Connection comes from the usual DB_* environment variables.
+
+Usage: python tests/benchmarks/bench_invoice_row_size.py [invoices]
+"""
+import asyncio
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add project root and tests/ to path
+project_root = Path(__file__).parent.parent.parent
+sys.path[:0] = [str(project_root), str(project_root / "tests")]
+
+import asyncpg
+
+from src.config.settings import settings
+from textract_samples import build_invoice_response
+
+SUMMARY_COLUMNS = """
+    id uuid PRIMARY KEY,
+    tenant_id varchar(100) NOT NULL,
+    original_filename varchar(255),
+    status varchar(50),
+    invoice_number varchar(100),
+    supplier_name varchar(255),
+    total_amount numeric(15, 2),
+    upload_timestamp timestamp DEFAULT now()
+"""
+
+
+async def timed_fetch(conn, query, ids, repeat=3):
+    """Best-of wall time for fetching every id once"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for invoice_id in ids:
+            await conn.fetchrow(query, invoice_id)
+        best = min(best, time.perf_counter() - start)
+    return best / len(ids)
+
+
+async def main(count: int):
+    conn = await asyncpg.connect(settings.database_url)
+    await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+    await conn.execute(f"CREATE TEMP TABLE bench_inline ({SUMMARY_COLUMNS}, raw_response jsonb)")
+    await conn.execute(f"CREATE TEMP TABLE bench_split ({SUMMARY_COLUMNS})")
+    await conn.execute("CREATE TEMP TABLE bench_artifacts (invoice_id uuid PRIMARY KEY, raw_response jsonb)")
+
+    ids = []
+    for i in range(count):
+        invoice_id = uuid.uuid4()
+        ids.append(invoice_id)
+        raw = build_invoice_response(num_items=5 + (i % 10) * 20, seed=i)
+        summary = (invoice_id, "bench", f"factura_{i}.pdf", "completed", f"PMB{i}", "CASOLI S.A.S", 1249500)
+        await conn.execute(
+            "INSERT INTO bench_inline (id, tenant_id, original_filename, status, invoice_number, "
+            "supplier_name, total_amount, raw_response) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)",
+            *summary, raw
+        )
+        await conn.execute(
+            "INSERT INTO bench_split (id, tenant_id, original_filename, status, invoice_number, "
+            "supplier_name, total_amount) VALUES ($1, $2, $3, $4, $5, $6, $7)",
+            *summary
+        )
+        await conn.execute("INSERT INTO bench_artifacts VALUES ($1, $2)", invoice_id, raw)
+    await conn.execute("ANALYZE bench_inline; ANALYZE bench_split; ANALYZE bench_artifacts")
+
+    inline_row = await conn.fetchval("SELECT avg(pg_column_size(t.*)) FROM bench_inline t")
+    split_row = await conn.fetchval("SELECT avg(pg_column_size(t.*)) FROM bench_split t")
+    inline_total = await conn.fetchval("SELECT pg_total_relation_size('bench_inline')")
+    split_total = await conn.fetchval("SELECT pg_total_relation_size('bench_split')")
+
+    inline_fetch = await timed_fetch(conn, "SELECT * FROM bench_inline WHERE id = $1", ids)
+    split_fetch = await timed_fetch(conn, "SELECT * FROM bench_split WHERE id = $1", ids)
+
+    print(f"invoices: {count}")
+    print(f"{'layout':>8} {'avg row':>10} {'table+toast':>12} {'SELECT * by id':>16}")
+    print(f"{'inline':>8} {float(inline_row):>8.0f} B {inline_total / 1024:>9.0f} KB {inline_fetch * 1000:>13.2f} ms")
+    print(f"{'split':>8} {float(split_row):>8.0f} B {split_total / 1024:>9.0f} KB {split_fetch * 1000:>13.2f} ms")
+    print(f"full-row fetch speedup: {inline_fetch / split_fetch:.1f}x")
+
+    await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,78 @@
+"""
+Benchmark: keyword fallback classification, per-keyword substring loop vs. compiled matcher
+
+The fallback serves every request while the ML model is loading or down.
+Reports descriptions/second for the previous implementation (dict rebuilt
+per call, ``keyword in description`` for every keyword) and for
+KeywordCategoryMatcher one description at a time and in batches, plus how
+many descriptions changed category (substring false hits such as "gel" in
+"angel").
+
+Usage: python tests/benchmarks/bench_keyword_fallback.py [descriptions] [batch_size]
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from src.services.ml_services.category_classifier import KEYWORD_CATEGORIES, KEYWORD_MATCHER
+
+WORDS = [
+    "chancla", "rajado", "dama", "zapatos", "camiseta", "polo", "talla", "audifonos", "bluetooth",
+    "crema", "angel", "gel", "cargador", "usb", "mesa", "toallas", "reloj", "gorra", "baloncesto",
+    "pantalón", "niña", "negro", "blanco", "x7", "36-40", "surtido", "ref", "economico", "premium",
+]
+
+
+def legacy_fallback(description):
+    """The previous _fallback_classify scoring loop"""
+    desc_lower = description.lower()
+    keyword_categories = {category: dict(config) for category, config in KEYWORD_CATEGORIES.items()}
+    best_category, best_score = 'general', 0
+    for category, config in keyword_categories.items():
+        score = sum(1 for keyword in config['keywords'] if keyword in desc_lower)
+        if score > best_score:
+            best_score, best_category = score, category
+    return best_category
+
+
+def descriptions(count, seed=7):
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, size=rng.integers(3, 8))).upper() for _ in range(count)]
+
+
+def rate(func, items):
+    started = time.perf_counter()
+    result = func(items)
+    return len(items) / (time.perf_counter() - started), result
+
+
+def main(count, batch_size):
+    items = descriptions(count)
+
+    legacy_rate, legacy = rate(lambda batch: [legacy_fallback(d) for d in batch], items)
+    single_rate, _ = rate(lambda batch: [KEYWORD_MATCHER.classify([d])[0] for d in batch], items)
+    batch_rate, matched = rate(
+        lambda batch: [r for start in range(0, len(batch), batch_size)
+                       for r in KEYWORD_MATCHER.classify(batch[start:start + batch_size])],
+        items
+    )
+
+    changed = sum(old != new[0] for old, new in zip(legacy, matched))
+    print(f"{count} descriptions, {sum(len(c['keywords']) for c in KEYWORD_CATEGORIES.values())} keywords")
+    print(f"{'legacy substring loop':>24} {legacy_rate:>10.0f}/s")
+    print(f"{'matcher, one at a time':>24} {single_rate:>10.0f}/s  {single_rate / legacy_rate:.1f}x")
+    print(f"{'matcher, batch ' + str(batch_size):>24} {batch_rate:>10.0f}/s  {batch_rate / legacy_rate:.1f}x")
+    print(f"{changed} descriptions changed category (whole-word matching)")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    )
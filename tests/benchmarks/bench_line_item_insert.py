@@ -0,0 +1,117 @@
+"""
+Benchmark: per-row ORM line items vs. bulk multi-row INSERT
+
+Needs a PostgreSQL database with the schema applied (alembic upgrade head);
+connection comes from the usual DB_* environment variables.
+
+Usage: python tests/benchmarks/bench_line_item_insert.py
+"""
+import asyncio
+import sys
+import time
+import uuid
+import logging
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import event, delete
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.config.settings import settings
+from src.database.models import Tenant, ProcessedInvoice, InvoiceLineItem
+from src.services.document_processing.invoice_processor import InvoiceProcessorService
+
+logging.disable(logging.CRITICAL)
+
+TENANT_ID = "bench-line-items"
+
+
+def sample_items(count):
+    return [
+        {
+            'item_number': i,
+            'product_code': f"{i:03d}",
+            'description': f"CHANCLA RAJADO DAMA 36-40 (X7) #{i}",
+            'reference': f"REF-{i}",
+            'quantity': Decimal('7'),
+            'unit_price': Decimal('15000'),
+            'subtotal': Decimal('105000'),
+            'unit_measure': 'UND',
+            'original_quantity': Decimal('1'),
+            'original_unit': 'DOC',
+            'unit_multiplier': Decimal('7'),
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+async def insert_orm(processor, session, invoice_id, items):
+    """Previous behaviour: one ORM object per line, flushed by the commit"""
+    for row in processor._build_line_item_rows(invoice_id, items):
+        session.add(InvoiceLineItem(**row))
+    await session.commit()
+
+
+async def insert_bulk(processor, session, invoice_id, items):
+    await processor._bulk_insert_line_items(session, processor._build_line_item_rows(invoice_id, items))
+    await session.commit()
+
+
+async def main():
+    engine = create_async_engine(settings.async_database_url)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    processor = InvoiceProcessorService()
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    async with Session() as session:
+        await session.execute(delete(Tenant).where(Tenant.tenant_id == TENANT_ID))
+        session.add(Tenant(tenant_id=TENANT_ID, company_name="Bench", email="bench@test.com"))
+        await session.commit()
+
+    print(f"{'lines':>6} {'orm':>10} {'stmts':>6} {'bulk':>10} {'stmts':>6} {'speedup':>8}")
+    for count in (10, 100, 1000):
+        items = sample_items(count)
+        results = {}
+        for name, insert in (('orm', insert_orm), ('bulk', insert_bulk)):
+            timings = []
+            for _ in range(3):
+                invoice_id = uuid.uuid4()
+                async with Session() as session:
+                    session.add(ProcessedInvoice(
+                        id=invoice_id, tenant_id=TENANT_ID, original_filename="bench.pdf",
+                        status="processing", upload_timestamp=datetime.utcnow()
+                    ))
+                    await session.commit()
+
+                    statements.clear()
+                    start = time.perf_counter()
+                    await insert(processor, session, invoice_id, items)
+                    timings.append(time.perf_counter() - start)
+                    executed = len(statements)
+
+                    await session.execute(delete(InvoiceLineItem).where(InvoiceLineItem.invoice_id == invoice_id))
+                    await session.execute(delete(ProcessedInvoice).where(ProcessedInvoice.id == invoice_id))
+                    await session.commit()
+            results[name] = (min(timings), executed)
+
+        orm_time, orm_statements = results['orm']
+        bulk_time, bulk_statements = results['bulk']
+        print(f"{count:>6} {orm_time * 1000:>8.1f}ms {orm_statements:>6} "
+              f"{bulk_time * 1000:>8.1f}ms {bulk_statements:>6} {orm_time / bulk_time:>7.2f}x")
+
+    async with Session() as session:
+        await session.execute(delete(Tenant).where(Tenant.tenant_id == TENANT_ID))
+        await session.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark: photo enhancement inline in the coroutine vs. on the process pool
+
+Simulates concurrent photo uploads of a 2400x3200 invoice photo and reports
+upload latency p50/p99 plus event-loop lag (how late a 10ms heartbeat fires),
+which is what every other request on the server experiences. Then times a
+multi-photo invoice (one photo per page) against a single-page upload.
+
+Usage: python tests/benchmarks/bench_photo_pipeline.py [uploads] [workers] [pages]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import logging
+
+import cv2
+import numpy as np
+
+from src.services.document_processing.computer_vision.photo_pipeline import (
+    PhotoPipelinePool, enhance_photo_to_pdf
+)
+
+logging.disable(logging.CRITICAL)
+
+
+def invoice_photo(width=2400, height=3200, seed=7) -> bytes:
+    """Tilted sheet of printed lines on a darker, noisy background"""
+    rng = np.random.default_rng(seed)
+    sheet = np.full((2800, 2000, 3), 245, dtype=np.uint8)
+    for row in range(60):
+        cv2.putText(sheet, f"{row:03d} CHANCLA RAJADO DAMA 36-40 (X7)   2   105,000   210,000",
+                    (80, 120 + row * 44), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (20, 20, 20), 2)
+
+    corners = np.float32([[0, 0], [1999, 0], [1999, 2799], [0, 2799]])
+    target = np.float32([[260, 180], [2150, 260], [2240, 3050], [170, 2980]])
+    photo = cv2.warpPerspective(
+        sheet, cv2.getPerspectiveTransform(corners, target), (width, height), borderValue=(90, 80, 70)
+    )
+    photo = cv2.add(photo, rng.integers(0, 25, photo.shape, dtype=np.uint8))
+    return cv2.imencode('.jpg', photo, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+async def run(uploads: int, photo: bytes, pool=None):
+    latencies, lags = [], []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            expected = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            lags.append(max(time.perf_counter() - expected, 0.0))
+
+    async def upload(arrived):
+        # Latency counts from arrival, so time spent waiting for a blocked loop is included
+        await asyncio.sleep(0)
+        if pool is None:
+            enhance_photo_to_pdf(photo)  # previous behaviour: CPU work inside the coroutine
+        else:
+            await pool.enhance_to_pdf(photo)
+        latencies.append(time.perf_counter() - arrived)
+
+    beat = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    await asyncio.gather(*[upload(started) for _ in range(uploads)])
+    elapsed = time.perf_counter() - started
+    done.set()
+    await beat
+    return latencies, lags, elapsed
+
+
+async def multi_page(pool, photo: bytes, pages: int):
+    """Latency of a ``pages``-photo invoice vs. one photo; pages run in parallel on the pool"""
+    timings = {}
+    for count in (1, pages):
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            await pool.enhance_pages_to_pdf([photo] * count)
+            best = min(best, time.perf_counter() - started)
+        timings[count] = best
+    print(f"{pages}-page invoice {timings[pages] * 1000:.0f}ms vs 1 page {timings[1] * 1000:.0f}ms "
+          f"({timings[pages] / timings[1]:.1f}x the single page, {pages}x would be sequential)")
+
+
+async def main(uploads: int, workers: int, pages: int):
+    photo = invoice_photo()
+    enhance_photo_to_pdf(photo)  # warm the inline path too
+
+    pool = PhotoPipelinePool(workers=workers, max_pending=uploads)
+    await pool.start()
+
+    print(f"{uploads} concurrent uploads, {workers} workers, photo {len(photo) / 1024:.0f}KB")
+    print(f"{'mode':>8} {'p50':>9} {'p99':>9} {'loop lag p99':>13} {'loop lag max':>13} {'wall':>8}")
+    for name, executor in (('inline', None), ('pool', pool)):
+        latencies, lags, elapsed = await run(uploads, photo, executor)
+        print(f"{name:>8} {statistics.median(latencies) * 1000:>7.0f}ms {percentile(latencies, 0.99) * 1000:>7.0f}ms "
+              f"{percentile(lags, 0.99) * 1000:>11.1f}ms {max(lags) * 1000:>11.1f}ms {elapsed:>7.2f}s")
+
+    await multi_page(pool, photo, pages)
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    ))
@@ -0,0 +1,60 @@
+"""
+Benchmark: wall time and peak memory of the photo -> PDF pipeline per photo
+
+Runs enhancement + PDF conversion on synthetic phone photos of several sizes
+and reports the best-of-N wall time, traced peak memory (numpy/OpenCV arrays)
+and the size of the resulting PDF.
+
+Usage: python tests/benchmarks/bench_photo_resample.py [repeats]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+import logging
+
+from src.services.document_processing.computer_vision.photo_pipeline import enhance_photo_to_pdf
+from photo_samples import build_invoice_photo, encode_jpeg
+
+logging.disable(logging.CRITICAL)
+
+# name -> (photo size, scale applied to the tilted sheet corners)
+PHOTOS = {
+    '8MP 2400x3200': ((2400, 3200), 1.0),
+    '12MP 3024x4032': ((3024, 4032), 1.26),
+    '24MP 4000x6000': ((4000, 6000), 1.75),
+    '48MP 6048x8064': ((6048, 8064), 2.52),
+}
+CORNERS = [(260, 180), (2150, 260), (2240, 3050), (170, 2980)]
+
+
+def main(repeats: int):
+    enhance_photo_to_pdf(encode_jpeg(build_invoice_photo(CORNERS, noise=0)[0]))  # warm up
+
+    print(f"{'photo':>16} {'jpeg':>8} {'wall':>9} {'peak mem':>10} {'pdf':>8}")
+    for name, (size, scale) in PHOTOS.items():
+        photo = encode_jpeg(build_invoice_photo([(x * scale, y * scale) for x, y in CORNERS], size=size)[0])
+
+        best = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            pdf_content = enhance_photo_to_pdf(photo)
+            best = min(best, time.perf_counter() - started)
+
+        tracemalloc.start()
+        enhance_photo_to_pdf(photo)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"{name:>16} {len(photo) / 1024:>6.0f}KB {best * 1000:>7.0f}ms "
+              f"{peak / 1024 / 1024:>8.0f}MB {len(pdf_content) / 1024:>6.0f}KB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,99 @@
+"""
+Benchmark: product catalog similarity search with ProductEmbeddingIndex
+
+For catalogs of 10k, 100k and 1M products (random unit vectors with the
+384 dimensions of multilingual MiniLM) reports index build time, memory,
+top-k search latency (matrix product + argpartition) against a full sort,
+and the cost of incremental adds and deletes. The previous matcher also
+re-encoded every catalog description per lookup; with sentence-transformers
+installed, --encode measures that per-product encoding cost too.
+
+Usage: python tests/benchmarks/bench_product_index.py [sizes] [--encode]
+       e.g. python tests/benchmarks/bench_product_index.py 10000,100000,1000000
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from src.services.ml_services.product_index import ProductEmbeddingIndex
+
+DIM = 384
+QUERIES = 50
+K = 50  # candidates handed to fuzzy re-ranking
+
+
+def unit_vectors(count, seed):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def bench(size):
+    vectors = unit_vectors(size, seed=size)
+    ids = [f"p{i}" for i in range(size)]
+
+    started = time.perf_counter()
+    index = ProductEmbeddingIndex(DIM, capacity=size)
+    for start in range(0, size, 10000):
+        index.add(ids[start:start + 10000], vectors[start:start + 10000])
+    build_seconds = time.perf_counter() - started
+    matrix = vectors  # same rows, for the full-sort baseline
+    del vectors
+
+    queries = unit_vectors(QUERIES, seed=1)
+    query_iter = iter(np.tile(queries, (3, 1)))
+    search_ms = timed(lambda: index.search(next(query_iter), k=K), QUERIES)
+    sort_ms = timed(lambda: np.argsort(-(matrix @ queries[0]))[:K], 5)
+
+    new_vectors = unit_vectors(1000, seed=2)
+    add_ms = timed(lambda: index.add([f"new{i}" for i in range(1000)], new_vectors), 3) / 1000
+    delete_ms = timed(lambda: index.remove(ids[:1000]), 1) / 1000
+
+    print(f"{size:>9,} {build_seconds:>8.2f}s {index.nbytes / 2 ** 20:>8.0f}MB {search_ms:>9.2f}ms "
+          f"{sort_ms:>9.2f}ms {add_ms * 1000:>8.1f}us {delete_ms * 1000:>9.1f}us")
+
+
+def encode_cost(count=512):
+    from src.services.ml_services.model_registry import SENTENCE_EMBEDDINGS, get_model_registry
+
+    model = get_model_registry().wait(SENTENCE_EMBEDDINGS)
+    if model is None:
+        print("Sentence embedding model could not be loaded (install sentence-transformers)")
+        return
+    descriptions = [f"CHANCLA RAJADO DAMA 36-40 REF{i:05d}" for i in range(count)]
+    model.encode(descriptions[:8])
+    started = time.perf_counter()
+    model.encode(descriptions, batch_size=64)
+    per_product = (time.perf_counter() - started) / count
+    print(f"Re-encoding the catalog per lookup (previous matcher): {per_product * 1000:.2f}ms per product, "
+          f"{per_product * 20000:.1f}s for 20k products")
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 and sys.argv[1][0].isdigit() \
+        else [10000, 100000, 1000000]
+    print(f"{'products':>9} {'build':>9} {'memory':>10} {'top-' + str(K):>11} {'full sort':>11} "
+          f"{'add/item':>10} {'delete/item':>11}")
+    for size in sizes:
+        bench(size)
+    if "--encode" in sys.argv:
+        encode_cost()
+
+
+if __name__ == "__main__":
+    main()
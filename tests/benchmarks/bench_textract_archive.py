@@ -0,0 +1,65 @@
+"""
+Benchmark: Textract archive format vs. JSON
+
+Reports size and decode time for synthetic invoices of several sizes.
+Floats are rounded to float32 first, as in real Textract responses.
+No database needed.
+
+Usage: python tests/benchmarks/bench_textract_archive.py
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add project root and tests/ to path
+project_root = Path(__file__).parent.parent.parent
+sys.path[:0] = [str(project_root), str(project_root / "tests")]
+
+import numpy as np
+
+from src.services.document_processing.textract.archive import (
+    encode_textract_response, decode_textract_response
+)
+from textract_samples import build_invoice_response
+
+
+def float32(value):
+    if isinstance(value, float):
+        return float(np.float32(value))
+    if isinstance(value, dict):
+        return {key: float32(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [float32(item) for item in value]
+    return value
+
+
+def best_of(func, repeat=10):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'items':>6} {'blocks':>7} {'json':>9} {'archive':>9} {'ratio':>6} "
+          f"{'json.loads':>11} {'decode':>9} {'no geometry':>12}")
+    for num_items, pages in ((5, 1), (50, 1), (200, 4)):
+        response = float32(build_invoice_response(num_items=num_items, pages=pages))
+        document = json.dumps(response)
+        packed = encode_textract_response(response)
+        assert decode_textract_response(packed) == response
+
+        loads = best_of(lambda: json.loads(document))
+        decode = best_of(lambda: decode_textract_response(packed))
+        decode_lean = best_of(lambda: decode_textract_response(packed, geometry=False))
+
+        print(f"{num_items:>6} {len(response['Blocks']):>7} {len(document) / 1024:>7.0f}KB "
+              f"{len(packed) / 1024:>7.0f}KB {len(document) / len(packed):>5.1f}x "
+              f"{loads * 1000:>9.1f}ms {decode * 1000:>7.1f}ms {decode_lean * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
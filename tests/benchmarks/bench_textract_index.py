@@ -0,0 +1,134 @@
+"""
+Benchmark: TextractDocumentIndex vs. the previous multi-pass block scans
+
+Usage: python tests/benchmarks/bench_textract_index.py
+"""
+import sys
+import time
+import logging
+from pathlib import Path
+
+# Add project root and tests/ to path
+project_root = Path(__file__).parent.parent.parent
+sys.path[:0] = [str(project_root), str(project_root / "tests")]
+
+from src.services.document_processing.textract.document_index import TextractDocumentIndex
+from src.services.document_processing.textract.textract_service import TextractService
+from textract_samples import build_invoice_response
+
+logging.disable(logging.CRITICAL)
+
+
+class LegacyBlockScans:
+    """Block handling as it was before the index: four scans, two block maps"""
+
+    def get_text_lines(self, blocks):
+        lines = []
+        for block in blocks:
+            if block.get('BlockType') == 'LINE':
+                text = block.get('Text', '').strip()
+                if text:
+                    lines.append(text)
+        return lines
+
+    def extract_key_values(self, blocks):
+        key_values = {}
+        block_map = {block['Id']: block for block in blocks}
+        for block in blocks:
+            if block.get('BlockType') == 'KEY_VALUE_SET':
+                if 'KEY' in block.get('EntityTypes', []):
+                    key_text = self.get_text_from_block(block, block_map)
+                    for relationship in block.get('Relationships', []):
+                        if relationship.get('Type') == 'VALUE':
+                            for value_id in relationship.get('Ids', []):
+                                value_block = block_map.get(value_id)
+                                if value_block:
+                                    value_text = self.get_text_from_block(value_block, block_map)
+                                    if key_text and value_text:
+                                        key_values[key_text.lower()] = value_text
+        return key_values
+
+    def get_text_from_block(self, block, block_map):
+        text_parts = []
+        for relationship in block.get('Relationships', []):
+            if relationship.get('Type') == 'CHILD':
+                for child_id in relationship.get('Ids', []):
+                    child_block = block_map.get(child_id)
+                    if child_block and child_block.get('BlockType') == 'WORD':
+                        text_parts.append(child_block.get('Text', ''))
+        return ' '.join(text_parts)
+
+    def extract_tables(self, blocks):
+        tables = []
+        block_map = {block['Id']: block for block in blocks}
+        for block in blocks:
+            if block.get('BlockType') == 'TABLE':
+                rows = {}
+                for relationship in block.get('Relationships', []):
+                    if relationship.get('Type') == 'CHILD':
+                        for cell_id in relationship.get('Ids', []):
+                            cell_block = block_map.get(cell_id)
+                            if cell_block and cell_block.get('BlockType') == 'CELL':
+                                row_index = cell_block.get('RowIndex', 0)
+                                col_index = cell_block.get('ColumnIndex', 0)
+                                rows.setdefault(row_index, {})[col_index] = \
+                                    self.get_text_from_block(cell_block, block_map)
+                tables.append(rows)
+        return tables
+
+    def calculate_confidence(self, response):
+        scores = []
+        for block in response.get('Blocks', []):
+            confidence = block.get('Confidence')
+            if confidence:
+                scores.append(confidence)
+        return sum(scores) / len(scores) / 100.0 if scores else 0.0
+
+
+def extract_multipass(legacy, response):
+    blocks = response.get('Blocks', [])
+    return (
+        legacy.get_text_lines(blocks),
+        legacy.extract_key_values(blocks),
+        legacy.extract_tables(blocks),
+        legacy.calculate_confidence(response),
+    )
+
+
+def extract_indexed(service, response):
+    index = TextractDocumentIndex(response)
+    return (
+        service._get_text_lines(index),
+        service._extract_key_values(index),
+        service._extract_tables(index),
+        service._calculate_confidence(response, index),
+    )
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    service = TextractService(max_concurrency=1)
+    legacy = LegacyBlockScans()
+
+    print(f"{'items':>7} {'pages':>6} {'blocks':>8} {'multi-pass':>12} {'indexed':>10} {'speedup':>8}")
+    for num_items, pages in [(50, 1), (500, 5), (2000, 20), (5000, 50)]:
+        response = build_invoice_response(num_items=num_items, pages=pages)
+        blocks = len(response['Blocks'])
+
+        multipass = best_of(lambda: extract_multipass(legacy, response))
+        indexed = best_of(lambda: extract_indexed(service, response))
+
+        print(f"{num_items:>7} {pages:>6} {blocks:>8} {multipass * 1000:>10.1f}ms "
+              f"{indexed * 1000:>8.1f}ms {multipass / indexed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+Shared pytest fixtures
+"""
+import pytest
+
+from textract_samples import build_invoice_response
+
+
+@pytest.fixture
+def textract_invoice_response():
+    """Single-page synthetic Textract response for a 5-item invoice"""
+    return build_invoice_response(num_items=5)
@@ -0,0 +1,67 @@
+"""
+Synthetic mobile photos of invoices for computer-vision tests and benchmarks
+A printed sheet is warped onto a background, so the true corners are known
+"""
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+SHEET_SIZE = (2000, 2800)  # width, height of the flat invoice
+
+ITEM_LINE = "{:03d} CHANCLA RAJADO DAMA 36-40 (X7)   2   105,000   210,000"
+
+
+def invoice_sheet(lines: int = 60) -> np.ndarray:
+    """Flat, white invoice page with printed item lines"""
+    width, height = SHEET_SIZE
+    sheet = np.full((height, width, 3), 245, dtype=np.uint8)
+    cv2.putText(sheet, "COMERCIALIZADORA CASOLI S.A.S  FACTURA PMB12345", (80, 80),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.3, (20, 20, 20), 3)
+    for row in range(lines):
+        cv2.putText(sheet, ITEM_LINE.format(row), (80, 180 + row * 42),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (20, 20, 20), 2)
+    return sheet
+
+
+def build_invoice_photo(
+    corners: List[Tuple[float, float]],
+    size: Tuple[int, int] = (2400, 3200),
+    background: Tuple[int, int, int] = (90, 80, 70),
+    noise: int = 25,
+    seed: int = 7,
+    lines: int = 60
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Photo of the sheet with its corners at ``corners`` (TL, TR, BR, BL)
+
+    Returns the BGR image and the true corners as a float32 (4, 2) array.
+    """
+    width, height = SHEET_SIZE
+    source = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+    target = np.float32(corners)
+    photo = cv2.warpPerspective(
+        invoice_sheet(lines), cv2.getPerspectiveTransform(source, target), size,
+        borderValue=background
+    )
+    if noise:
+        rng = np.random.default_rng(seed)
+        photo = cv2.add(photo, rng.integers(0, noise, photo.shape, dtype=np.uint8))
+    return photo, target
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 90) -> bytes:
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+# Regression set: name -> build_invoice_photo kwargs
+REGRESSION_PHOTOS = {
+    'straight_full_size': dict(corners=[(200, 200), (2200, 200), (2200, 3000), (200, 3000)]),
+    'tilted_keystone': dict(corners=[(260, 180), (2150, 260), (2240, 3050), (170, 2980)]),
+    'rotated_left': dict(corners=[(420, 120), (2280, 380), (2010, 3090), (130, 2860)]),
+    'small_in_frame': dict(corners=[(700, 900), (1700, 950), (1680, 2350), (720, 2300)]),
+    'light_background': dict(corners=[(300, 250), (2100, 300), (2150, 2950), (250, 2900)], background=(200, 200, 195)),
+    'noisy_phone_sensor': dict(corners=[(240, 220), (2180, 240), (2200, 3020), (210, 2990)], noise=60, seed=11),
+    'landscape_phone': dict(corners=[(700, 80), (2500, 160), (2460, 2300), (740, 2250)], size=(3200, 2400)),
+    'low_resolution': dict(corners=[(60, 50), (700, 70), (720, 980), (40, 960)], size=(800, 1066)),
+}
@@ -0,0 +1,241 @@
+"""
+Synthetic AWS Textract AnalyzeDocument responses for tests and benchmarks
+Mimics the block layout of a Colombian supplier invoice (Casoli style)
+"""
+import random
+import uuid
+from typing import Dict, Any, List, Optional
+
+HEADER_LINES = [
+    "COMERCIALIZADORA CASOLI S.A.S",
+    "NIT: 900123456-7",
+    "FACTURA DE VENTA No. PMB12345",
+    "FECHA: 15/07/2025",
+    "VENCIMIENTO: 14/08/2025",
+    "CLIENTE: ALMACEN LA REBAJA",
+    "TELEFONO 3001234567",
+    "FORMA DE PAGO CREDITO 30 DIAS",
+    "DESCUENTO 5%",
+]
+
+FOOTER_LINES = [
+    "SUBTOTAL $ 1,050,000",
+    "IVA 19% $ 199,500",
+    "TOTAL $ 1,249,500",
+]
+
+TABLE_HEADER = ["ITEM", "REF", "DESCRIPCION", "CANT", "PRECIO", "SUBTOTAL"]
+
+PRODUCTS = [
+    ("049", "CHANCLA RAJADO DAMA 36-40 (X7)", 105000),
+    ("930-D", "CHANCLA RAJADO DAMA 36-40 (X6)", 98000),
+    ("MINIMACK", "SANDALIA NIÑA 18-23 PAR", 84000),
+    ("TEN-220", "TENIS DEPORTIVO CABALLERO 38-43", 65000),
+    ("CAM-COT", "CAMISETA ALGODON TALLA M", 12500),
+]
+
+
+class _ResponseBuilder:
+    """Accumulates Textract blocks with realistic ids and geometry"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.blocks: List[Dict[str, Any]] = []
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128)))
+
+    def geometry(self) -> Dict[str, Any]:
+        left, top = self.rng.random() * 0.8, self.rng.random() * 0.9
+        width, height = self.rng.random() * 0.2, 0.01 + self.rng.random() * 0.02
+        return {
+            'BoundingBox': {'Width': width, 'Height': height, 'Left': left, 'Top': top},
+            'Polygon': [
+                {'X': left, 'Y': top},
+                {'X': left + width, 'Y': top},
+                {'X': left + width, 'Y': top + height},
+                {'X': left, 'Y': top + height},
+            ]
+        }
+
+    def add(self, block: Dict[str, Any]) -> Dict[str, Any]:
+        block.setdefault('Id', self.new_id())
+        block.setdefault('Confidence', 90 + self.rng.random() * 9.9)
+        block.setdefault('Geometry', self.geometry())
+        self.blocks.append(block)
+        return block
+
+    def words(self, text: str, page: int) -> List[str]:
+        return [
+            self.add({'BlockType': 'WORD', 'Text': word, 'TextType': 'PRINTED', 'Page': page})['Id']
+            for word in text.split()
+        ]
+
+    def line(self, text: str, page: int) -> str:
+        word_ids = self.words(text, page)
+        return self.add({
+            'BlockType': 'LINE',
+            'Text': text,
+            'Page': page,
+            'Relationships': [{'Type': 'CHILD', 'Ids': word_ids}]
+        })['Id']
+
+    def cell(self, text: str, row: int, col: int, page: int) -> str:
+        block = {
+            'BlockType': 'CELL',
+            'RowIndex': row,
+            'ColumnIndex': col,
+            'RowSpan': 1,
+            'ColumnSpan': 1,
+            'Page': page,
+        }
+        word_ids = self.words(text, page)
+        if word_ids:
+            block['Relationships'] = [{'Type': 'CHILD', 'Ids': word_ids}]
+        return self.add(block)['Id']
+
+    def key_value(self, key: str, value: str, page: int) -> None:
+        value_id = self.new_id()
+        self.add({
+            'BlockType': 'KEY_VALUE_SET',
+            'EntityTypes': ['KEY'],
+            'Page': page,
+            'Relationships': [
+                {'Type': 'VALUE', 'Ids': [value_id]},
+                {'Type': 'CHILD', 'Ids': self.words(key, page)},
+            ]
+        })
+        self.add({
+            'Id': value_id,
+            'BlockType': 'KEY_VALUE_SET',
+            'EntityTypes': ['VALUE'],
+            'Page': page,
+            'Relationships': [{'Type': 'CHILD', 'Ids': self.words(value, page)}]
+        })
+
+
+def item_rows(num_items: int, start: int = 1) -> List[List[str]]:
+    """Table rows for ``num_items`` products, numbered from ``start``"""
+    rows = []
+    for n in range(start, start + num_items):
+        code, description, price = PRODUCTS[(n - 1) % len(PRODUCTS)]
+        quantity = 1 + (n % 4)
+        rows.append([
+            str(n), code, description, str(quantity),
+            f"{price:,}", f"{price * quantity:,}"
+        ])
+    return rows
+
+
+def build_invoice_response(
+    num_items: int = 5,
+    pages: int = 1,
+    seed: int = 42,
+    extra_lines: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Build an AnalyzeDocument-shaped response
+
+    Line items are spread evenly across ``pages``, one TABLE per page, with
+    the header lines on page 1 and the totals on the last page.
+    """
+    builder = _ResponseBuilder(seed)
+    per_page = max(1, -(-num_items // pages))
+    next_item = 1
+
+    for page in range(1, pages + 1):
+        page_block = builder.add({'BlockType': 'PAGE', 'Page': page, 'Relationships': []})
+        line_ids = []
+
+        if page == 1:
+            for text in HEADER_LINES + (extra_lines or []):
+                line_ids.append(builder.line(text, page))
+            builder.key_value("Vendedor:", "JUAN PEREZ", page)
+
+        page_items = min(per_page, num_items - next_item + 1)
+        rows = [TABLE_HEADER] + item_rows(page_items, start=next_item)
+        next_item += page_items
+
+        cell_ids = []
+        for row_index, row in enumerate(rows, start=1):
+            line_ids.append(builder.line(' '.join(row), page))
+            for col_index, text in enumerate(row, start=1):
+                cell_ids.append(builder.cell(text, row_index, col_index, page))
+        builder.add({
+            'BlockType': 'TABLE',
+            'Page': page,
+            'Relationships': [{'Type': 'CHILD', 'Ids': cell_ids}]
+        })
+
+        if page == pages:
+            for text in FOOTER_LINES:
+                line_ids.append(builder.line(text, page))
+
+        page_block['Relationships'] = [{'Type': 'CHILD', 'Ids': line_ids}]
+
+    return {
+        'DocumentMetadata': {'Pages': pages},
+        'Blocks': builder.blocks,
+        'AnalyzeDocumentModelVersion': '1.0',
+    }
+
+
+class FakeTextractClient:
+    """
+    In-memory stand-in for the boto3 Textract client
+
+    Serves ``response`` through AnalyzeDocument and through async
+    StartDocumentAnalysis/GetDocumentAnalysis jobs (``in_progress_polls``
+    IN_PROGRESS answers first, then NextToken-paginated block pages).
+    """
+
+    def __init__(
+        self,
+        response: Dict[str, Any],
+        in_progress_polls: int = 1,
+        job_status: str = 'SUCCEEDED',
+        reject_sync: bool = False
+    ):
+        self.response = response
+        self.in_progress_polls = in_progress_polls
+        self.job_status = job_status
+        self.reject_sync = reject_sync
+        self.calls: List[str] = []
+        self._polls: Dict[str, int] = {}
+
+    def analyze_document(self, **kwargs):
+        self.calls.append('analyze_document')
+        if self.reject_sync:
+            from botocore.exceptions import ClientError
+            raise ClientError(
+                {'Error': {'Code': 'UnsupportedDocumentException', 'Message': 'Multi-page PDF'}},
+                'AnalyzeDocument'
+            )
+        return self.response
+
+    def start_document_analysis(self, **kwargs):
+        self.calls.append('start_document_analysis')
+        job_id = uuid.uuid4().hex
+        self._polls[job_id] = 0
+        return {'JobId': job_id}
+
+    def get_document_analysis(self, JobId: str, MaxResults: int = 1000, NextToken: Optional[str] = None):
+        self.calls.append('get_document_analysis')
+        metadata = self.response.get('DocumentMetadata', {})
+
+        if self._polls[JobId] < self.in_progress_polls:
+            self._polls[JobId] += 1
+            return {'JobStatus': 'IN_PROGRESS', 'DocumentMetadata': metadata}
+        if self.job_status == 'FAILED':
+            return {'JobStatus': 'FAILED', 'StatusMessage': 'Unable to process document'}
+
+        blocks = self.response['Blocks']
+        start = int(NextToken or 0)
+        page = {
+            'JobStatus': self.job_status,
+            'DocumentMetadata': metadata,
+            'Blocks': blocks[start:start + MaxResults],
+        }
+        if start + MaxResults < len(blocks):
+            page['NextToken'] = str(start + MaxResults)
+        return page
@@ -0,0 +1,342 @@
+"""
+Tests for batched product category classification
+"""
+import threading
+import time
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from src.services.ml_services import category_classifier, classification_cache
+from src.services.ml_services.category_classifier import ProductCategoryClassifier
+from src.services.ml_services.classification_cache import ClassificationCache
+from src.services.ml_services.classifier_backends import ZeroShotBackend
+from src.services.ml_services.model_registry import ModelRegistry, ZERO_SHOT
+from src.services.ml_services.pricing_engine import PricingRecommendationEngine
+
+
+class FakeZeroShot:
+    """Stands in for the transformers pipeline; records every call"""
+
+    def __init__(self, label='calzado y zapatos', fail=False):
+        self.label = label
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, sequences, candidate_labels, batch_size=1):
+        self.calls.append((sequences, batch_size))
+        if self.fail:
+            raise RuntimeError("CUDA out of memory")
+        others = [label for label in candidate_labels if label != self.label]
+        outputs = [
+            {'sequence': sequence, 'labels': [self.label] + others, 'scores': [0.9] + [0.01] * len(others)}
+            for sequence in ([sequences] if isinstance(sequences, str) else sequences)
+        ]
+        return outputs[0] if isinstance(sequences, str) else outputs
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    models = ModelRegistry()
+    models.provide(ZERO_SHOT, FakeZeroShot())
+    monkeypatch.setattr(category_classifier, 'create_classifier_backend', lambda: ZeroShotBackend(models))
+    monkeypatch.setattr(category_classifier, 'get_classification_cache', lambda: ClassificationCache(max_entries=100, enabled=True))
+    return ProductCategoryClassifier()
+
+
+class TestClassifyProducts:
+
+    def test_one_pipeline_call_for_all_descriptions(self, classifier):
+        results = classifier.classify_products(["CHANCLA DAMA 36", "SANDALIA NIÑA 28", "BOTA HOMBRE 42"], batch_size=16)
+
+        assert len(classifier.classifier.calls) == 1
+        sequences, batch_size = classifier.classifier.calls[0]
+        assert sequences == ["chancla dama 36", "sandalia niña 28", "bota hombre 42"]
+        assert batch_size == 16
+        assert [result['category'] for result in results] == ['shoes'] * 3
+        assert results[0]['method'] == 'ml_zero_shot'
+
+    def test_order_kept_duplicates_classified_once(self, classifier):
+        results = classifier.classify_products(["BOTA 42", "", "CHANCLA 36", "bota  42", None])
+
+        sequences, _ = classifier.classifier.calls[0]
+        assert sequences == ["bota 42", "chancla 36"]
+        assert [result['method'] for result in results] == [
+            'ml_zero_shot', 'default', 'ml_zero_shot', 'ml_zero_shot', 'default'
+        ]
+        assert results[0] == results[3] and results[0] is not results[3]
+
+    def test_single_description_matches_batch(self, classifier):
+        assert classifier.classify_product("CHANCLA DAMA 36") == classifier.classify_products(["CHANCLA DAMA 36"])[0]
+
+    def test_empty_batch_skips_model(self, classifier):
+        assert classifier.classify_products(["", "  "]) == [classifier._get_default_classification()] * 2
+        assert classifier.classifier.calls == []
+
+    def test_model_failure_falls_back_to_keywords(self, classifier):
+        classifier.backend.models.provide(ZERO_SHOT, FakeZeroShot(fail=True))
+
+        results = classifier.classify_products(["CAMISETA POLO TALLA M", "AUDIFONOS BLUETOOTH"])
+
+        assert [result['category'] for result in results] == ['clothing', 'electronics']
+        assert {result['method'] for result in results} == {'keyword_fallback'}
+
+
+class TestKeywordFallback:
+
+    @pytest.mark.parametrize("description, category", [
+        ("ANGEL DE LA GUARDA FIGURA", 'general'),   # "gel" inside "angel"
+        ("GEL FIJADOR 250ML", 'beauty'),
+        ("ZAPATOS ESCOLARES", 'shoes'),             # plural of "zapato"
+        ("PANTALÓN DRIL HOMBRE", 'clothing'),       # accent folded
+        ("TENIS NIKE", 'shoes'),                    # "tenis" is also sports; the first best score wins
+        ("BASEBALL GORRA", 'accessories'),          # "base" only as a whole word
+    ])
+    def test_whole_word_matching(self, classifier, description, category):
+        assert classifier._fallback_classify(description)['category'] == category
+
+    def test_batch_matches_single_descriptions(self, classifier):
+        descriptions = ["CAMISETA POLO TALLA M", "", "AUDIFONOS BLUETOOTH USB", "ANGEL", "MESA\nSILLA"]
+
+        batch = classifier._fallback_classify_batch(descriptions)
+
+        assert batch == [classifier._fallback_classify(description) for description in descriptions]
+        assert [result['keyword_matches'] for result in batch] == [3, 0, 3, 0, 2]
+        assert batch[1]['category'] == 'general' and batch[1]['confidence'] == 0.60
+
+    def test_repeated_keyword_counts_once(self, classifier):
+        [(category, _, matches)] = classifier.keyword_matcher.classify(["usb usb usb cable"])
+
+        assert (category, matches) == ('electronics', 2)
+
+
+class FakeSession:
+    """Records executed statements; returns ``rows`` for selects"""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = self.rows
+        return result
+
+
+class TestClassificationCache:
+
+    def test_repeated_descriptions_skip_the_model(self, classifier):
+        classifier.classify_products(["CHANCLA RAJADO DAMA 36-40", "BOTA 42"], tenant_id="acme")
+        results = classifier.classify_products(["chancla  rajado dama 36-40", "SANDALIA 30"], tenant_id="acme")
+
+        assert [calls[0] for calls in classifier.classifier.calls] == [
+            ["chancla rajado dama 36-40", "bota 42"], ["sandalia 30"]
+        ]
+        assert results[0]['category'] == 'shoes' and results[0]['method'] == 'ml_zero_shot'
+        stats = classifier.cache.stats()
+        assert (stats['hits'], stats['misses'], stats['unsaved']) == (1, 3, 3)
+
+    def test_entries_are_per_tenant(self, classifier):
+        classifier.classify_products(["BOTA 42"], tenant_id="acme")
+        classifier.classify_products(["BOTA 42"], tenant_id="other")
+
+        assert len(classifier.classifier.calls) == 2
+
+    def test_margin_changes_apply_to_cached_entries(self, classifier):
+        classifier.classify_product("BOTA 42")
+        classifier.update_category_margins({'shoes': 80.0})
+
+        assert classifier.classify_product("BOTA 42")['margin_percentage'] == 80.0
+        assert len(classifier.classifier.calls) == 1
+
+    def test_label_set_change_invalidates(self, classifier):
+        classifier.classify_product("BOTA 42")
+        version = classifier.cache.version
+
+        classifier.update_categories({**classifier.category_mapping, 'mascotas': 'pets'})
+        classifier.classify_product("BOTA 42")
+
+        assert classifier.cache.version != version
+        assert len(classifier.classifier.calls) == 2
+
+    def test_keyword_fallback_is_not_cached(self, classifier):
+        classifier.backend.models = ModelRegistry()
+        classifier.classify_products(["CAMISETA POLO"], tenant_id="acme")
+
+        assert classifier.cache.stats()['entries'] == 0
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ClassificationCache(max_entries=2, enabled=True)
+        for key in ("a", "b"):
+            cache.put(None, key, {'category': 'shoes'})
+        cache.get_many(None, ["a"])
+        cache.put(None, "c", {'category': 'shoes'})
+
+        assert set(cache.get_many(None, ["a", "b", "c"])) == {"a", "c"}
+        assert cache.stats()['evictions'] == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_and_load_round_trip(self):
+        cache = ClassificationCache(max_entries=10, enabled=True)
+        cache.set_version("v1")
+        cache.put("acme", "bota 42", {'category': 'shoes', 'confidence': 0.9, 'method': 'ml_zero_shot'})
+        cache.put(None, "no tenant", {'category': 'shoes'})
+        session = FakeSession()
+
+        assert await cache.flush(session) == 1
+        assert len(session.statements) == 1  # Never deletes rows other processes may still read
+        assert "ON CONFLICT (tenant_id, classifier_version, description_key) DO NOTHING" in session.statements[0]
+        assert await cache.flush(session) == 0
+
+        # A fresh process loads the row instead of calling the model
+        restarted = ClassificationCache(max_entries=10, enabled=True)
+        restarted.set_version("v1")
+        row = MagicMock(description_key="bota 42", category="shoes", category_spanish="calzado y zapatos",
+                        confidence=Decimal("0.9000"), method="ml_zero_shot", all_scores={'shoes': 0.9})
+        assert await restarted.load(FakeSession([row]), "acme", ["bota 42"]) == 1
+        assert restarted.get_many("acme", ["bota 42"])["bota 42"]['confidence'] == 0.9
+        assert restarted.stats()['store_hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_entries_queued(self):
+        cache = ClassificationCache(max_entries=10, enabled=True)
+        cache.set_version("v1")
+        cache.put("acme", "bota 42", {'category': 'shoes'})
+        failing = MagicMock()
+        failing.execute = AsyncMock(side_effect=RuntimeError("connection reset"))
+
+        assert await cache.flush(failing) == 0
+        assert cache.stats()['unsaved'] == 1
+        assert await cache.flush(FakeSession()) == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_in_batches(self, monkeypatch):
+        monkeypatch.setattr(classification_cache, 'CLASSIFICATION_INSERT_BATCH', 2)
+        cache = ClassificationCache(max_entries=10, enabled=True)
+        cache.set_version("v1")
+        for key in ("a", "b", "c", "d", "e"):
+            cache.put("acme", key, {'category': 'shoes'})
+        session = FakeSession()
+
+        assert await cache.flush(session) == 5
+        assert len(session.statements) == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_requeues_a_bounded_backlog(self, monkeypatch):
+        monkeypatch.setattr(classification_cache, 'CLASSIFICATION_REQUEUE_LIMIT', 3)
+        cache = ClassificationCache(max_entries=10, enabled=True)
+        cache.set_version("v1")
+        for key in ("a", "b", "c", "d", "e"):
+            cache.put("acme", key, {'category': 'shoes'})
+        failing = MagicMock()
+        failing.execute = AsyncMock(side_effect=RuntimeError("too many bind parameters"))
+
+        assert await cache.flush(failing) == 0
+        assert cache.stats()['unsaved'] == 3
+        # The dropped rows stay served from memory
+        assert len(cache.get_many("acme", ["a", "b", "c", "d", "e"])) == 5
+
+    @pytest.mark.asyncio
+    async def test_purge_keeps_live_versions_and_recent_rows(self):
+        session = FakeSession()
+
+        await ClassificationCache(enabled=True).purge_stale(session, ["v1", "v2"], timedelta(days=30))
+
+        assert session.statements[0].startswith("DELETE FROM product_classifications")
+        assert "classifier_version NOT IN" in session.statements[0]
+        assert "product_classifications.created_at <" in session.statements[0]
+
+
+class TestModelRegistry:
+
+    def test_get_does_not_block_and_loads_in_background(self):
+        release = threading.Event()
+        model = FakeZeroShot()
+        registry = ModelRegistry()
+        registry.register(ZERO_SHOT, lambda: release.wait(5) and model, "fake-nli")
+
+        assert registry.get(ZERO_SHOT) is None
+        assert registry.stats()[ZERO_SHOT]['state'] == "loading"
+
+        release.set()
+        assert registry.wait(ZERO_SHOT, timeout=5) is model
+        assert registry.get(ZERO_SHOT) is model
+        assert registry.stats()[ZERO_SHOT]['state'] == "ready"
+
+    def test_failed_load_is_reported(self):
+        def broken():
+            raise ImportError("No module named 'transformers'")
+
+        registry = ModelRegistry()
+        registry.register(ZERO_SHOT, broken)
+
+        assert registry.wait(ZERO_SHOT, timeout=5) is None
+        assert registry.stats()[ZERO_SHOT] == {
+            'model': ZERO_SHOT, 'state': "failed", 'load_seconds': 0.0,
+            'error': "No module named 'transformers'", 'failures': 1, 'retry_in_seconds': 30
+        }
+        assert registry.degraded
+        assert registry.start_background_loading() is None  # not before the backoff
+
+    def test_failed_load_is_retried_after_backoff(self):
+        attempts = []
+        model = FakeZeroShot()
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OSError("Connection to huggingface.co timed out")
+            return model
+
+        registry = ModelRegistry(retry_backoff=0.05)
+        registry.register(ZERO_SHOT, flaky)
+
+        assert registry.wait(ZERO_SHOT, timeout=5) is None
+        assert registry.get(ZERO_SHOT) is None  # backing off
+        time.sleep(0.06)
+        assert registry.wait(ZERO_SHOT, timeout=5) is None
+        assert registry.stats()[ZERO_SHOT]['failures'] == 2
+
+        registry.reload(ZERO_SHOT).join(5)  # manual retry skips the (now 0.1s) backoff
+        assert registry.get(ZERO_SHOT) is model
+        assert not registry.degraded
+        assert registry.stats()[ZERO_SHOT]['error'] is None
+
+    def test_classifier_falls_back_until_model_ready(self, classifier):
+        release = threading.Event()
+        classifier.backend.models = ModelRegistry()
+        classifier.backend.models.register(ZERO_SHOT, lambda: release.wait(5) and FakeZeroShot())
+
+        assert classifier.classify_product("CAMISETA POLO")['method'] == 'keyword_fallback'
+
+        release.set()
+        classifier.backend.models.wait(ZERO_SHOT, timeout=5)
+        assert classifier.classify_product("CAMISETA POLO")['method'] == 'ml_zero_shot'
+
+
+class TestBatchPricing:
+
+    @pytest.mark.asyncio
+    async def test_invoice_is_classified_in_one_batch(self, classifier):
+        engine = PricingRecommendationEngine()
+        engine.category_classifier = classifier
+        engine.recommend_sale_price = AsyncMock(side_effect=lambda **kwargs: kwargs)
+        items = [
+            {'product_code': f"P{n}", 'description': f"CHANCLA DAMA {n}", 'unit_price': 10000, 'quantity': 2}
+            for n in range(5)
+        ]
+
+        recommendations = await engine.recommend_sale_prices(items)
+
+        assert len(classifier.classifier.calls) == 1
+        assert [rec['product_code'] for rec in recommendations] == [f"P{n}" for n in range(5)]
+        assert recommendations[0]['cost_price'] == Decimal("10000")
+        assert all(rec['category_info']['category'] == 'shoes' for rec in recommendations)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,163 @@
+"""
+Tests for the pluggable category classifier backends and the head trainer
+"""
+import numpy as np
+import pytest
+
+from src.services.ml_services import category_classifier
+from src.services.ml_services.category_classifier import ProductCategoryClassifier
+from src.services.ml_services.classification_cache import ClassificationCache
+from src.services.ml_services.classifier_backends import (
+    CategoryHead, EmbeddingHeadBackend, ZeroShotBackend, create_classifier_backend
+)
+from src.services.ml_services.model_registry import ModelRegistry, SENTENCE_EMBEDDINGS, ZERO_SHOT
+from src.services.ml_services.train_category_head import (
+    accuracy, fit_category_head, load_labelled_csv, split_examples
+)
+
+LABELS = ['calzado y zapatos', 'ropa y vestimenta', 'electrónicos y tecnología']
+
+
+class FakeEncoder:
+    """Keyword -> one-hot-ish embedding, stands in for SentenceTransformer"""
+
+    KEYWORDS = ['chancla', 'camiseta', 'cargador']
+
+    def encode(self, descriptions, batch_size=32, normalize_embeddings=True, convert_to_numpy=True):
+        vectors = np.full((len(descriptions), 4), 0.1, dtype=np.float32)
+        for row, description in enumerate(descriptions):
+            for column, keyword in enumerate(self.KEYWORDS):
+                if keyword in description:
+                    vectors[row, column] = 1.0
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def head():
+    encoder = FakeEncoder()
+    descriptions = ["chancla dama", "chancla niña", "camiseta polo", "camiseta manga", "cargador usb", "cargador 20w"]
+    return fit_category_head(encoder.encode(descriptions), [LABELS[0]] * 2 + [LABELS[1]] * 2 + [LABELS[2]] * 2)
+
+
+@pytest.fixture
+def models():
+    registry = ModelRegistry()
+    registry.provide(SENTENCE_EMBEDDINGS, FakeEncoder())
+    return registry
+
+
+class TestCategoryHead:
+
+    def test_fit_separates_categories(self, head):
+        encoder = FakeEncoder()
+
+        assert accuracy(head, encoder.encode(["chancla 38", "camiseta xl", "cargador tipo c"]), LABELS) == 1.0
+
+    def test_save_and_load_round_trip(self, head, tmp_path):
+        path = str(tmp_path / "models" / "head.npz")
+        head.save(path)
+
+        loaded = CategoryHead.load(path)
+
+        assert loaded.labels == head.labels
+        assert loaded.fingerprint == head.fingerprint
+        np.testing.assert_allclose(loaded.coef, head.coef)
+
+    def test_backend_returns_ranked_labels(self, head, models):
+        backend = EmbeddingHeadBackend(head, models)
+
+        [output] = backend.classify(["cargador usb"], LABELS, batch_size=8)
+
+        assert output['labels'][0] == 'electrónicos y tecnología'
+        assert output['scores'] == sorted(output['scores'], reverse=True)
+        assert sum(output['scores']) == pytest.approx(1.0)
+        assert backend.model_name.endswith(f"+head:{head.fingerprint}")
+
+    def test_backend_scores_only_candidate_labels(self, head, models):
+        backend = EmbeddingHeadBackend(head, models)
+
+        [output] = backend.classify(["cargador usb"], LABELS[:2], batch_size=8)
+
+        assert sorted(output['labels']) == sorted(LABELS[:2])
+        assert sum(output['scores']) == pytest.approx(1.0)
+        assert backend.unknown_labels(LABELS + ['mascotas']) == ['mascotas']
+
+
+class TestBackendSelection:
+
+    def test_missing_head_falls_back_to_zero_shot(self, tmp_path):
+        backend = create_classifier_backend("embedding_head", str(tmp_path / "missing.npz"), ModelRegistry())
+
+        assert isinstance(backend, ZeroShotBackend)
+
+    def test_head_for_another_encoder_falls_back_to_zero_shot(self, head, models, tmp_path, caplog):
+        """Weights trained on a different embedding space are never used"""
+        head.embedding_model = "distiluse-base-multilingual-cased-v2"
+        path = str(tmp_path / "head.npz")
+        head.save(path)
+
+        backend = create_classifier_backend("embedding_head", path, models)
+
+        assert isinstance(backend, ZeroShotBackend)
+        assert "distiluse-base-multilingual-cased-v2" in caplog.text
+
+    def test_classifier_uses_head_backend(self, head, models, tmp_path, monkeypatch):
+        path = str(tmp_path / "head.npz")
+        head.save(path)
+        monkeypatch.setattr(category_classifier, 'create_classifier_backend',
+                            lambda: create_classifier_backend("embedding_head", path, models))
+        monkeypatch.setattr(category_classifier, 'get_classification_cache', lambda: ClassificationCache(max_entries=10, enabled=True))
+
+        classifier = ProductCategoryClassifier()
+        result = classifier.classify_product("CHANCLA RAJADO DAMA 36-40")
+
+        assert result['category'] == 'shoes'
+        assert result['method'] == 'ml_supervised'
+        assert classifier.cache.stats()['entries'] == 1
+        # Retraining changes the fingerprint, hence the cache version
+        assert head.fingerprint in classifier.model_name
+
+    def test_head_rejects_labels_it_was_not_trained_on(self, head, models, monkeypatch):
+        monkeypatch.setattr(category_classifier, 'create_classifier_backend', lambda: EmbeddingHeadBackend(head, models))
+        monkeypatch.setattr(category_classifier, 'get_classification_cache', lambda: ClassificationCache(max_entries=10, enabled=True))
+        classifier = ProductCategoryClassifier()
+
+        with pytest.raises(ValueError, match="mascotas"):
+            classifier.update_categories({'calzado y zapatos': 'shoes', 'mascotas': 'pets'})
+
+        classifier.update_categories({'calzado y zapatos': 'shoes', 'ropa y vestimenta': 'clothing'})
+        assert classifier.classify_product("CARGADOR USB 20W")['category'] in ('shoes', 'clothing')
+
+    def test_only_the_active_backends_model_is_preloaded(self, head):
+        assert EmbeddingHeadBackend(head, ModelRegistry()).model_key == SENTENCE_EMBEDDINGS
+        assert ZeroShotBackend(ModelRegistry()).model_key == ZERO_SHOT
+
+
+class TestTrainingData:
+
+    def test_csv_accepts_english_or_spanish_categories(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(category_classifier, 'create_classifier_backend', lambda: ZeroShotBackend(ModelRegistry()))
+        path = tmp_path / "labelled.csv"
+        path.write_text(
+            "description,category\n"
+            "CHANCLA RAJADO DAMA  36-40,shoes\n"
+            "CAMISETA POLO,ropa y vestimenta\n"
+            "MISTERIO,unknown\n",
+            encoding='utf-8'
+        )
+
+        examples = load_labelled_csv(str(path), ProductCategoryClassifier())
+
+        assert examples == [("chancla rajado dama 36-40", "calzado y zapatos"), ("camiseta polo", "ropa y vestimenta")]
+
+    def test_split_is_deduplicated_and_disjoint(self):
+        examples = [(f"item {n}", LABELS[n % 3]) for n in range(20)] + [("item 1", LABELS[1])]
+
+        train, held_out = split_examples(examples, eval_fraction=0.25, seed=3)
+
+        assert len(train) + len(held_out) == 20 and len(held_out) == 5
+        assert not {d for d, _ in train} & {d for d, _ in held_out}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
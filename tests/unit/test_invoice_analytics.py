@@ -0,0 +1,74 @@
+"""
+Tests for SQL-side invoice analytics
+"""
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+
+from src.services.analytics import InvoiceAnalyticsService
+
+
+def _row(status, period, invoices, total_amount):
+    return SimpleNamespace(status=status, period=period, invoices=invoices, total_amount=total_amount)
+
+
+@pytest.fixture
+def analytics():
+    return InvoiceAnalyticsService()
+
+
+class TestInvoiceAnalytics:
+
+    def test_single_grouped_query(self, analytics):
+        """Counts and sums come from one GROUP BY scoped to the tenant"""
+        query = analytics.build_summary_query("tenant-a", "week", date_from=date(2025, 1, 1))
+
+        sql = str(query.compile(dialect=postgresql.dialect()))
+
+        assert sql.count("SELECT") == 1
+        assert "date_trunc(" in sql
+        assert "count(processed_invoices.id)" in sql
+        assert "sum(processed_invoices.total_amount)" in sql
+        assert "WHERE processed_invoices.tenant_id = " in sql
+        assert "processed_invoices.issue_date >= " in sql
+        assert "GROUP BY processed_invoices.status, date_trunc(" in sql
+
+    def test_unknown_bucket_is_rejected(self, analytics):
+        with pytest.raises(ValueError):
+            analytics.build_summary_query("tenant-a", "hour")
+
+    def test_summarize_grouped_rows(self, analytics):
+        """Status totals, success rate and a sorted per-period series"""
+        july, august = datetime(2025, 7, 1), datetime(2025, 8, 1)
+        rows = [
+            _row('completed', august, 3, Decimal('300000')),
+            _row('completed', july, 5, Decimal('1249500')),
+            _row('failed', july, 1, None),
+            _row('processing', None, 1, None),
+        ]
+
+        summary = analytics.summarize("tenant-a", "month", rows)
+
+        assert summary['total_invoices'] == 10
+        assert summary['completed_invoices'] == 8
+        assert summary['failed_invoices'] == 1
+        assert summary['success_rate'] == 0.8
+        assert summary['total_amount_processed'] == 1549500.0
+        assert summary['status_counts'] == {'completed': 8, 'failed': 1, 'processing': 1}
+        assert summary['series'] == [
+            {'period': '2025-07-01', 'invoices': 6, 'completed_invoices': 5, 'total_amount': 1249500.0},
+            {'period': '2025-08-01', 'invoices': 3, 'completed_invoices': 3, 'total_amount': 300000.0},
+        ]
+
+    def test_empty_tenant(self, analytics):
+        summary = analytics.summarize("tenant-a", "month", [])
+
+        assert summary['total_invoices'] == 0
+        assert summary['success_rate'] == 0
+        assert summary['series'] == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,107 @@
+"""
+Tests for keyset-paginated, projection-only invoice listings
+"""
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+
+from src.services.document_processing import invoice_processor as invoice_processor_module
+from src.services.document_processing.invoice_processor import InvoiceProcessorService, LISTING_COLUMNS
+from src.services.document_processing.pagination import encode_invoice_cursor, decode_invoice_cursor
+
+
+def _rows(count):
+    start = datetime(2025, 7, 15, 12, 0, 0)
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(), tenant_id="tenant", original_filename=f"f{i}.pdf", file_size=1000,
+            upload_timestamp=start - timedelta(minutes=i), processing_timestamp=None,
+            completion_timestamp=None, status="completed", confidence_score=None,
+            error_message=None, s3_key=None, textract_job_id=None, served_from_cache=False
+        )
+        for i in range(count)
+    ]
+
+
+def _session(rows):
+    session = MagicMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    result = MagicMock()
+    result.all.return_value = rows
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+@pytest.fixture
+def service():
+    return InvoiceProcessorService()
+
+
+class TestInvoiceCursor:
+
+    def test_round_trip(self):
+        timestamp, invoice_id = datetime(2025, 7, 15, 12, 30, 1, 123456), uuid.uuid4()
+
+        token = encode_invoice_cursor(timestamp, invoice_id)
+
+        assert decode_invoice_cursor(token) == (timestamp, invoice_id)
+        assert str(invoice_id) not in token
+
+    def test_malformed_cursor(self):
+        with pytest.raises(ValueError):
+            decode_invoice_cursor("not-a-cursor")
+
+
+class TestKeysetListing:
+
+    def test_query_is_keyset_without_raw_response(self, service):
+        cursor = encode_invoice_cursor(datetime(2025, 7, 15), uuid.uuid4())
+
+        sql = str(service.build_listing_query("tenant", 20, cursor).compile(dialect=postgresql.dialect()))
+
+        assert "textract_raw_response" not in sql
+        assert "OFFSET" not in sql
+        assert "(processed_invoices.upload_timestamp, processed_invoices.id) < (" in sql
+        assert "ORDER BY processed_invoices.upload_timestamp DESC, processed_invoices.id DESC" in sql
+        assert len(LISTING_COLUMNS) == sql.split("FROM")[0].count("processed_invoices.")
+
+    @pytest.mark.asyncio
+    async def test_next_cursor_points_at_last_row(self, service, monkeypatch):
+        rows = _rows(4)  # limit + 1 rows come back when there is another page
+        monkeypatch.setattr(invoice_processor_module, "AsyncSessionFactory", lambda: _session(rows))
+
+        page = await service.list_tenant_invoices_page("tenant", limit=3)
+
+        assert [invoice.original_filename for invoice in page['invoices']] == ["f0.pdf", "f1.pdf", "f2.pdf"]
+        assert decode_invoice_cursor(page['next_cursor']) == (rows[2].upload_timestamp, rows[2].id)
+
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self, service, monkeypatch):
+        monkeypatch.setattr(invoice_processor_module, "AsyncSessionFactory", lambda: _session(_rows(2)))
+
+        page = await service.list_tenant_invoices_page("tenant", limit=3)
+
+        assert len(page['invoices']) == 2
+        assert page['next_cursor'] is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("limit", [0, -5])
+    async def test_non_positive_limit_is_clamped(self, service, monkeypatch, limit):
+        """limit=0 used to slice every row away and index rows[-1]"""
+        session = _session(_rows(2))
+        monkeypatch.setattr(invoice_processor_module, "AsyncSessionFactory", lambda: session)
+
+        page = await service.list_tenant_invoices_page("tenant", limit=limit)
+
+        assert [invoice.original_filename for invoice in page['invoices']] == ["f0.pdf"]
+        assert page['next_cursor'] is not None
+        sql = session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        assert sql.params['param_1'] == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
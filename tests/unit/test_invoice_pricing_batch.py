@@ -0,0 +1,107 @@
+"""
+Tests for batched set_invoice_pricing
+"""
+import uuid
+import pytest
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from src.services.document_processing import invoice_processor as invoice_processor_module
+from src.services.document_processing.invoice_processor import InvoiceProcessorService
+
+
+class RecordingSession:
+    """AsyncSession stand-in that serves line items and records statements"""
+
+    def __init__(self, line_items):
+        self.line_items = line_items
+        self.statements = []
+        self.commit = AsyncMock()
+        self.rollback = AsyncMock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        self.statements.append((statement, params))
+        result = MagicMock()
+        result.all.return_value = self.line_items
+        return result
+
+
+def _line_items(count):
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            unit_price=Decimal('10000'),
+            quantity=Decimal('2'),
+            subtotal=Decimal('20000')
+        )
+        for _ in range(count)
+    ]
+
+
+@pytest.fixture
+def service():
+    return InvoiceProcessorService()
+
+
+class TestSetInvoicePricingBatch:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("count", [1, 30, 300])
+    async def test_query_count_is_constant(self, service, monkeypatch, count):
+        """One SELECT, one bulk UPDATE and the status UPDATE, for any size"""
+        items = _line_items(count)
+        session = RecordingSession(items)
+        monkeypatch.setattr(invoice_processor_module, "AsyncSessionFactory", lambda: session)
+
+        result = await service.set_invoice_pricing(str(uuid.uuid4()), "tenant", {
+            'line_items': [{'line_item_id': str(item.id), 'sale_price': 15000} for item in items]
+        })
+
+        assert len(session.statements) == 3
+        bulk_params = session.statements[1][1]
+        assert len(bulk_params) == count
+        assert bulk_params[0]['sale_price'] == Decimal('15000')
+        assert bulk_params[0]['markup_percentage'] == Decimal('50')
+        assert bulk_params[0]['is_priced'] is True
+
+        assert result['updated_items'] == count
+        assert result['total_cost'] == 20000 * count
+        assert result['total_sale_value'] == 30000 * count
+        assert result['average_markup'] == 50
+
+    @pytest.mark.asyncio
+    async def test_items_not_on_invoice_are_ignored(self, service, monkeypatch):
+        """Only rows returned by the invoice-scoped SELECT are updated"""
+        items = _line_items(2)
+        session = RecordingSession(items[:1])
+        monkeypatch.setattr(invoice_processor_module, "AsyncSessionFactory", lambda: session)
+
+        result = await service.set_invoice_pricing(str(uuid.uuid4()), "tenant", {
+            'line_items': [
+                {'line_item_id': str(item.id), 'sale_price': 12000} for item in items
+            ] + [{'line_item_id': str(uuid.uuid4()), 'sale_price': None}]
+        })
+
+        assert result['updated_items'] == 1
+        assert [row['id'] for row in session.statements[1][1]] == [items[0].id]
+
+    @pytest.mark.asyncio
+    async def test_no_prices_skips_line_item_queries(self, service, monkeypatch):
+        session = RecordingSession([])
+        monkeypatch.setattr(invoice_processor_module, "AsyncSessionFactory", lambda: session)
+
+        result = await service.set_invoice_pricing(str(uuid.uuid4()), "tenant", {'line_items': []})
+
+        assert len(session.statements) == 1  # Pricing status only
+        assert result['updated_items'] == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
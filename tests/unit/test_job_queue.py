@@ -0,0 +1,265 @@
+"""
+Tests for the durable job queue and invoice worker
+"""
+import asyncio
+import uuid
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+
+from src.database.models import BillingRecord
+from src.services.document_processing import invoice_processor as invoice_processor_module
+from src.services.document_processing.invoice_processor import InvoiceProcessorService
+from src.services.job_queue.queue import InvoiceJobQueue
+from src.services.job_queue.worker import InvoiceWorker
+
+
+class InMemoryQueue(InvoiceJobQueue):
+    """Queue with the claim/complete/fail contract but no database"""
+
+    def __init__(self, jobs, **kwargs):
+        super().__init__(**kwargs)
+        self.pending = list(jobs)
+        self.completed = []
+        self.failed = []
+        self.recoveries = 0
+
+    async def claim(self, worker_id, limit):
+        claimed, self.pending = self.pending[:limit], self.pending[limit:]
+        for job in claimed:
+            job.attempts += 1
+            job.locked_by = worker_id
+        return claimed
+
+    async def complete(self, job_id):
+        self.completed.append(job_id)
+
+    async def fail(self, job, error):
+        retry = job.attempts < job.max_attempts
+        if retry:
+            self.pending.append(job)  # Backoff skipped in tests
+        else:
+            self.failed.append(job.id)
+        return retry
+
+    async def recover_stale(self, stale_after_seconds=None):
+        self.recoveries += 1
+        return {}
+
+
+class RecordingProcessor:
+    """Processor that tracks concurrency and fails the first N attempts per job"""
+
+    def __init__(self, latency=0.02, failures_per_job=0):
+        self.latency = latency
+        self.failures_per_job = failures_per_job
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = []
+
+    async def process_invoice_job(self, job, final_attempt=True):
+        self.calls.append((job.id, job.attempts, final_attempt))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if job.attempts <= self.failures_per_job:
+                raise RuntimeError("Textract throttled")
+        finally:
+            self.in_flight -= 1
+
+
+def _job(max_attempts=3):
+    return SimpleNamespace(id=uuid.uuid4(), invoice_id=uuid.uuid4(), attempts=0,
+                           max_attempts=max_attempts, payload={'s3_key': 'k'})
+
+
+async def _run_until_idle(worker, queue, expected):
+    task = asyncio.create_task(worker.run())
+    for _ in range(500):
+        if len(queue.completed) + len(queue.failed) >= expected:
+            break
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await asyncio.wait_for(task, timeout=2)
+
+
+class TestInvoiceWorker:
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """Never more than ``concurrency`` jobs in flight, all jobs finish"""
+        queue = InMemoryQueue([_job() for _ in range(12)])
+        processor = RecordingProcessor()
+        worker = InvoiceWorker(processor=processor, queue=queue, concurrency=3, poll_interval=0.01)
+
+        await _run_until_idle(worker, queue, 12)
+
+        assert processor.peak == 3
+        assert len(queue.completed) == 12
+        assert queue.recoveries == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_attempts_are_retried(self):
+        """A failing job is re-queued; only the last attempt is final"""
+        job = _job(max_attempts=3)
+        queue = InMemoryQueue([job])
+        processor = RecordingProcessor(failures_per_job=2)
+        worker = InvoiceWorker(processor=processor, queue=queue, concurrency=2, poll_interval=0.01)
+
+        await _run_until_idle(worker, queue, 1)
+
+        assert queue.completed == [job.id]
+        assert [(attempt, final) for _, attempt, final in processor.calls] == [
+            (1, False), (2, False), (3, True)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_job_fails_after_max_attempts(self):
+        """Out of attempts: the job is recorded as failed"""
+        job = _job(max_attempts=2)
+        queue = InMemoryQueue([job])
+        worker = InvoiceWorker(
+            processor=RecordingProcessor(failures_per_job=5), queue=queue, concurrency=1, poll_interval=0.01
+        )
+
+        await _run_until_idle(worker, queue, 1)
+
+        assert queue.failed == [job.id]
+        assert queue.completed == []
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_in_flight_jobs(self):
+        """stop() waits for running jobs instead of dropping them"""
+        queue = InMemoryQueue([_job() for _ in range(2)])
+        worker = InvoiceWorker(
+            processor=RecordingProcessor(latency=0.2), queue=queue, concurrency=2, poll_interval=0.01
+        )
+
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.05)
+        worker.stop()
+        await asyncio.wait_for(task, timeout=2)
+
+        assert len(queue.completed) == 2
+
+
+class TestInvoiceJobQueue:
+
+    def test_backoff_is_exponential_and_capped(self):
+        queue = InvoiceJobQueue(max_attempts=5, backoff_base_seconds=5, backoff_max_seconds=60)
+
+        delays = [queue.backoff(attempt).total_seconds() for attempt in range(1, 6)]
+
+        assert delays == [5, 10, 20, 40, 60]
+
+    def test_claim_skips_locked_rows(self):
+        """Workers claim with FOR UPDATE SKIP LOCKED on runnable queued jobs"""
+        statement = InvoiceJobQueue().claim_statement(4, datetime.utcnow())
+
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "processing_jobs.status = " in sql
+        assert "processing_jobs.run_after <= " in sql
+        assert "LIMIT" in sql
+
+
+class TestJobIdempotency:
+
+    @pytest.fixture
+    def invoice(self):
+        return SimpleNamespace(
+            id=uuid.uuid4(), tenant_id="tenant", status="uploaded", file_size=1000,
+            invoice_type=None, textract_job_id=None, served_from_cache=False
+        )
+
+    @pytest.fixture
+    def session(self, invoice, monkeypatch):
+        session = MagicMock()
+        session.__aenter__ = AsyncMock(return_value=session)
+        session.__aexit__ = AsyncMock(return_value=False)
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = invoice
+        session.execute = AsyncMock(return_value=result)
+        session.commit = AsyncMock()
+        session.rollback = AsyncMock()
+        monkeypatch.setattr(invoice_processor_module, "AsyncSessionFactory", lambda: session)
+        return session
+
+    @pytest.fixture
+    def processor(self, session, textract_invoice_response):
+        processor = InvoiceProcessorService()
+        processor.artifact_store = MagicMock()
+        processor.artifact_store.save = AsyncMock()
+        processor.textract_service = MagicMock()
+        processor.textract_service.analyze_invoice = AsyncMock(return_value={
+            'extracted_data': {'line_items': [{'description': 'CAJA'}]}, 'confidence_score': 0.9,
+            'textract_response': textract_invoice_response
+        })
+        return processor
+
+    @staticmethod
+    def _statements(session, prefix):
+        return [
+            call.args[0] for call in session.execute.call_args_list
+            if str(call.args[0].compile(dialect=postgresql.dialect())).startswith(prefix)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_job_is_completed_with_its_results(self, processor, session, invoice):
+        """The job row is updated before the commit that stores the extraction"""
+        job = _job()
+        job.invoice_id = invoice.id
+
+        await processor.process_invoice_job(job)
+
+        assert len(self._statements(session, "UPDATE processing_jobs")) == 1
+        assert invoice.status == "completed"
+        session.commit.assert_awaited()
+
+    @pytest.mark.asyncio
+    async def test_rerunning_a_job_bills_once(self, processor, session, invoice):
+        """A job re-queued by recovery after its results were committed is a no-op"""
+        job = _job()
+        job.invoice_id = invoice.id
+
+        await processor.process_invoice_job(job)
+        await processor.process_invoice_job(job)
+
+        processor.textract_service.analyze_invoice.assert_awaited_once()
+        billing = [call.args[0] for call in session.add.call_args_list if isinstance(call.args[0], BillingRecord)]
+        assert len(billing) == 1
+        assert len(self._statements(session, "INSERT INTO invoice_line_items")) == 1
+        assert len(self._statements(session, "UPDATE tenants")) == 1
+
+
+class TestUploadEnqueue:
+
+    @pytest.mark.asyncio
+    async def test_invoice_and_job_commit_together(self, monkeypatch):
+        """One commit holds both rows, so neither can exist without the other"""
+        tenant = SimpleNamespace(invoices_processed_month=0, max_invoices_month=10)
+        session = MagicMock()
+        session.__aenter__ = AsyncMock(return_value=session)
+        session.__aexit__ = AsyncMock(return_value=False)
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = tenant
+        session.execute = AsyncMock(return_value=result)
+        session.commit = AsyncMock()
+        monkeypatch.setattr(invoice_processor_module, "AsyncSessionFactory", lambda: session)
+        processor = InvoiceProcessorService()
+        processor.result_cache = MagicMock(lookup=AsyncMock(return_value=None))
+        processor.textract_service = MagicMock(upload_document=AsyncMock())
+
+        await processor.upload_and_process_invoice("tenant", str(uuid.uuid4()), "f.pdf", b"%PDF-1.4")
+
+        session.commit.assert_awaited_once()
+        added = [type(call.args[0]).__name__ for call in session.add.call_args_list]
+        assert added == ["ProcessedInvoice", "ProcessingJob"]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
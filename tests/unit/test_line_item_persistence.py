@@ -0,0 +1,104 @@
+"""
+Tests for bulk invoice line-item persistence
+"""
+import uuid
+import pytest
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+
+from src.services.document_processing.invoice_processor import (
+    InvoiceProcessorService, LINE_ITEM_INSERT_BATCH
+)
+
+
+def _items(count):
+    return [
+        {
+            'item_number': i,
+            'product_code': f"{i:03d}",
+            'description': f"CHANCLA RAJADO DAMA {i}",
+            'quantity': Decimal('2'),
+            'unit_price': Decimal('105000'),
+            'subtotal': Decimal('210000'),
+            'unit_measure': 'UND'
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def processor():
+    return InvoiceProcessorService()
+
+
+class TestBulkLineItemInsert:
+
+    def test_rows_skip_items_without_description(self, processor):
+        invoice_id = uuid.uuid4()
+        items = _items(3) + [{'item_number': 4, 'description': ''}, None]
+
+        rows = processor._build_line_item_rows(invoice_id, items)
+
+        assert len(rows) == 3
+        assert all(row['invoice_id'] == invoice_id for row in rows)
+        assert rows[0]['line_number'] == 1
+        assert rows[0]['quantity'] == Decimal('2')
+        assert rows[0]['is_priced'] is False
+
+    @pytest.mark.asyncio
+    async def test_missing_unit_fields_get_column_defaults(self, processor):
+        """No unit data persists as UNIDAD x1, like the ORM add() path, never NULL"""
+        session = MagicMock()
+        session.execute = AsyncMock()
+        items = [{'item_number': 1, 'description': 'MEDIA TOBILLERA', 'quantity': '3'}] + _items(1)
+
+        rows = processor._build_line_item_rows(uuid.uuid4(), items)
+        await processor._bulk_insert_line_items(session, rows)
+
+        assert rows[0]['unit_measure'] == "UNIDAD"
+        assert rows[0]['unit_multiplier'] == 1
+        assert rows[1]['unit_measure'] == "UND"
+        params = session.execute.call_args.args[0].compile(dialect=postgresql.dialect()).params
+        assert params['unit_measure_m0'] == "UNIDAD"
+        assert params['unit_multiplier_m0'] == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("count", [10, 250, 1000])
+    async def test_one_statement_per_batch(self, processor, count):
+        """Up to LINE_ITEM_INSERT_BATCH lines go out as a single INSERT"""
+        session = MagicMock()
+        session.execute = AsyncMock()
+
+        await processor._bulk_insert_line_items(
+            session, processor._build_line_item_rows(uuid.uuid4(), _items(count))
+        )
+
+        assert session.execute.await_count == 1
+        sql = str(session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert sql.startswith("INSERT INTO invoice_line_items")
+        assert sql.count("), (") == count - 1  # Multi-row VALUES
+
+    @pytest.mark.asyncio
+    async def test_large_invoices_are_batched(self, processor):
+        session = MagicMock()
+        session.execute = AsyncMock()
+
+        await processor._bulk_insert_line_items(
+            session, processor._build_line_item_rows(uuid.uuid4(), _items(LINE_ITEM_INSERT_BATCH * 2 + 1))
+        )
+
+        assert session.execute.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_no_rows_no_statement(self, processor):
+        session = MagicMock()
+        session.execute = AsyncMock()
+
+        await processor._bulk_insert_line_items(session, [])
+
+        session.execute.assert_not_awaited()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
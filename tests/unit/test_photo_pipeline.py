@@ -0,0 +1,150 @@
+"""
+Tests for the off-loop photo enhancement pool
+"""
+import asyncio
+import time
+import pytest
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock
+
+from src.services.document_processing.computer_vision import photo_pipeline
+from src.services.document_processing.computer_vision.pdf_converter import ImageToPDFConverter
+from src.services.document_processing.computer_vision.photo_pipeline import (
+    PhotoPipelinePool, enhance_photo_to_pdf
+)
+
+
+@pytest.fixture
+def photo():
+    image = np.full((400, 300, 3), 240, dtype=np.uint8)
+    cv2.putText(image, "FACTURA PMB12345", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (10, 10, 10), 2)
+    return cv2.imencode('.jpg', image)[1].tobytes()
+
+
+class TestPhotoPipelinePool:
+
+    def test_pipeline_produces_pdf(self, photo):
+        assert enhance_photo_to_pdf(photo).startswith(b"%PDF")
+
+    def test_grayscale_pipeline_produces_single_channel_pdf(self, photo):
+        pdf_content = enhance_photo_to_pdf(photo, grayscale=True)
+
+        assert pdf_content.startswith(b"%PDF")
+        assert b"/DeviceGray" in pdf_content and b"/DeviceRGB" not in pdf_content
+
+    @pytest.mark.asyncio
+    async def test_process_pool_is_prewarmed_and_returns_pdf(self, photo):
+        pool = PhotoPipelinePool(workers=1, max_pending=2)
+        try:
+            await pool.start()
+            pdf_content = await pool.enhance_to_pdf(photo)
+        finally:
+            pool.shutdown()
+
+        assert pdf_content.startswith(b"%PDF")
+        assert b"/DeviceGray" in await pool.enhance_to_pdf(photo, grayscale=True)
+        stats = pool.stats()
+        assert stats['mode'] == "process"
+        assert stats['completed'] == 2 and stats['p50_ms'] is not None
+
+    @pytest.mark.asyncio
+    async def test_photos_become_one_multi_page_pdf(self, photo):
+        pool = PhotoPipelinePool(workers=1, max_pending=4)
+        try:
+            pdf_content = await pool.enhance_pages_to_pdf([photo, photo, photo])
+        finally:
+            pool.shutdown()
+
+        assert ImageToPDFConverter().count_pages(pdf_content) == 3
+        assert pool.stats()['completed'] == 3
+
+    @pytest.mark.asyncio
+    async def test_pages_are_enhanced_in_parallel(self, monkeypatch):
+        page_images = {b"p1": b"jpeg1", b"p2": b"jpeg2", b"p3": b"jpeg3"}
+        assembled = []
+        monkeypatch.setattr(photo_pipeline, 'enhance_photo', lambda content, grayscale=False: time.sleep(0.2) or page_images[content])
+        monkeypatch.setattr(photo_pipeline, 'assemble_pdf', lambda pages: assembled.append(pages) or b"%PDF")
+        pool = PhotoPipelinePool(workers=0, max_pending=4)
+        pool._executor = ThreadPoolExecutor(max_workers=3)
+
+        started = time.perf_counter()
+        assert await pool.enhance_pages_to_pdf([b"p1", b"p2", b"p3"]) == b"%PDF"
+        elapsed = time.perf_counter() - started
+        pool.shutdown()
+
+        # Close to the slowest page, not the sum of all three; page order kept
+        assert elapsed < 0.4
+        assert assembled == [[b"jpeg1", b"jpeg2", b"jpeg3"]]
+
+    @pytest.mark.asyncio
+    async def test_event_loop_keeps_running_during_enhancement(self, monkeypatch):
+        monkeypatch.setattr(photo_pipeline, 'enhance_photo_to_pdf', lambda content, grayscale=False: time.sleep(0.2) or b"%PDF")
+        pool = PhotoPipelinePool(workers=0, max_pending=2)
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        await pool.enhance_to_pdf(b"photo")
+        beat.cancel()
+        pool.shutdown()
+
+        assert ticks >= 10
+
+    @pytest.mark.asyncio
+    async def test_pending_work_is_bounded(self, monkeypatch):
+        pool = PhotoPipelinePool(workers=0, max_pending=2)
+        peak = 0
+
+        def slow(content, grayscale=False):
+            time.sleep(0.02)
+            return b"%PDF"
+
+        monkeypatch.setattr(photo_pipeline, 'enhance_photo_to_pdf', slow)
+
+        async def upload():
+            nonlocal peak
+            task = asyncio.create_task(pool.enhance_to_pdf(b"photo"))
+            await asyncio.sleep(0)
+            peak = max(peak, pool.in_flight)
+            return await task
+
+        results = await asyncio.gather(*[upload() for _ in range(6)])
+        pool.shutdown()
+
+        assert results == [b"%PDF"] * 6
+        assert peak <= 2
+        assert pool.stats()['completed'] == 6
+
+    @pytest.mark.asyncio
+    async def test_broken_pool_is_replaced(self):
+        pool = PhotoPipelinePool(workers=1)
+        broken = MagicMock()
+        pool._executor = broken
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        broken_run = MagicMock(return_value=future)
+
+        original = loop.run_in_executor
+        loop.run_in_executor = broken_run
+        try:
+            with pytest.raises(BrokenProcessPool):
+                await pool.enhance_to_pdf(b"photo")
+        finally:
+            loop.run_in_executor = original
+
+        assert pool._executor is None
+        broken.shutdown.assert_called_once()
+        assert pool.stats()['failed'] == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
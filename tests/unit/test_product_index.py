@@ -0,0 +1,298 @@
+"""
+Tests for the per-tenant product embedding index and catalog matching
+"""
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.services.ml_services import product_index
+from src.services.ml_services.model_registry import ModelRegistry, SENTENCE_EMBEDDINGS
+from src.services.ml_services.product_index import ProductEmbeddingIndex, ProductEmbeddingStore, RESCAN_WINDOW
+from src.services.ml_services.product_matching import IntelligentProductMatcher
+
+VECTORS = {
+    "chancla rajado dama": [1.0, 0.1, 0.0, 0.0],
+    "chancla dama rajada": [0.95, 0.2, 0.0, 0.0],
+    "camiseta polo": [0.0, 1.0, 0.1, 0.0],
+    "cargador usb": [0.0, 0.0, 1.0, 0.2],
+}
+
+
+class FakeEncoder:
+
+    def encode(self, descriptions, batch_size=32, normalize_embeddings=True, convert_to_numpy=True):
+        return np.array([VECTORS[description.lower()] for description in descriptions], dtype=np.float32)
+
+
+class FakeSession:
+    """Returns the queued row lists in order; records compiled SQL"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+        self.params = []
+        self.commits = 0
+
+    async def execute(self, statement):
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.statements.append(str(compiled))
+        self.params.append(compiled.params)
+        rows = self.results.pop(0) if self.results else []
+        return SimpleNamespace(all=lambda: rows)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def embedding_row(product_id, description, created_at=datetime(2026, 10, 1)):
+    vector = np.array(VECTORS[description], dtype=np.float32)
+    return SimpleNamespace(
+        product_id=product_id,
+        embedding=(vector / np.linalg.norm(vector)).tobytes(),
+        created_at=created_at
+    )
+
+
+@pytest.fixture
+def write_session(monkeypatch):
+    """Session the backfill opens for itself"""
+    session = FakeSession()
+    monkeypatch.setattr(product_index, "AsyncSessionFactory", lambda: session)
+    return session
+
+
+@pytest.fixture
+def models():
+    registry = ModelRegistry()
+    registry.provide(SENTENCE_EMBEDDINGS, FakeEncoder())
+    return registry
+
+
+class TestProductEmbeddingIndex:
+
+    def test_top_k_matches_brute_force(self):
+        rng = np.random.default_rng(3)
+        vectors = rng.normal(size=(500, 16)).astype(np.float32)
+        index = ProductEmbeddingIndex(16, capacity=8)  # grows several times
+        index.add([f"p{i}" for i in range(500)], vectors)
+        query = rng.normal(size=16)
+
+        hits = index.search(query, k=10)
+
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:10]
+        assert [product_id for product_id, _ in hits] == [f"p{i}" for i in expected]
+        assert hits[0][1] >= hits[-1][1]
+
+    def test_remove_and_re_add(self):
+        index = ProductEmbeddingIndex(4)
+        index.add(["a", "b", "c"], np.eye(4)[:3])
+
+        assert index.remove(["a", "missing"]) == 1
+        assert len(index) == 2 and "a" not in index
+        assert [product_id for product_id, _ in index.search([0, 0, 1, 0], k=5)] == ["c", "b"]
+
+        index.add(["b"], [[0, 0, 1, 0]])  # overwrite, not duplicate
+        assert len(index) == 2
+        assert index.search([0, 0, 1, 0], k=2, min_score=0.99) == [("c", pytest.approx(1.0)), ("b", pytest.approx(1.0))]
+
+    def test_empty_index(self):
+        assert ProductEmbeddingIndex(4).search([1, 0, 0, 0]) == []
+
+
+class TestProductEmbeddingStore:
+
+    @pytest.mark.asyncio
+    async def test_index_loads_once_then_refreshes_incrementally(self):
+        store = ProductEmbeddingStore(models=ModelRegistry(), refresh_seconds=0)
+        first, second = uuid.uuid4(), uuid.uuid4()
+        session = FakeSession(
+            [embedding_row(first, "chancla rajado dama")],
+            [embedding_row(second, "camiseta polo", datetime(2026, 10, 2))]
+        )
+
+        index = await store.get_index(session, "acme")
+        await store.get_index(session, "acme")
+
+        assert len(index) == 2
+        assert "product_embeddings.created_at >= " not in session.statements[0]
+        assert "product_embeddings.created_at >= " in session.statements[1]
+        assert store.stats()['products'] == 2
+
+    @pytest.mark.asyncio
+    async def test_refresh_rescans_behind_the_watermark(self):
+        """A row committed late by another worker carries an older created_at"""
+        store = ProductEmbeddingStore(models=ModelRegistry(), refresh_seconds=0)
+        late = uuid.uuid4()
+        session = FakeSession(
+            [embedding_row(uuid.uuid4(), "chancla rajado dama", datetime(2026, 10, 2, 12, 0))],
+            [embedding_row(late, "camiseta polo", datetime(2026, 10, 2, 11, 58))]
+        )
+
+        await store.get_index(session, "acme")
+        index = await store.get_index(session, "acme")
+
+        assert str(late) in index
+        assert datetime(2026, 10, 2, 12, 0) - RESCAN_WINDOW in session.params[1].values()
+        assert store._watermarks["acme"][0] == datetime(2026, 10, 2, 12, 0)
+
+    @pytest.mark.asyncio
+    async def test_add_and_remove_keep_loaded_index_in_step(self, models):
+        store = ProductEmbeddingStore(models=models, refresh_seconds=3600)
+        existing, new = uuid.uuid4(), uuid.uuid4()
+        session = FakeSession([embedding_row(existing, "camiseta polo")], [])
+        index = await store.get_index(session, "acme")
+
+        assert await store.add_products(session, "acme", [{'id': str(new), 'description': "CARGADOR USB"}]) == 1
+        assert "ON CONFLICT (product_id) DO UPDATE" in session.statements[-1]
+        assert index.search(VECTORS["cargador usb"], k=1)[0][0] == str(new)
+
+        await store.remove_products(session, "acme", [new])
+        assert str(new) not in index and len(index) == 1
+
+    @pytest.mark.asyncio
+    async def test_products_without_embeddings_are_backfilled(self, models, write_session):
+        store = ProductEmbeddingStore(models=models)
+        product_id = uuid.uuid4()
+        session = FakeSession([])
+        write_session.results = [[SimpleNamespace(id=product_id, description="cargador usb")]]
+
+        assert await store.get_index(session, "acme") is None  # lookup does not wait for the backfill
+        await store._backfills["acme"]
+
+        index = await store.get_index(session, "acme")
+        assert str(product_id) in index and store.is_complete("acme")
+        # Read and written on its own session: the caller's pending work is never committed
+        assert len(session.statements) == 1 and session.commits == 0
+        assert write_session.commits == 1
+        assert "now()" in write_session.statements[1]
+
+    @pytest.mark.asyncio
+    async def test_backfill_skips_empty_descriptions_and_other_models(self, models, write_session):
+        store = ProductEmbeddingStore(models=models)
+
+        await store.get_index(FakeSession([]), "acme")
+        await store._backfills["acme"]
+
+        sql = write_session.statements[0]
+        assert "LEFT OUTER JOIN product_embeddings ON product_embeddings.product_id = products.id " \
+               "AND product_embeddings.model = " in sql
+        assert "products.description IS NOT NULL" in sql and "products.description != " in sql
+        assert store.model_name in write_session.params[0].values()
+
+    @pytest.mark.asyncio
+    async def test_products_created_after_first_load_are_embedded_on_refresh(self, models, write_session):
+        store = ProductEmbeddingStore(models=models, refresh_seconds=0)
+        existing, created_later = uuid.uuid4(), uuid.uuid4()
+        session = FakeSession([embedding_row(existing, "camiseta polo")], [])
+        write_session.results = [[], [SimpleNamespace(id=created_later, description="cargador usb")]]
+
+        await store.get_index(session, "acme")
+        await store._backfills["acme"]  # first load: nothing missing
+        await store.get_index(session, "acme")
+        await store._backfills["acme"]
+
+        index = await store.get_index(session, "acme")
+        assert str(created_later) in index and len(index) == 2
+        assert sum("LEFT OUTER JOIN product_embeddings" in statement for statement in write_session.statements) == 2
+
+    @pytest.mark.asyncio
+    async def test_catalog_is_incomplete_until_backfill_embeds_everything(self, models, write_session):
+        store = ProductEmbeddingStore(models=models)
+        write_session.results = [[SimpleNamespace(id=uuid.uuid4(), description="cargador usb")]]
+        models_ready = store.models
+        store.models = ModelRegistry()
+
+        await store.get_index(FakeSession([]), "acme")  # model not ready: no backfill yet
+        assert not store.is_complete("acme")
+
+        store.models = models_ready
+        await store.get_index(FakeSession([]), "acme")
+        await store._backfills["acme"]
+        assert store.is_complete("acme")
+
+    @pytest.mark.asyncio
+    async def test_model_not_ready_stores_nothing(self):
+        store = ProductEmbeddingStore(models=ModelRegistry())
+
+        assert await store.add_products(FakeSession(), "acme", [{'id': str(uuid.uuid4()), 'description': "x"}]) == 0
+
+
+class TestCatalogMatching:
+
+    @pytest.fixture
+    def matcher(self, models, monkeypatch):
+        catalog = {
+            "p1": "CHANCLA RAJADO DAMA",
+            "p2": "CHANCLA DAMA RAJADA",
+            "p3": "CAMISETA POLO",
+            "p4": "CARGADOR USB",  # not embedded yet
+        }
+        matcher = IntelligentProductMatcher()
+        matcher.store = ProductEmbeddingStore(models=models, refresh_seconds=3600)
+        index = ProductEmbeddingIndex(4)
+        index.add(["p1", "p2", "p3", "deleted"], np.array([VECTORS[d.lower()] for d in list(catalog.values())[:3]] + [VECTORS["chancla rajado dama"]]))
+        matcher.store._indexes["acme"] = index
+        matcher.store._watermarks["acme"] = (datetime(2026, 10, 1), float("inf"))
+        matcher.store._complete["acme"] = True
+
+        async def load_catalog(session, tenant_id, product_ids=None):
+            return [
+                {'id': product_id, 'product_code': product_id, 'description': description}
+                for product_id, description in catalog.items()
+                if product_ids is None or product_id in product_ids
+            ]
+
+        monkeypatch.setattr(matcher, '_load_catalog', load_catalog)
+        return matcher
+
+    @pytest.mark.asyncio
+    async def test_candidates_come_from_index(self, matcher):
+        matches = await matcher.find_catalog_matches(FakeSession(), "acme", "chancla rajado dama", threshold=0.8)
+
+        assert [match['product']['id'] for match in matches] == ["p1", "p2"]
+        assert matches[0]['match_type'] == 'fuzzy' and matches[0]['similarity_score'] == 1.0
+        assert matches[1]['match_type'] == 'semantic'
+
+    @pytest.mark.asyncio
+    async def test_partial_index_still_fuzzy_matches_whole_catalog(self, matcher):
+        matcher.store._complete["acme"] = False
+
+        matches = await matcher.find_catalog_matches(FakeSession(), "acme", "cargador usb", threshold=0.8)
+
+        assert [(match['product']['id'], match['match_type']) for match in matches] == [("p4", 'fuzzy')]
+
+    @pytest.mark.asyncio
+    async def test_complete_index_scores_candidates_only(self, matcher):
+        assert await matcher.find_catalog_matches(FakeSession(), "acme", "cargador usb", threshold=0.8) == []
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_full_scan_while_model_loads(self, matcher):
+        matcher.store.models = ModelRegistry()
+
+        matches = await matcher.find_catalog_matches(FakeSession(), "acme", "camiseta polo", threshold=0.8)
+
+        assert [match['product']['id'] for match in matches] == ["p3"]
+
+
+    @pytest.mark.asyncio
+    async def test_similar_products_never_encode_the_list(self, matcher, monkeypatch):
+        monkeypatch.setattr(matcher.store, 'encode', lambda descriptions: pytest.fail("catalog re-encoded"))
+        products = [{'id': "p1", 'description': "CHANCLA RAJADO DAMA"}, {'id': "p3", 'description': "CAMISETA POLO"}]
+
+        matches = await matcher.find_similar_products("chancla rajado dama", products, threshold=0.8)
+
+        assert [(match['product']['id'], match['match_type']) for match in matches] == [("p1", 'fuzzy')]
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
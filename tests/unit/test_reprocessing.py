@@ -0,0 +1,179 @@
+"""
+Tests for the offline Textract reprocessing/backfill command
+"""
+import uuid
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from sqlalchemy.dialects import postgresql
+
+from src.services.document_processing.invoice_processor import InvoiceProcessorService
+from src.services.document_processing.textract import encode_textract_response
+from src.services.reprocessing import backfill
+from src.services.reprocessing.backfill import (
+    InvoiceReprocessor, ReprocessCheckpoint, ReprocessStats, LINE_ITEM_DIFF_FIELDS
+)
+from textract_samples import build_invoice_response
+
+
+@pytest.fixture(scope="module", autouse=True)
+def worker_service():
+    """Tests run extraction in-process; set up the worker the pool initializer would"""
+    backfill.init_worker()
+
+
+@pytest.fixture
+def processor():
+    return InvoiceProcessorService()
+
+
+def _stored_row(processor, invoice_id, response, **overrides):
+    """Stream row for an invoice whose stored fields match ``response``"""
+    _, extracted, _ = backfill.reextract((str(invoice_id), encode_textract_response(response), None))
+    fields = processor._invoice_field_values(extracted)
+    fields.update(overrides)
+    return SimpleNamespace(
+        invoice_id=invoice_id,
+        archive=encode_textract_response(response),
+        raw_response=None,
+        pricing_status="pending",
+        **fields
+    ), extracted
+
+
+def _stored_items(processor, invoice_id, extracted):
+    return [
+        SimpleNamespace(**{field: row[field] for field in LINE_ITEM_DIFF_FIELDS})
+        for row in processor._build_line_item_rows(invoice_id, extracted['line_items'])
+    ]
+
+
+def _reprocessor(processor, batches, stored_items, **kwargs):
+    reprocessor = InvoiceReprocessor(processor=processor, executor=ThreadPoolExecutor(2), report=kwargs.pop('report', print), **kwargs)
+
+    async def stream_batches(after_invoice_id):
+        for batch in batches:
+            rows = [row for row in batch if after_invoice_id is None or row.invoice_id > after_invoice_id]
+            if rows:
+                yield rows
+
+    reprocessor.stream_batches = stream_batches
+    reprocessor.load_line_items = AsyncMock(return_value=stored_items)
+    reprocessor.write_batch = AsyncMock()
+    return reprocessor
+
+
+class TestReextract:
+
+    def test_archive_and_legacy_json_extract_the_same(self):
+        response = build_invoice_response(num_items=8)
+
+        _, from_archive, error = backfill.reextract(("a", encode_textract_response(response), None))
+        _, from_json, _ = backfill.reextract(("b", None, response))
+
+        assert error is None
+        assert from_archive == from_json
+        assert len(from_archive['line_items']) == 8
+        assert 'full_text' not in from_archive  # only written-back parts cross the process boundary
+
+    def test_errors_are_returned_not_raised(self):
+        invoice_id, extracted, error = backfill.reextract(("bad", b"garbage", None))
+
+        assert invoice_id == "bad" and extracted is None
+        assert "Textract archive" in error
+
+
+class TestInvoiceReprocessor:
+
+    def test_stream_query_is_keyset_ordered_and_skips_priced(self, processor):
+        reprocessor = InvoiceReprocessor(processor=processor, tenant_id="acme")
+
+        sql = str(reprocessor.build_stream_query(uuid.uuid4()).compile(dialect=postgresql.dialect()))
+
+        assert "processed_invoices.id > " in sql
+        assert sql.rstrip().endswith("ORDER BY processed_invoices.id")
+        assert "processed_invoices.pricing_status NOT IN" in sql
+        assert "processed_invoices.total_amount" in sql
+
+    def test_stream_query_includes_cache_served_invoices(self, processor):
+        """A cache hit is re-extracted from its original invoice's artifact"""
+        sql = str(InvoiceReprocessor(processor=processor).build_stream_query().compile(dialect=postgresql.dialect()))
+
+        assert "processed_invoices.id AS invoice_id" in sql
+        assert (
+            "JOIN textract_artifacts ON textract_artifacts.invoice_id = "
+            "coalesce(processed_invoices.cached_invoice_id, processed_invoices.id)"
+        ) in sql
+
+    @pytest.mark.asyncio
+    async def test_dry_run_reports_diff_and_writes_nothing(self, processor):
+        unchanged_id, changed_id = sorted([uuid.uuid4(), uuid.uuid4()])
+        response = build_invoice_response(num_items=5)
+        unchanged, extracted = _stored_row(processor, unchanged_id, response)
+        changed, _ = _stored_row(processor, changed_id, response, total_amount=None)
+        stored = {
+            unchanged_id: _stored_items(processor, unchanged_id, extracted),
+            changed_id: _stored_items(processor, changed_id, extracted)[:3],
+        }
+        lines = []
+        reprocessor = _reprocessor(processor, [[unchanged, changed]], stored, dry_run=True, report=lines.append)
+
+        stats = await reprocessor.run()
+
+        assert (stats.scanned, stats.changed, stats.written) == (2, 1, 0)
+        reprocessor.write_batch.assert_not_awaited()
+        assert lines[0] == f"~ {changed_id}"
+        assert any("total_amount: None -> Decimal('1249500')" in line for line in lines)
+        assert any("line_items: 3 -> 5 rows (0 removed, 2 added)" in line for line in lines)
+
+    @pytest.mark.asyncio
+    async def test_writes_only_changed_invoices_in_bulk(self, processor):
+        ids = sorted(uuid.uuid4() for _ in range(3))
+        response = build_invoice_response(num_items=4)
+        rows, stored = [], {}
+        for position, invoice_id in enumerate(ids):
+            overrides = {'supplier_name': "OLD NAME"} if position else {}
+            row, extracted = _stored_row(processor, invoice_id, response, **overrides)
+            rows.append(row)
+            stored[invoice_id] = _stored_items(processor, invoice_id, extracted)
+        reprocessor = _reprocessor(processor, [rows], stored)
+
+        stats = await reprocessor.run()
+
+        assert stats.written == 2
+        updates, line_rows = reprocessor.write_batch.await_args.args
+        assert [values['id'] for values in updates] == ids[1:]
+        assert 'pricing_status' not in updates[0]
+        assert len(line_rows) == 8
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_resume(self, processor, tmp_path):
+        ids = sorted(uuid.uuid4() for _ in range(4))
+        response = build_invoice_response(num_items=2)
+        rows = [_stored_row(processor, invoice_id, response, invoice_number="OLD")[0] for invoice_id in ids]
+        checkpoint = ReprocessCheckpoint(str(tmp_path / "checkpoint.json"))
+
+        first = _reprocessor(processor, [rows[:2]], {}, checkpoint=checkpoint)
+        await first.run()
+        assert checkpoint.load(None)[0] == ids[1]
+
+        second = _reprocessor(processor, [rows[:2], rows[2:]], {}, checkpoint=checkpoint)
+        stats = await second.run()
+
+        # Only the last two were processed again; totals carry over
+        assert second.write_batch.await_count == 1
+        assert stats.scanned == 4 and stats.written == 4
+        assert checkpoint.load(None)[0] == ids[3]
+
+    def test_checkpoint_rejects_other_tenant(self, tmp_path):
+        checkpoint = ReprocessCheckpoint(str(tmp_path / "checkpoint.json"))
+        checkpoint.save(uuid.uuid4(), "acme", ReprocessStats(scanned=10, elapsed_seconds=2.0))
+
+        assert checkpoint.load("acme")[1].rate == 5.0
+        with pytest.raises(ValueError):
+            checkpoint.load("other")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,100 @@
+"""
+Tests for the compact Textract archive format
+"""
+import json
+import pytest
+import numpy as np
+
+from src.services.document_processing.textract import archive
+from src.services.document_processing.textract.archive import (
+    encode_textract_response, decode_textract_response, is_textract_archive
+)
+from src.services.document_processing.textract.textract_service import TextractService
+from textract_samples import build_invoice_response
+
+
+def _float32(value):
+    """Round every float to float32, as real Textract responses are"""
+    if isinstance(value, float):
+        return float(np.float32(value))
+    if isinstance(value, dict):
+        return {key: _float32(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_float32(item) for item in value]
+    return value
+
+
+class TestTextractArchive:
+
+    def test_round_trip_is_exact(self, textract_invoice_response):
+        """float64 values (synthetic responses) survive unchanged"""
+        packed = encode_textract_response(textract_invoice_response)
+
+        assert is_textract_archive(packed)
+        assert decode_textract_response(packed) == textract_invoice_response
+
+    def test_multi_page_async_response(self):
+        response = _float32(build_invoice_response(num_items=60, pages=3))
+        response['JobId'] = "job-123"
+
+        assert decode_textract_response(encode_textract_response(response)) == response
+
+    def test_archive_is_much_smaller_than_json(self):
+        response = _float32(build_invoice_response(num_items=50))
+
+        packed = encode_textract_response(response)
+
+        assert len(json.dumps(response)) / len(packed) > 8
+
+    def test_extraction_runs_on_decoded_archive(self):
+        """Decoded archives (even without geometry) extract the same invoice"""
+        response = build_invoice_response(num_items=20, pages=2)
+        service = TextractService(max_concurrency=1)
+
+        expected = service._extract_invoice_data(response)
+        packed = encode_textract_response(response)
+
+        assert service._extract_invoice_data(decode_textract_response(packed)) == expected
+        assert service._extract_invoice_data(decode_textract_response(packed, geometry=False)) == expected
+
+    def test_geometry_can_be_skipped(self, textract_invoice_response):
+        decoded = decode_textract_response(encode_textract_response(textract_invoice_response), geometry=False)
+
+        assert all('Geometry' not in block for block in decoded['Blocks'])
+        assert len(decoded['Blocks']) == len(textract_invoice_response['Blocks'])
+
+    def test_unusual_blocks_are_kept_verbatim(self):
+        """Non-UUID ids, unknown keys, odd geometry and int values go through extras"""
+        response = {
+            'DocumentMetadata': {'Pages': 1},
+            'Blocks': [
+                {'BlockType': 'PAGE', 'Id': 'page-1', 'Confidence': 100,
+                 'Geometry': {'BoundingBox': {'Width': 1, 'Height': 1, 'Left': 0, 'Top': 0}, 'Polygon': []},
+                 'Relationships': [{'Type': 'CHILD', 'Ids': ['word-1', 'missing']}]},
+                {'BlockType': 'WORD', 'Id': 'word-1', 'Text': 'AÑO ñandú', 'TextType': 'HANDWRITING',
+                 'Query': {'Text': 'total?'}, 'RowIndex': 2**40, 'SelectionStatus': 'SELECTED'},
+                {'Id': 'no-type'},
+            ]
+        }
+
+        assert decode_textract_response(encode_textract_response(response)) == response
+
+    def test_empty_response(self):
+        assert decode_textract_response(encode_textract_response({})) == {}
+        assert decode_textract_response(encode_textract_response({'Blocks': []})) == {'Blocks': []}
+
+    def test_zlib_fallback_without_zstandard(self, monkeypatch, textract_invoice_response):
+        monkeypatch.setattr(archive, 'zstandard', None)
+
+        packed = encode_textract_response(textract_invoice_response)
+
+        assert packed[len(archive.MAGIC)] == archive.CODEC_ZLIB
+        assert decode_textract_response(packed) == textract_invoice_response
+
+    def test_rejects_other_data(self):
+        with pytest.raises(ValueError):
+            decode_textract_response(b'{"Blocks": []}')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
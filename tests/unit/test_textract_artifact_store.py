@@ -0,0 +1,86 @@
+"""
+Tests for the raw Textract artifact store
+"""
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+
+from src.database.models import ProcessedInvoice
+from src.services.document_processing.textract import TextractArtifactStore, encode_textract_response
+
+
+def _session(row=None):
+    session = MagicMock()
+    result = MagicMock()
+    result.first.return_value = row
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def _sql(session):
+    return str(session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+
+
+class TestTextractArtifactStore:
+
+    def test_raw_response_is_not_on_invoice_row(self):
+        """Loading a ProcessedInvoice never pulls the OCR JSON"""
+        assert 'textract_raw_response' not in ProcessedInvoice.__table__.columns
+
+    @pytest.mark.asyncio
+    async def test_save_upserts_by_invoice(self, textract_invoice_response):
+        session = _session()
+
+        await TextractArtifactStore().save(session, str(uuid.uuid4()), "tenant", textract_invoice_response)
+
+        sql = _sql(session)
+        assert sql.startswith("INSERT INTO textract_artifacts")
+        assert "ON CONFLICT (invoice_id) DO UPDATE" in sql
+        values = session.execute.call_args.args[0].compile(dialect=postgresql.dialect()).params
+        assert values['archive'].startswith(b"TXA1")
+        assert values['raw_response'] is None
+
+    @pytest.mark.asyncio
+    async def test_load_is_tenant_scoped(self, textract_invoice_response):
+        archive = encode_textract_response(textract_invoice_response)
+        session = _session(MagicMock(archive=archive, raw_response=None))
+
+        loaded = await TextractArtifactStore().load(session, uuid.uuid4(), tenant_id="tenant")
+
+        assert loaded == textract_invoice_response
+        sql = _sql(session)
+        assert "SELECT textract_artifacts.archive, textract_artifacts.raw_response" in sql
+        assert "textract_artifacts.tenant_id = " in sql
+
+    @pytest.mark.asyncio
+    async def test_load_for_invoice_follows_cache_hits(self, textract_invoice_response):
+        """A cache-served invoice resolves to the artifact of the invoice it reused"""
+        archive = encode_textract_response(textract_invoice_response)
+        session = _session(MagicMock(archive=archive, raw_response=None))
+
+        loaded = await TextractArtifactStore().load_for_invoice(session, uuid.uuid4(), "tenant")
+
+        assert loaded == textract_invoice_response
+        sql = _sql(session)
+        assert (
+            "JOIN processed_invoices ON textract_artifacts.invoice_id = "
+            "coalesce(processed_invoices.cached_invoice_id, processed_invoices.id)"
+        ) in sql
+        assert "processed_invoices.tenant_id = " in sql
+
+    @pytest.mark.asyncio
+    async def test_load_falls_back_to_legacy_json(self, textract_invoice_response):
+        session = _session(MagicMock(archive=None, raw_response=textract_invoice_response))
+
+        loaded = await TextractArtifactStore().load(session, uuid.uuid4())
+
+        assert loaded is textract_invoice_response
+
+    @pytest.mark.asyncio
+    async def test_load_missing_artifact(self):
+        assert await TextractArtifactStore().load(_session(None), uuid.uuid4()) is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
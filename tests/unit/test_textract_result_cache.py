@@ -0,0 +1,193 @@
+"""
+Tests for the content-hash Textract result cache
+"""
+import uuid
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from src.services.document_processing import invoice_processor as invoice_processor_module
+from src.services.document_processing.invoice_processor import InvoiceProcessorService
+from src.services.document_processing.textract.result_cache import TextractResultCache
+from src.services.document_processing.textract.textract_service import TextractService
+from textract_samples import FakeTextractClient
+
+
+def _session(row=None, error=None):
+    """AsyncSession stand-in whose execute() returns ``row``"""
+    session = MagicMock()
+    if error:
+        session.execute = AsyncMock(side_effect=error)
+    else:
+        result = MagicMock()
+        result.first.return_value = row
+        session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def _job_session(invoice):
+    """AsyncSessionFactory() stand-in for a processing job on ``invoice``"""
+    session = MagicMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = invoice
+    session.execute = AsyncMock(return_value=result)
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    return session
+
+
+class TestTextractResultCache:
+
+    def test_content_hash_is_sha256(self):
+        """Same bytes hash the same, different bytes differ"""
+        cache = TextractResultCache(ttl_hours=1, enabled=True)
+
+        digest = cache.content_hash(b"%PDF-1.4 factura")
+
+        assert len(digest) == 64
+        assert digest == cache.content_hash(b"%PDF-1.4 factura")
+        assert digest != cache.content_hash(b"%PDF-1.4 factura 2")
+
+    def test_multi_photo_hash_covers_pages_and_order(self):
+        """One photo hashes like a single upload; page boundaries and order matter"""
+        cache = TextractResultCache(ttl_hours=1, enabled=True)
+
+        assert cache.content_hash_pages([b"page1"]) == cache.content_hash(b"page1")
+        digest = cache.content_hash_pages([b"page1", b"page2"])
+        assert digest == cache.content_hash_pages([b"page1", b"page2"])
+        assert digest != cache.content_hash_pages([b"page2", b"page1"])
+        assert digest != cache.content_hash_pages([b"page1p", b"age2"])
+
+    @pytest.mark.asyncio
+    async def test_hit_and_miss_are_counted(self):
+        """A hit points at the source invoice; counters track both outcomes"""
+        cache = TextractResultCache(ttl_hours=1, enabled=True)
+        invoice_id = uuid.uuid4()
+        row = SimpleNamespace(id=invoice_id, s3_key="invoices/t/1/f.pdf")
+
+        hit = await cache.lookup(_session(row), "tenant", "abc")
+        miss = await cache.lookup(_session(None), "tenant", "def")
+
+        assert hit.invoice_id == str(invoice_id)
+        assert hit.s3_key == "invoices/t/1/f.pdf"
+        assert miss is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+        assert cache.stats()['hit_rate'] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_lookup_is_scoped_to_tenant_and_ttl(self):
+        """The query filters on tenant, hash, completion and TTL"""
+        cache = TextractResultCache(ttl_hours=24, enabled=True)
+        session = _session(None)
+
+        await cache.lookup(session, "tenant-a", "abc")
+
+        sql = str(session.execute.call_args.args[0])
+        assert "processed_invoices.tenant_id" in sql
+        assert "processed_invoices.content_sha256" in sql
+        assert "processed_invoices.served_from_cache IS false" in sql
+        assert "processed_invoices.completion_timestamp >=" in sql
+        assert "JOIN textract_artifacts" in sql
+        assert "raw_response" not in sql
+
+    @pytest.mark.asyncio
+    async def test_disabled_or_failing_cache_is_a_miss(self):
+        """Disabled cache never queries; DB errors do not break uploads"""
+        disabled = TextractResultCache(ttl_hours=1, enabled=False)
+        session = _session(None)
+        assert await disabled.lookup(session, "tenant", "abc") is None
+        session.execute.assert_not_called()
+
+        failing = TextractResultCache(ttl_hours=1, enabled=True)
+        assert await failing.lookup(_session(error=RuntimeError("db down")), "tenant", "abc") is None
+        assert failing.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_lookup_only_rolls_back_its_savepoint(self):
+        """The lookup runs in a nested transaction, so the upload can still commit"""
+        cache = TextractResultCache(ttl_hours=1, enabled=True)
+        session = _session(error=RuntimeError("statement timeout"))
+
+        assert await cache.lookup(session, "tenant", "abc") is None
+
+        session.begin_nested.assert_called_once()
+        assert session.begin_nested.return_value.__aexit__.await_args.args[0] is RuntimeError
+        session.rollback.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cached_response_parses_like_fresh_ocr(self, textract_invoice_response):
+        """Re-parsing a stored response gives the same extraction without AWS"""
+        service = TextractService(max_concurrency=1)
+        service.textract_client = FakeTextractClient(textract_invoice_response)
+
+        fresh = await service.analyze_invoice("bucket", "k")
+        service.textract_client = MagicMock()
+        cached = service.analyze_cached_response(fresh['textract_response'])
+
+        service.textract_client.analyze_document.assert_not_called()
+        assert cached['extracted_data'] == fresh['extracted_data']
+        assert cached['confidence_score'] == fresh['confidence_score']
+
+
+class TestCachedInvoiceProcessing:
+
+    @pytest.fixture
+    def invoice(self):
+        return SimpleNamespace(
+            id=uuid.uuid4(), tenant_id="tenant", status="uploaded", file_size=1000, served_from_cache=True,
+            invoice_type=None, textract_job_id=None
+        )
+
+    @pytest.fixture
+    def processor(self, invoice, textract_invoice_response, monkeypatch):
+        session = _job_session(invoice)
+        monkeypatch.setattr(invoice_processor_module, "AsyncSessionFactory", lambda: session)
+        processor = InvoiceProcessorService()
+        processor.session = session
+        processor.artifact_store = MagicMock()
+        processor.artifact_store.save = AsyncMock()
+        processor.textract_service = MagicMock()
+        processor.textract_service.analyze_cached_response.side_effect = lambda response: {
+            'extracted_data': {'line_items': []}, 'confidence_score': 0.9, 'textract_response': response
+        }
+        processor.textract_service.analyze_invoice = AsyncMock(return_value={
+            'extracted_data': {'line_items': []}, 'confidence_score': 0.9,
+            'textract_response': textract_invoice_response
+        })
+        return processor
+
+    def _billing_record(self, processor):
+        return processor.session.add.call_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_is_free_and_not_stored_again(self, processor, invoice, textract_invoice_response):
+        processor.artifact_store.load = AsyncMock(return_value=textract_invoice_response)
+        original_id = uuid.uuid4()
+
+        await processor._process_invoice_with_textract(str(invoice.id), "k", cached_invoice_id=str(original_id))
+
+        processor.textract_service.analyze_invoice.assert_not_awaited()
+        processor.artifact_store.save.assert_not_awaited()
+        assert self._billing_record(processor).cost_cop == 0
+        assert invoice.served_from_cache is True
+        assert invoice.cached_invoice_id == original_id  # where its raw response lives
+
+    @pytest.mark.asyncio
+    async def test_missing_cached_response_runs_and_bills_ocr(self, processor, invoice):
+        """Artifact purged after the upload-time lookup: real Textract, normal price"""
+        processor.artifact_store.load = AsyncMock(return_value=None)
+
+        await processor._process_invoice_with_textract(str(invoice.id), "k", cached_invoice_id=str(uuid.uuid4()))
+
+        processor.textract_service.analyze_invoice.assert_awaited_once()
+        processor.artifact_store.save.assert_awaited_once()
+        assert self._billing_record(processor).cost_cop == 1500
+        assert invoice.served_from_cache is False
+        assert invoice.cached_invoice_id is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,280 @@
+"""
+Tests for TextractService non-blocking AWS calls
+"""
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from src.services.document_processing.textract.textract_service import TextractService
+from src.services.document_processing.textract.document_index import TextractDocumentIndex
+from src.services.document_processing.textract.field_rules import FieldRuleExtractor
+from textract_samples import FakeTextractClient, build_invoice_response
+from benchmarks.bench_field_rules import LegacyFieldLoops
+
+OCR_LATENCY = 0.3
+
+
+class SlowTextractStub:
+    """Blocking Textract stub that records peak concurrency"""
+
+    def __init__(self, response, latency: float = OCR_LATENCY):
+        self.response = response
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def analyze_document(self, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        return self.response
+
+
+async def _heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Tick on the loop until stopped, return the largest gap between ticks"""
+    max_gap = 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        max_gap = max(max_gap, now - last)
+        last = now
+    return max_gap
+
+
+class TestTextractServiceNonBlocking:
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self, textract_invoice_response):
+        """The loop keeps ticking while Textract is in flight"""
+        service = TextractService(max_concurrency=2)
+        service.textract_client = SlowTextractStub(textract_invoice_response)
+
+        stop = asyncio.Event()
+        heartbeat = asyncio.create_task(_heartbeat(stop))
+        result = await service.analyze_invoice("bucket", "invoices/t/1/factura.pdf")
+        stop.set()
+        max_gap = await heartbeat
+
+        assert result['extracted_data']['line_items']
+        assert max_gap < OCR_LATENCY / 2
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, textract_invoice_response):
+        """Concurrent analyses never exceed max_concurrency in-flight calls"""
+        service = TextractService(max_concurrency=2)
+        stub = SlowTextractStub(textract_invoice_response, latency=0.1)
+        service.textract_client = stub
+
+        await asyncio.gather(*[
+            service.analyze_invoice("bucket", f"key-{i}") for i in range(5)
+        ])
+
+        assert stub.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_upload_document_uses_put_object(self):
+        """S3 uploads go through put_object on the executor"""
+        service = TextractService(max_concurrency=1)
+        service.s3_client = MagicMock()
+
+        await service.upload_document("bucket", "invoices/t/1/f.pdf", b"%PDF-1.4")
+
+        service.s3_client.put_object.assert_called_once_with(
+            Bucket="bucket",
+            Key="invoices/t/1/f.pdf",
+            Body=b"%PDF-1.4",
+            ContentType='application/pdf'
+        )
+
+
+class TestTextractDocumentIndex:
+
+    def test_buckets_and_relationships(self, textract_invoice_response):
+        """Blocks are bucketed by type and CHILD/VALUE ids are resolved"""
+        index = TextractDocumentIndex(textract_invoice_response)
+        blocks = textract_invoice_response['Blocks']
+
+        assert index.block_count == len(blocks)
+        assert len(index.blocks_of_type('TABLE')) == 1
+        assert index.lines[0] == "COMERCIALIZADORA CASOLI S.A.S"
+
+        key_block = next(
+            b for b in index.blocks_of_type('KEY_VALUE_SET') if 'KEY' in b['EntityTypes']
+        )
+        assert index.text_of(key_block['Id']) == "Vendedor:"
+        value_id = index.values[key_block['Id']][0]
+        assert index.text_of(value_id) == "JUAN PEREZ"
+
+    def test_word_text_is_cached(self, textract_invoice_response):
+        """Block text is joined once and reused"""
+        index = TextractDocumentIndex(textract_invoice_response)
+        line = index.blocks_of_type('LINE')[0]
+
+        first = index.text_of(line['Id'])
+        assert index.text_of(line['Id']) is first
+        assert first == line['Text']
+
+    def test_extraction_uses_single_index(self):
+        """Multi-page responses extract every table row through the index"""
+        response = build_invoice_response(num_items=40, pages=3)
+        service = TextractService(max_concurrency=1)
+        index = TextractDocumentIndex(response)
+
+        tables = service._extract_tables(index)
+
+        assert len(tables) == 3
+        assert sum(t['row_count'] - 1 for t in tables) == 40
+        assert service._calculate_confidence(response, index) == pytest.approx(
+            sum(b['Confidence'] for b in response['Blocks']) / len(response['Blocks']) / 100
+        )
+
+
+class TestFieldRuleExtractor:
+
+    def test_first_and_last_match_semantics(self):
+        """First-match rules keep the earliest hit, last-match rules the latest"""
+        lines = [
+            "FECHA: 15/07/2025",
+            "NIT: 900123456-7",
+            "FECHA ENTREGA: 20/07/2025",
+            "NIT 800111222-1",
+            "SUBTOTAL $ 100,000",
+            "TOTAL $ 119,000",
+        ]
+
+        fields = FieldRuleExtractor().extract(lines)
+
+        assert fields['issue_date'] == "15/07/2025"
+        assert fields['supplier_nit'] == "800111222-1"
+        assert fields['subtotal'] == "100,000"
+        assert fields['total'] == "119,000"
+        assert fields['due_date'] is None
+
+    @pytest.mark.parametrize("lines", [
+        ["PMB123 CASOLI"],
+        ["pmb123 casoli"],
+        ["Pmb9", "REF: X1"],
+        ["ref: ab12", "factura: 77"],
+        ["Factura No. A123", "fecha: 15/07/2025", "Vencimiento 14/08/2025"],
+        ["nit: 900123456-7", "Comercializadora Casoli s.a.s", "Nit 800111222-1"],
+        ["Subtotal $ 100,000", "iva 19% $ 19,000", "Total $ 119,000"],
+        ["Credito 30 dias", "dcto 5%"],
+    ])
+    def test_matches_legacy_field_loops(self, lines):
+        """Rule table agrees with the per-field loops, whatever the letter case"""
+        legacy = LegacyFieldLoops()
+        fields = FieldRuleExtractor().extract(lines)
+        supplier = legacy.supplier(lines)
+        totals = legacy.totals(lines)
+        payment = legacy.payment(lines)
+
+        assert fields['invoice_number'] == legacy.invoice_number(lines)
+        assert fields['issue_date'] == legacy.date(lines, 'fecha')
+        assert fields['due_date'] == legacy.date(lines, 'vencimiento')
+        assert fields['supplier_nit'] == supplier['nit']
+        assert fields['supplier_name'] == supplier['company_name']
+        assert fields['customer_phone'] == legacy.customer(lines)['phone']
+        assert {name: fields[name] for name in totals} == totals
+        assert fields['credit_days'] == payment['credit_days']
+        assert fields['discount_percentage'] == payment['discount_percentage']
+
+    def test_service_fields_match_sample_invoice(self, textract_invoice_response):
+        """Parsed header, totals and payment fields of the sample invoice"""
+        service = TextractService(max_concurrency=1)
+        lines = TextractDocumentIndex(textract_invoice_response).lines
+
+        assert str(service._extract_date(lines, {}, 'vencimiento')) == "2025-08-14"
+        assert service._extract_supplier_info(lines, {})['company_name'] == "COMERCIALIZADORA CASOLI S.A.S"
+        assert service._extract_supplier_info(["  CALZADO CASOLI S.A.S  "], {})['company_name'] == "CALZADO CASOLI S.A.S"
+        assert service._extract_customer_info(lines, {})['customer_name'] == "ALMACEN LA REBAJA"
+        assert service._extract_payment_info(lines, {})['credit_days'] == 30
+
+
+class TestAsyncJobMode:
+
+    @staticmethod
+    def _service(client, page_size=None):
+        service = TextractService(max_concurrency=2)
+        service.textract_client = client
+        service.poll_interval = 0
+        if page_size:
+            service.MAX_RESULTS_PER_PAGE = page_size
+        return service
+
+    @pytest.mark.asyncio
+    async def test_multi_page_job_is_paginated_and_streamed(self):
+        """Multi-page PDFs run as a job and every NextToken page is parsed"""
+        response = build_invoice_response(num_items=40, pages=3)
+        client = FakeTextractClient(response, in_progress_polls=2)
+        service = self._service(client, page_size=100)
+        started = []
+
+        async def on_job_started(job_id):
+            started.append(job_id)
+
+        result = await service.analyze_invoice(
+            "bucket", "invoices/t/1/f.pdf", page_count=3, on_job_started=on_job_started
+        )
+
+        assert 'analyze_document' not in client.calls
+        assert client.calls.count('get_document_analysis') == 2 + -(-len(response['Blocks']) // 100)
+        assert result['job_id'] == started[0]
+        assert result['pages'] == 3
+        assert len(result['textract_response']['Blocks']) == len(response['Blocks'])
+        assert len(result['extracted_data']['line_items']) == 40
+        assert result['extracted_data']['totals']['total'] is not None
+
+    @pytest.mark.asyncio
+    async def test_single_page_uses_sync_api(self, textract_invoice_response):
+        """Small single-page documents keep the AnalyzeDocument path"""
+        client = FakeTextractClient(textract_invoice_response)
+        service = self._service(client)
+
+        result = await service.analyze_invoice("bucket", "k", file_size=200_000, page_count=1)
+
+        assert client.calls == ['analyze_document']
+        assert result['job_id'] is None
+        assert result['pages'] == 1
+
+    @pytest.mark.asyncio
+    async def test_large_file_uses_async_job(self, textract_invoice_response):
+        """Files over the sync size limit go async even with one page"""
+        client = FakeTextractClient(textract_invoice_response)
+        service = self._service(client)
+
+        result = await service.analyze_invoice("bucket", "k", file_size=50 * 1024 * 1024)
+
+        assert client.calls[0] == 'start_document_analysis'
+        assert result['job_id']
+
+    @pytest.mark.asyncio
+    async def test_unsupported_sync_document_falls_back_to_job(self):
+        """Unknown page count: a sync rejection retries as an async job"""
+        response = build_invoice_response(num_items=20, pages=2)
+        client = FakeTextractClient(response, reject_sync=True)
+        service = self._service(client)
+
+        result = await service.analyze_invoice("bucket", "k")
+
+        assert client.calls[:2] == ['analyze_document', 'start_document_analysis']
+        assert len(result['extracted_data']['line_items']) == 20
+
+    @pytest.mark.asyncio
+    async def test_failed_job_raises(self, textract_invoice_response):
+        """A FAILED job surfaces as an error"""
+        client = FakeTextractClient(textract_invoice_response, job_status='FAILED')
+        service = self._service(client)
+
+        with pytest.raises(Exception, match="failed"):
+            await service.analyze_invoice_async("bucket", "k")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])